@@ -7,31 +7,46 @@ Distribution A and base B, and computes a ranked list of the combined scores. Re
 Distribution B to A, yielding another ranked list. Finally average the two ranked lists as the normalized output.
 """
 
-from scipy.stats import rankdata
 import numpy
+import rank_utils
 
 def bidirect_norm(data):
-	""" data must be in numpy.ndarray type """
-	rank1 = unidirect_norm(data[0], data[1])
-	rank2 = unidirect_norm(data[1], data[0])
-	rank_out = rankdata(rank1 + rank2)
+	""" data must be in numpy.ndarray type, 2 x N for one pair of distributions or B x 2 x N 
+	for a batch of B pairs """
+	data = numpy.asarray(data, dtype=float)
+	rank1 = unidirect_norm(data[..., 0, :], data[..., 1, :])
+	rank2 = unidirect_norm(data[..., 1, :], data[..., 0, :])
+	rank_out = rank_utils.rankdata_rows(rank1 + rank2)
 	return rank_out
 
 def unidirect_norm(A, B):
 	# map distribution in one direction and rank the combined scores
-	N = len(A)
-	A_rank = rankdata(A)
-	B_rank = rankdata(B)
-	B_dict = {}
-	for i in range(N):
-		B_dict[B_rank[i]] = B[i]
-	A_norm = numpy.zeros(N)
-	for i in range(N):
-		if A_rank[i] not in B_dict.keys():
-			my_key = min(B_dict.keys(), key = lambda score:abs(score-A_rank[i]))
-		else:
-			my_key = A_rank[i]
-		A_norm[i] = B_dict[my_key]
+	shape = numpy.shape(A)
+	N = shape[-1]
+	A = numpy.reshape(A, (-1, N))
+	B = numpy.reshape(B, (-1, N))
+	rows = numpy.arange(len(A))[:, None]
+	A_rank = rank_utils.rankdata_rows(A)
+	B_rank = rank_utils.rankdata_rows(B)
+
+	# sorted B ranks and their values in one array; ranks lie in [1, N], so the offset 
+	# keeps the block of each row apart
+	offset = rows * (N+1)
+	order = numpy.argsort(B_rank, axis=1)
+	B_keys = (B_rank[rows, order] + offset).ravel()
+	B_values = B[rows, order].ravel()
+
+	# map each A rank to the B value of the nearest B rank, the lower one if two are as near
+	A_keys = A_rank + offset
+	right = numpy.searchsorted(B_keys, A_keys)
+	left = right - 1
+	has_left = left >= rows*N
+	has_right = right < (rows+1)*N
+	left = numpy.maximum(left, rows*N)
+	right = numpy.minimum(right, (rows+1)*N - 1)
+	use_right = has_right & (~has_left | (B_keys[right] - A_keys < A_keys - B_keys[left]))
+	A_norm = B_values[numpy.where(use_right, right, left)]
+
 	AB = A_norm + B
-	AB_rank = rankdata(AB)
-	return AB_rank
+	AB_rank = rank_utils.rankdata_rows(AB)
+	return AB_rank.reshape(shape)
@@ -0,0 +1,28 @@
+#!/usr/bin/python
+
+"""
+Parse the motifs of a directory of ScerTF or CIS-BP files, or of a file of FIRE motif strings,
+into a PFM registry (see pfm_registry), parsing again only the files changed since the last run.
+"""
+
+import sys
+import argparse
+import pfm_registry
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build a registry of parsed pfms")
+    parser.add_argument('-i', '-input', dest='input', type=str, help="Directory of motif files, or fire motif file")
+    parser.add_argument('-f', '-format', dest='format', type=str, choices=pfm_registry.KINDS)
+    parser.add_argument('-o', '-dir_registry', dest='dir_registry', type=str)
+    parser.add_argument('-w', '-workers', dest='workers', type=int, default=1, \
+        help="Number of processes to parse the motif files with")
+    parsed = parser.parse_args(argv[1:])
+    return parsed
+
+def main(argv):
+    parsed = parse_args(argv)
+    [names, count_parsed, count_files] = pfm_registry.update(parsed.dir_registry, parsed.input, parsed.format, parsed.workers)
+    print "Registry:", parsed.dir_registry, "Parsed:", count_parsed, "/", count_files, "Motif count:", len(names)
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,110 @@
+#!/usr/bin/python
+
+"""
+Local SQLite mirror of the CIS-BP tables the pipeline reads (see import_cisbp_sqlite.py), with
+indexes on the motif, tf, family, species and evidence columns, and the queries of motif
+metadata the scripts need, so species and evidence filtering is an indexed lookup rather than a
+scan of text dumps or a live MySQL server.
+"""
+
+import sqlite3
+
+# columns mirrored of each table; None for all of them (motif_features is read by position)
+TABLES = {
+    "motifs": ["Motif_ID", "TF_ID"],
+    "tfs": ["TF_ID", "TF_Name", "DBID", "TF_Species", "Family_ID", "TF_Status"],
+    "tf_families": ["Family_ID", "DBDs"],
+    "motif_all": ["Motif_ID", "TF_ID", "Species", "Evidence"],
+    "motif_features": None
+}
+
+INDEXES = [
+    ["motifs", ["Motif_ID"]], ["motifs", ["TF_ID"]],
+    ["tfs", ["TF_ID"]], ["tfs", ["TF_Species"]], ["tfs", ["TF_Status"]],
+    ["tf_families", ["Family_ID"]],
+    ["motif_all", ["Motif_ID"]], ["motif_all", ["TF_ID"]], ["motif_all", ["Species", "Evidence"]],
+    ["motif_all", ["Evidence"]], ["motif_features", ["Motif_ID"]]
+]
+
+# opened mirrors, keyed by file
+_connections = {}
+
+def connect(fn_db):
+    if fn_db not in _connections:
+        _connections[fn_db] = sqlite3.connect(fn_db)
+    return _connections[fn_db]
+
+def import_tables(src_cnx, fn_db, batch_size=10000):
+    """ Copy the mirrored columns of TABLES from a DB-API connection (MySQL or SQLite) into a new
+    SQLite file fn_db, and index them. Returns {table: row count}. """
+    cnx = sqlite3.connect(fn_db)
+    counts = {}
+    for table in sorted(TABLES):
+        cursor = src_cnx.cursor()
+        cursor.execute("SELECT %s FROM %s" % (", ".join(TABLES[table]) if TABLES[table] else "*", table))
+        columns = [column[0] for column in cursor.description]
+        cnx.execute("DROP TABLE IF EXISTS %s" % table)
+        cnx.execute("CREATE TABLE %s (%s)" % (table, ", ".join(columns)))
+        insert = "INSERT INTO %s VALUES (%s)" % (table, ", ".join(["?"] * len(columns)))
+        counts[table] = 0
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            cnx.executemany(insert, rows)
+            counts[table] += len(rows)
+        cursor.close()
+        for [index_table, index_columns] in INDEXES:
+            if index_table == table and set(index_columns) <= set(columns):
+                cnx.execute("CREATE INDEX idx_%s_%s ON %s (%s)" % (table, "_".join(index_columns), \
+                    table, ", ".join(index_columns)))
+    cnx.commit()
+    cnx.close()
+    _connections.pop(fn_db, None)
+    return counts
+
+def get_species_filter(column, species=None, exclude_species=None):
+    """ Returns [SQL condition, parameters] of a column being one of species and none of
+    exclude_species. """
+    conditions = ["1"]
+    params = []
+    if species:
+        conditions.append("%s IN (%s)" % (column, ", ".join(["?"] * len(species))))
+        params += list(species)
+    if exclude_species:
+        conditions.append("%s NOT IN (%s)" % (column, ", ".join(["?"] * len(exclude_species))))
+        params += list(exclude_species)
+    return [" AND ".join(conditions), params]
+
+def get_motifs(fn_db, species=None, exclude_species=None, evidence=None):
+    """ Sorted motif IDs of the tfs of the given species (all, if None) and not of exclude_species.
+    With evidence ('D' direct, 'I' inferred), the motifs of that evidence in the given species,
+    from motif_all. """
+    if evidence is None:
+        [condition, params] = get_species_filter("TF_Species", species, exclude_species)
+        query = "SELECT DISTINCT Motif_ID FROM motifs WHERE TF_ID IN (SELECT TF_ID FROM tfs WHERE %s)" % condition
+    else:
+        [condition, params] = get_species_filter("Species", species, exclude_species)
+        query = "SELECT DISTINCT Motif_ID FROM motif_all WHERE Evidence = ? AND %s" % condition
+        params = [evidence] + params
+    return sorted([row[0] for row in connect(fn_db).execute(query, params)])
+
+def filter_motifs(fn_db, names, species=None, exclude_species=None, evidence=None):
+    """ The names (in order) that are motifs passing the filters of get_motifs; the names are
+    joined in SQL against the indexed tables. """
+    cnx = connect(fn_db)
+    cnx.execute("CREATE TEMP TABLE IF NOT EXISTS query_names (Motif_ID TEXT PRIMARY KEY)")
+    cnx.execute("DELETE FROM query_names")
+    cnx.executemany("INSERT OR IGNORE INTO query_names VALUES (?)", [[name] for name in names])
+    if evidence is None:
+        [condition, params] = get_species_filter("tfs.TF_Species", species, exclude_species)
+        query = "SELECT DISTINCT query_names.Motif_ID FROM query_names JOIN motifs ON motifs.Motif_ID = query_names.Motif_ID \
+            JOIN tfs ON tfs.TF_ID = motifs.TF_ID WHERE %s" % condition
+    else:
+        [condition, params] = get_species_filter("motif_all.Species", species, exclude_species)
+        query = "SELECT DISTINCT query_names.Motif_ID FROM query_names JOIN motif_all ON motif_all.Motif_ID = query_names.Motif_ID \
+            WHERE motif_all.Evidence = ? AND %s" % condition
+        params = [evidence] + params
+    passed = set([row[0] for row in cnx.execute(query, params)])
+    cnx.execute("DELETE FROM query_names")
+    return [name for name in names if name in passed]
@@ -6,6 +6,7 @@ sys.path.append("/Users/KANG/proj_motifcomparison/src")
 from model_averaging_utils import *
 #from src.model_averaging_utils import *
 import numpy as nmp
+import fimo_adjmtr
 
 
 """
@@ -35,6 +36,13 @@ def parse_args(argv):
     parser.add_argument('--target_names', dest='target_names')
     parser.add_argument('--strategy', dest='strategy', default='NP',
                         help='options: %s'%str(averaging_strategies.keys()))
+    parser.add_argument('--dtype', dest='dtype', default='float64',
+                        help='float type to load the networks as, e.g. float32')
+    parser.add_argument('--chunk_rows', dest='chunk_rows', type=int,
+                        default=None,
+                        help='rows per chunk of the temporary arrays of the resort '
+                        'strategy; the networks are still loaded whole and the '
+                        'output allocated whole, so peak memory is not bounded')
     parsed = parser.parse_args(argv[1:])
     return parsed
 
@@ -96,14 +104,15 @@ def main(argv):
     """ NP component """
     # else:
     # read in np values
-    np_component = nmp.loadtxt(parsed.np_component)
+    np_component = nmp.loadtxt(parsed.np_component, dtype=parsed.dtype)
     # read in desired name for final combined adjmtr
     output_adjmtr_name = os.path.join(parsed.output_dir, 
                                       parsed.output_adjmtr_name)
     # read in PWM binding information, if available
     binding_strengths = None
     if parsed.binding_strengths != None:
-        binding_strengths = nmp.loadtxt(parsed.binding_strengths)
+        binding_strengths = fimo_adjmtr.load_adjmtr(parsed.binding_strengths,
+                                                     dtype=parsed.dtype)
         
     # Optional:
     making_adjlst = False
@@ -125,6 +134,9 @@ def main(argv):
     # perform model averaging
     if parsed.strategy == 'NP':
         combined = np_component
+    elif parsed.strategy == 'resort':
+        combined = resort_by_weights(np_component, binding_strengths,
+                                     chunk_rows=parsed.chunk_rows)
     else:
         combined = averaging_strategies[parsed.strategy](np_component, binding_strengths)
 
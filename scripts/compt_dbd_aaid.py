@@ -0,0 +1,58 @@
+#!/usr/bin/python
+
+"""
+Compute the percent identities of query motifs' DBDs to all DBDs of a database fasta file, and
+write an ordered list of aaids for each query, as align_dbd.sh did through generate_paired_dbd.py,
+clustalo and parse_paired_aaid.py; the alignments run in process (see dbd_align), with no temp
+files.
+"""
+
+import sys
+import argparse
+import dbd_align
+import fasta_index
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Compute DBD percent identities of query motifs")
+    parser.add_argument('-m', '-query_motif', dest='query_motif', type=str, nargs='+')
+    parser.add_argument('-f1', '-dbd_fasta1', dest='dbd_fasta1', type=str)
+    parser.add_argument('-f2', '-dbd_fasta2', dest='dbd_fasta2', type=str)
+    parser.add_argument('-o', '-dir_output', dest='dir_output', type=str)
+    parser.add_argument('-w', '-workers', dest='workers', type=int, default=1, \
+        help="Number of processes to align the database DBDs with")
+    parser.add_argument('-go', '-gap_open', dest='gap_open', type=float, default=dbd_align.GAP_OPEN)
+    parser.add_argument('-ge', '-gap_extend', dest='gap_extend', type=float, default=dbd_align.GAP_EXTEND)
+    parsed = parser.parse_args(argv[1:])
+    return parsed
+
+def main(argv):
+    parsed = parse_args(argv)
+
+    if not parsed.dir_output.endswith('/'):
+        parsed.dir_output += '/'
+
+    # get all dbd sequences from the database in dbd_fasta2 file; clustalo names a
+    # sequence by the first word of its header
+    [all_headers, all_dbds] = dbd_align.read_fasta(parsed.dbd_fasta2)
+    all_names = [header.split()[0] if header.split() else header for header in all_headers]
+
+    for query_motif in parsed.query_motif:
+        # get the dbd sequence of the query motif from dbd_fasta1 file
+        query = fasta_index.get_record(parsed.dbd_fasta1, query_motif)
+        if query is None:
+            print "No query motif found in fasta file:", query_motif
+            continue
+        pids = dbd_align.align_pids_pool(query[1], all_dbds, \
+            workers=parsed.workers, gap_open=parsed.gap_open, gap_extend=parsed.gap_extend)
+
+        # sort percent identity
+        data = sorted(zip(all_names, pids), key=lambda a:a[1])
+        data.reverse()
+
+        # write file
+        writer = open(parsed.dir_output + query_motif + ".aaid", "w")
+        writer.write("".join(["%s\t%0.5f\n" % (datum[0], datum[1]) for datum in data]))
+        writer.close()
+
+if __name__ == "__main__":
+    main(sys.argv)
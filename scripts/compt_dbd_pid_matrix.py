@@ -0,0 +1,42 @@
+#!/usr/bin/python
+
+"""
+Build the all-vs-all DBD percent identity matrix of a fasta file (or convert a clustal .pim
+file) into a matrix store, see dbd_pid. The store records the mtime and size of its source, and
+is only rebuilt when the source changed.
+"""
+
+import sys
+import os.path
+import argparse
+import dbd_pid
+import matrix_cache
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build an all-vs-all DBD percent identity matrix")
+    parser.add_argument('-f', '-dbd_fasta', dest='dbd_fasta', type=str)
+    parser.add_argument('-p', '-pim', dest='pim', type=str, help="Clustal percent identity matrix file")
+    parser.add_argument('-o', '-dir_output', dest='dir_output', type=str)
+    parser.add_argument('-w', '-workers', dest='workers', type=int, default=1, \
+        help="Number of processes to align the DBDs with")
+    parsed = parser.parse_args(argv[1:])
+    return parsed
+
+def main(argv):
+    parsed = parse_args(argv)
+
+    fn_source = parsed.pim if parsed.pim else parsed.dbd_fasta
+    stamps = {os.path.basename(fn_source): matrix_cache.file_stamp(fn_source)}
+    if matrix_cache.read_stamps(os.path.join(parsed.dir_output, matrix_cache.FN_STAMPS)) == stamps:
+        print "Up to date:", parsed.dir_output
+        return
+
+    if parsed.pim:
+        [matrix, names, cols] = dbd_pid.read_pim(parsed.pim)
+    else:
+        [matrix, names, cols] = dbd_pid.build_matrix(parsed.dbd_fasta, parsed.workers)
+    matrix_cache.write_entry(parsed.dir_output.rstrip('/'), matrix, names, cols, stamps)
+    print "DBD count:", len(names)
+
+if __name__ == "__main__":
+    main(sys.argv)
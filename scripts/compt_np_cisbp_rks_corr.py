@@ -3,21 +3,37 @@
 """
 Compute Spearman's rank order correlation of the NetProphet score rankings and the 
 database (CIS-BP) motif-target scan score rankings.
+
+The mtime, size and md5 of every ranking used are recorded in dir_output, so that with --update
+only the correlations of new or changed motifs (and all those of new or changed tfs) are computed,
+and the other lines of the per-tf files are kept. A ranking is changed when its content is: the
+md5 is computed again only for the rankings whose mtime or size differ, so rankings rewritten
+with the same values (e.g. by a full rank_fimo rerun) count as unchanged.
 """
 
 import sys
 import argparse
 import os
-import glob
 import os.path
+import numpy
+import hashlib
 import compt_pw_corr
+import rank_store
+import matrix_cache
+import infer_update
 import time
 
+FN_STAMPS = "_stamps.txt"
+
 def parse_args(argv):
     parser = argparse.ArgumentParser(description="Compute rank order correlations of np scores and datrabase motif-target score rankings")
     parser.add_argument('-n', '--dir_np', dest='dir_np', type=str, help='NetProphet rankings')
     parser.add_argument('-c', '--dir_cisbp', dest='dir_cisbp', type=str, help="Database motif-target score rankings")
     parser.add_argument('-o', '--dir_output', dest='dir_output', type=str)
+    parser.add_argument('-b', '--batch', dest='batch', action='store_true', \
+        help="Compute all correlations as one matrix product over a shared target index")
+    parser.add_argument('-u', '--update', dest='update', action='store_true', \
+        help="Only compute the correlations of new or changed rankings since the last run (by content), updating the files in dir_output")
     parsed = parser.parse_args(argv[1:])
     return parsed
 
@@ -32,53 +48,152 @@ def main(argv):
     parsed.dir_output = check_dir(parsed.dir_output)
 
     # get the list of query motif names and their ranked lists
-    query_tf_fns = glob.glob(parsed.dir_np + "/*")
     query_tfs = []
     query_tfs_skip = []
     ranks_query = []
-    for i in range(len(query_tf_fns)):
-        temp_tf = os.path.basename(query_tf_fns[i])
-        if os.stat(query_tf_fns[i]).st_size == 0:
+    for temp_tf in rank_store.get_names(parsed.dir_np):
+        temp_rank = rank_store.get_dict(parsed.dir_np, temp_tf)
+        if not temp_rank:
             query_tfs_skip.append(temp_tf)
         else:
-    	   query_tfs.append(temp_tf)
-    	   ranks_query.append(parse_rank(query_tf_fns[i]))
+            query_tfs.append(temp_tf)
+            ranks_query.append(temp_rank)
     print "TF count:", len(ranks_query), "Skip TF:", query_tfs_skip
 
     # get the list of database motif names and their ranked lists
-    db_motif_fns = glob.glob(parsed.dir_cisbp + "/*")
-    db_motifs = [None] * len(db_motif_fns)
+    db_motifs = rank_store.get_names(parsed.dir_cisbp)
     ranks_db = [None] * len(db_motifs)
-    for i in range(len(db_motif_fns)):
-    	db_motifs[i] = os.path.basename(db_motif_fns[i])
-    	ranks_db[i] = parse_rank(db_motif_fns[i])
-    db_motifs = [x for x in db_motifs if x is not None]
-    ranks_db = [x for x in ranks_db if x is not None]
+    for i in range(len(db_motifs)):
+        ranks_db[i] = rank_store.get_dict(parsed.dir_cisbp, db_motifs[i])
     print "Database motif count:", len(ranks_db)
 
-	# compute ranked list correlations
+    # stamps of the rankings the correlations are computed from
+    old_stamps = {"query": {}, "motif": {}}
+    if parsed.update:
+        old_stamps = read_stamps(parsed.dir_output + FN_STAMPS)
+    stamps = {"query": get_stamps(parsed.dir_np, query_tfs, old_stamps["query"]), \
+        "motif": get_stamps(parsed.dir_cisbp, db_motifs, old_stamps["motif"])}
+    motifs_changed = [j for j in range(len(db_motifs)) if is_changed(old_stamps["motif"].get(db_motifs[j]), \
+        stamps["motif"][db_motifs[j]])]
+    motifs_removed = [motif for motif in old_stamps["motif"] if motif not in stamps["motif"]]
+    queries_changed = []
+    queries_kept = []
     for i in range(len(query_tfs)):
-    	tic = time.clock()
-    	writer = open(parsed.dir_output + query_tfs[i], "w")
-    	for j in range(len(db_motifs)):
-    		corr = compt_pw_corr.compute_corr(ranks_db[j], ranks_query[i])
-    		writer.write("%s\t%.5f\n" % (db_motifs[j], corr))
-    	writer.close()
-    	toc = time.clock()
-    	print query_tfs[i], i, "/", len(query_tfs)-1, "Time elapsed:", toc-tic, "sec"
+        if is_changed(old_stamps["query"].get(query_tfs[i]), stamps["query"][query_tfs[i]]) or \
+            not os.path.isfile(parsed.dir_output + query_tfs[i]):
+            queries_changed.append(i)
+        else:
+            queries_kept.append(i)
+    if parsed.update:
+        print "Changed motif count:", len(motifs_changed), "Removed motif count:", len(motifs_removed), \
+            "Changed TF count:", len(queries_changed)
+
+    # changed tfs get the correlations of all motifs, the others only those of the changed motifs
+    jobs = [[queries_changed, range(len(db_motifs))]]
+    if queries_kept and (motifs_changed or motifs_removed):
+        jobs.append([queries_kept, motifs_changed])
+    compt = compt_corrs_batch if parsed.batch else compt_corrs
+    for [indices, motif_indices] in jobs:
+        for [i, corrs] in compt(indices, query_tfs, ranks_query, motif_indices, ranks_db):
+            write_corrs(parsed.dir_output + query_tfs[i], db_motifs, \
+                dict(zip([db_motifs[j] for j in motif_indices], corrs)))
+
+    # record what was computed, for later updates and the double filter inferences
+    write_stamps(parsed.dir_output + FN_STAMPS, stamps)
+    infer_update.write_changed(parsed.dir_output, [db_motifs[j] for j in motifs_changed] + motifs_removed, \
+        [query_tfs[i] for i in queries_changed], append=parsed.update)
+
+def compt_corrs(indices, query_tfs, ranks_query, motif_indices, ranks_db):
+    """ Yields [i, correlations with the motifs of motif_indices] for each tf index i. """
+    # compute ranked list correlations
+    for i in indices:
+        tic = time.clock()
+        corrs = [compt_pw_corr.compute_corr(ranks_db[j], ranks_query[i]) for j in motif_indices]
+        toc = time.clock()
+        print query_tfs[i], i, "/", len(query_tfs)-1, "Time elapsed:", toc-tic, "sec"
+        yield [i, corrs]
+
+def compt_corrs_batch(indices, query_tfs, ranks_query, motif_indices, ranks_db):
+    """ Same as compt_corrs, one matrix product for each group of tfs. """
+    # nozero rankings drop targets, so group the tfs sharing the same target set
+    groups = {}
+    for i in indices:
+        groups.setdefault(frozenset(ranks_query[i].keys()), []).append(i)
+
+    for targets, group in groups.items():
+        tic = time.clock()
+        targets = sorted(targets)
+        corrs = numpy.zeros((len(group), len(motif_indices)))
+        if motif_indices:
+            known_mtr = compt_pw_corr.align_ranks([ranks_query[i] for i in group], targets)
+            infer_mtr = compt_pw_corr.align_ranks([ranks_db[j] for j in motif_indices], targets)
+            corrs = compt_pw_corr.compute_corr_matrix(infer_mtr, known_mtr)
+        toc = time.clock()
+        print "TF count:", len(group), "Target count:", len(targets), "Time elapsed:", toc-tic, "sec"
+        for k, i in enumerate(group):
+            yield [i, list(corrs[k])]
+
+def write_corrs(fn, db_motifs, corrs):
+    """ Write the correlation of every motif, from corrs ({motif: corr}) or else kept from the 
+    line of the motif in the existing file fn. """
+    lines = {}
+    if len(corrs) < len(db_motifs):
+        for line in open(fn, "r"):
+            if line.split():
+                lines[line.split()[0]] = line
+    writer = open(fn, "w")
+    writer.write("".join([("%s\t%.5f\n" % (motif, corrs[motif])) if motif in corrs else lines[motif] \
+        for motif in db_motifs]))
+    writer.close()
+
+def get_stamps(dirname, names, old_stamps={}):
+    """ Stamps (mtime, size and md5) of the rank lists of a directory; the lists of a rank store
+    share the mtime and size of its matrix, and have the md5 of their row. The md5 of a list is
+    taken from its old stamp while the mtime and size are unchanged. """
+    if rank_store.is_store(dirname):
+        file_stamps = dict.fromkeys(names, matrix_cache.file_stamp(dirname + rank_store.FN_MATRIX))
+        get_md5 = lambda name: get_store_md5(dirname, name)
+    else:
+        file_stamps = dict((name, matrix_cache.file_stamp(dirname + name)) for name in names)
+        get_md5 = lambda name: hashlib.md5(open(dirname + name, "rb").read()).hexdigest()
+    stamps = {}
+    for name in names:
+        old = old_stamps.get(name, "").rsplit("\t", 1)
+        md5 = old[1] if len(old) == 2 and old[0] == file_stamps[name] else get_md5(name)
+        stamps[name] = "%s\t%s" % (file_stamps[name], md5)
+    return stamps
+
+def get_store_md5(dirname, name):
+    """ md5 of a rank list of a store: of its row, and the store's columns. """
+    [matrix, rows, cols, index] = rank_store.open_store(dirname)
+    md5 = hashlib.md5(numpy.ascontiguousarray(matrix[index[name]]).tostring())
+    md5.update("\n".join(cols))
+    return md5.hexdigest()
+
+def is_changed(old_stamp, stamp):
+    """ Whether a rank list changed, by the md5 of its stamps (a stamp without one, as written
+    before the md5 was kept, always differs). """
+    return old_stamp is None or old_stamp.split("\t")[-1] != stamp.split("\t")[-1]
+
+def read_stamps(fn):
+    stamps = {"query": {}, "motif": {}}
+    if os.path.isfile(fn):
+        for line in open(fn, "r"):
+            linesplit = line.rstrip("\n").split("\t", 2)
+            if len(linesplit) == 3:
+                stamps[linesplit[0]][linesplit[1]] = linesplit[2]
+    return stamps
+
+def write_stamps(fn, stamps):
+    writer = open(fn, "w")
+    for kind in ["query", "motif"]:
+        writer.write("".join(["%s\t%s\t%s\n" % (kind, name, stamps[kind][name]) for name in sorted(stamps[kind])]))
+    writer.close()
 
 def check_dir(dirname):
     if not dirname.endswith('/'):
         dirname += '/'
     return dirname
 
-def parse_rank(filename):
-    rank = {}
-    lines = open(filename, 'r').readlines()
-    for line in lines:
-        linesplit = line.split()
-        rank[linesplit[0]] = linesplit[1]
-    return rank
-
 if __name__ == "__main__":
     main(sys.argv)
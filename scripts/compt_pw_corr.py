@@ -4,10 +4,15 @@
 Compute spearman's rank order correlation, given two dictionaries of rankings. 
 infer_rank: rankings of inferred motif to s.cerevisiae promoters alignment score
 konwn_rank: rankings of known motif (netprophet or scertf) to s.cerevisiae promoters alignment score
+
+compute_corr_matrix computes the same correlation for every pair of columns of two rank matrices
+aligned to one target index, as a single centered matrix product.
 """
 
 import operator
 import scipy.stats
+import numpy
+import rank_utils
 
 def compute_corr(infer_rank, known_rank):
     # sort rankings of inferred motifs
@@ -27,4 +32,32 @@ def compute_corr(infer_rank, known_rank):
     temp = scipy.stats.spearmanr(list_infer_rank, list_known_rank)
     corr = temp[0]
     
-    return corr
\ No newline at end of file
+    return corr
+
+def align_ranks(ranks, targets):
+    """ Align a list of rank dictionaries to one target index, as a targets x len(ranks)
+    float matrix. Targets missing from a dictionary are given 0. """
+    mtr = numpy.zeros((len(targets), len(ranks)))
+    for j in range(len(ranks)):
+        mtr[:, j] = [float(ranks[j].get(t, 0)) for t in targets]
+    return mtr
+
+def compute_corr_matrix(infer_mtr, known_mtr):
+    """ Compute spearman's rank order correlation of every column of known_mtr with every column 
+    of infer_mtr. Rows of both matrices must be aligned to the same targets. Returns a matrix of 
+    known columns x infer columns. """
+    n = infer_mtr.shape[0]
+    # rank each column once; average ranks of n values are half integers with mean (n+1)/2, 
+    # so the centered ranks are exact in float32
+    infer_ranks = rank_utils.rankdata_rows(numpy.transpose(infer_mtr)).astype(numpy.float32)
+    known_ranks = rank_utils.rankdata_rows(numpy.transpose(known_mtr)).astype(numpy.float32)
+    infer_ranks -= numpy.float32(n+1) / 2
+    known_ranks -= numpy.float32(n+1) / 2
+
+    # accumulate the products in float64 to keep the precision of the written correlations
+    infer_norms = numpy.sqrt(numpy.sum(numpy.square(infer_ranks, dtype=numpy.float64), axis=1))
+    known_norms = numpy.sqrt(numpy.sum(numpy.square(known_ranks, dtype=numpy.float64), axis=1))
+    covs = numpy.dot(known_ranks.astype(numpy.float64), numpy.transpose(infer_ranks).astype(numpy.float64))
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        corrs = covs / numpy.outer(known_norms, infer_norms)
+    return corrs
@@ -3,6 +3,9 @@
 import sys
 import os
 import argparse
+import cisbp_db
+import meme_db
+import pfm_registry
 
 def parse_args(argv):
     parser = argparse.ArgumentParser(description="Convert inferred motif pwms in CIS_BP database to meme format")
@@ -11,6 +14,17 @@ def parse_args(argv):
     parser.add_argument('-t', '--tf_names', dest='tf_names', type=str, default='../resources/tf_names.txt')
     parser.add_argument('-b', '--background_frequency', dest='background_frequency', \
         type=str, default='A 0.25 C 0.25 G 0.25 T 0.25')
+    parser.add_argument('-d', '--cisbp_db', dest='cisbp_db', type=str, \
+        help="SQLite mirror of CIS-BP (see import_cisbp_sqlite.py), to convert only the motifs passing the filters below")
+    parser.add_argument('-s', '--species', dest='species', type=str, nargs='+')
+    parser.add_argument('-x', '--exclude_species', dest='exclude_species', type=str, nargs='+')
+    parser.add_argument('-e', '--evidence', dest='evidence', type=str, help="D for direct, I for inferred")
+    parser.add_argument('-m', '--meme_db', dest='meme_db', type=str, \
+        help="Write all motifs to this one meme database (and its index) instead of a file per motif")
+    parser.add_argument('-w', '--workers', dest='workers', type=int, default=1, \
+        help="Number of processes to read the motif files with")
+    parser.add_argument('-r', '--registry', dest='registry', type=str, \
+        help="PFM registry (see pfm_registry) to parse the motif files through, parsing only those changed since its last update")
     parsed = parser.parse_args(argv[1:])
     return parsed
 
@@ -20,34 +34,41 @@ def errprint(st):
 def main(argv):
     parsed = parse_args(argv)
 
-    # write a list tf names
-    writer0 = open(parsed.tf_names, "w")
+    input_fns = [input_fn for input_fn in os.listdir(parsed.cisbp_dir) if not input_fn.startswith(".")]
+    if parsed.cisbp_db:
+        # keep the motifs of the species and evidence
+        motif_names = set(cisbp_db.filter_motifs(parsed.cisbp_db, [os.path.splitext(input_fn)[0] for input_fn in input_fns], \
+            parsed.species, parsed.exclude_species, parsed.evidence))
+        input_fns = [input_fn for input_fn in input_fns if os.path.splitext(input_fn)[0] in motif_names]
+
+    # parse the motif files in parallel
+    input_fns = ["%s/%s" % (parsed.cisbp_dir, input_fn) for input_fn in sorted(input_fns)]
+    if parsed.registry:
+        [names, count_parsed, count_files] = pfm_registry.update(parsed.registry, parsed.cisbp_dir, "cisbp", parsed.workers)
+        print "Registry:", parsed.registry, "Parsed:", count_parsed, "/", count_files
+        # the motifs of the input files, keyed by file as motif names repeat
+        motifs = [[motif_name, len(pfm), meme_db.format_motif(motif_name, pfm_registry.to_decimals(pfm))] for [motif_name, pfm] in \
+            pfm_registry.get_pfms(parsed.registry, sources=[os.path.basename(input_fn) for input_fn in input_fns])]
+    else:
+        motifs = meme_db.read_motifs(input_fns, "cisbp", parsed.workers)
 
-    for input_fn in os.listdir(parsed.cisbp_dir):
-        # get motif names
-        if not input_fn.startswith("."):
-            motif_name = os.path.splitext(input_fn)[0]
-            writer0.write("%s\n" % motif_name)
-
-            # parse motif file
-            lines = open("%s/%s" % (parsed.cisbp_dir, input_fn),"r").readlines()
-            motif_freq = []
-            for i, line in enumerate(lines):
-                if i > 0:
-                    motif_freq.append([float(line.split()[1]), float(line.split()[2]),
-                     float(line.split()[3]), float(line.split()[4])])
-
-            # write motif to output file
+    if parsed.meme_db:
+        # write all motifs to one meme database
+        [motif_names, skipped] = meme_db.write_db(parsed.meme_db, motifs)
+        if skipped:
+            print "Skipped duplicate motifs:", skipped
+    else:
+        # write each motif to its output file
+        motif_names = []
+        for [motif_name, width, text] in motifs:
             writer = open(parsed.output_dir + "/" + motif_name, "w")
-            writer.write("MEME version 4.9.1\n\nALPHABET= ACGT\n\nstrands: + -\n")
-            # writer.write("\nBackground letter frequencies\n%s\n" % parsed.background_frequency)
-            writer.write("\nMOTIF %s\n" % motif_name)
-            writer.write("letter-probability matrix: alength= 4 w= %d nsites= 20 E= 0\n" % len(motif_freq))
-            for i in range(0, len(motif_freq)):
-                for j in range(0, 4):
-                    writer.write("%.3f\t" % motif_freq[i][j])
-                writer.write("\n")
+            writer.write(meme_db.MEME_HEADER + text)
             writer.close()
+            motif_names.append(motif_name)
+
+    # write a list tf names
+    writer0 = open(parsed.tf_names, "w")
+    writer0.write("".join(["%s\n" % motif_name for motif_name in motif_names]))
     writer0.close()
 
 def isfloat(var):
@@ -3,12 +3,20 @@
 import sys
 import os
 import argparse
+import meme_db
+import pfm_registry
 
 def parse_args(argv):
     parser = argparse.ArgumentParser(description="Convert Scer TF motif data files to meme type database")
     parser.add_argument('scertf_dir', metavar='scertf_dir', help='Directory of Scer TF motif data files')
     parser.add_argument('-o', '--output_dir', dest='output_dir', type=str, default='motif_meme')
     parser.add_argument('-t', '--tf_names', dest='tf_names', type=str, default='tf_names.txt')
+    parser.add_argument('-m', '--meme_db', dest='meme_db', type=str, \
+        help="Write all motifs to this one meme database (and its index) instead of a file per motif")
+    parser.add_argument('-w', '--workers', dest='workers', type=int, default=1, \
+        help="Number of processes to read the motif files with")
+    parser.add_argument('-r', '--registry', dest='registry', type=str, \
+        help="PFM registry (see pfm_registry) to parse the motif files through, parsing only those changed since its last update")
     parsed = parser.parse_args(argv[1:])
     return parsed
 
@@ -18,42 +26,36 @@ def errprint(st):
 def main(argv):
     parsed = parse_args(argv)
 
-    # write a list tf names
-    writer0 = open(parsed.tf_names, "w")
-
-    for input_fn in os.listdir(parsed.scertf_dir):
-        # get motif names
-        if not input_fn.startswith("."):
-            author_name, motif_name = os.path.splitext(input_fn)
-            motif_name = motif_name.replace(".","")
-            writer0.write("%s\n" % motif_name)
-
-            # parse scertf file
-            lines = open("%s/%s" % (parsed.scertf_dir, input_fn),"r").readlines()
-            arrnum = [None for _ in range(4)]
-            lncnt = 0
-            for line in lines:
-                arrnum[lncnt] = [float(item) for item in line.split() if isfloat(item)]
-                lncnt += 1
-
-            # write motif to output file
+    # parse the motif files in parallel
+    input_fns = ["%s/%s" % (parsed.scertf_dir, input_fn) for input_fn in sorted(os.listdir(parsed.scertf_dir)) \
+        if not input_fn.startswith(".")]
+    if parsed.registry:
+        [names, count_parsed, count_files] = pfm_registry.update(parsed.registry, parsed.scertf_dir, "scertf", parsed.workers)
+        print "Registry:", parsed.registry, "Parsed:", count_parsed, "/", count_files
+        # the motifs of the input files, keyed by file as motif names repeat
+        motifs = [[motif_name, len(pfm), meme_db.format_motif(motif_name, pfm_registry.to_decimals(pfm))] for [motif_name, pfm] in \
+            pfm_registry.get_pfms(parsed.registry, sources=[os.path.basename(input_fn) for input_fn in input_fns])]
+    else:
+        motifs = meme_db.read_motifs(input_fns, "scertf", parsed.workers)
+
+    if parsed.meme_db:
+        # write all motifs to one meme database
+        [motif_names, skipped] = meme_db.write_db(parsed.meme_db, motifs, meme_db.BACKGROUNDS["scertf"])
+        if skipped:
+            print "Skipped duplicate motifs:", skipped
+    else:
+        # write each motif to its output file
+        motif_names = []
+        for [motif_name, width, text] in motifs:
             writer = open(parsed.output_dir + "/" + motif_name, "w")
-            writer.write("MEME version 4.9.1\n\nALPHABET= ACGT\n\nstrands: + -\n\nBackground letter frequencies\nA 0.3 C 0.2 G 0.2 T 0.3\n")
-            writer.write("\nMOTIF %s\n" % motif_name)
-            writer.write("letter-probability matrix: alength= 4 w= %d nsites= 20 E= 0\n" % len(arrnum[0]))
-            for i in range(0, len(arrnum[0])):
-                for j in range(0, 4):
-                    writer.write("%.3f\t" % arrnum[j][i])
-                writer.write("\n")
+            writer.write(meme_db.format_header(meme_db.BACKGROUNDS["scertf"]) + text)
             writer.close()
-    writer0.close()
+            motif_names.append(motif_name)
 
-def isfloat(var):
-    try: 
-        float(var)
-        return True
-    except ValueError:
-        return False
+    # write a list tf names
+    writer0 = open(parsed.tf_names, "w")
+    writer0.write("".join(["%s\n" % motif_name for motif_name in motif_names]))
+    writer0.close()
 
 if __name__ == "__main__":
     main(sys.argv)
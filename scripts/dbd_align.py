@@ -0,0 +1,154 @@
+#!/usr/bin/python
+
+"""
+Global pairwise alignment (Needleman-Wunsch with affine gaps and BLOSUM62) of one DBD sequence
+against many, and their percent identities, in place of writing a fasta file per pair for
+clustalo.
+
+The database sequences are padded into one matrix and the dynamic programming runs one query
+residue at a time over all of them; within a row, the horizontal gaps are a running maximum,
+so no Python loop runs over the database or the columns. Along with the score, each cell
+carries the identity and aligned pair counts of its best path, so no traceback is needed.
+The percent identity is the identities over the aligned (ungapped) pairs, as in clustal's
+percent identity matrix; co-optimal alignments are resolved differently from clustalo, so the
+values may differ slightly from its output.
+"""
+
+import numpy
+import multiprocessing
+
+ALPHABET = "ARNDCQEGHILKMFPSTWYVBZX*"
+
+BLOSUM62 = """
+ 4 -1 -2 -2  0 -1 -1  0 -2 -1 -1 -1 -1 -2 -1  1  0 -3 -2  0 -2 -1  0 -4
+-1  5  0 -2 -3  1  0 -2  0 -3 -2  2 -1 -3 -2 -1 -1 -3 -2 -3 -1  0 -1 -4
+-2  0  6  1 -3  0  0  0  1 -3 -3  0 -2 -3 -2  1  0 -4 -2 -3  3  0 -1 -4
+-2 -2  1  6 -3  0  2 -1 -1 -3 -4 -1 -3 -3 -1  0 -1 -4 -3 -3  4  1 -1 -4
+ 0 -3 -3 -3  9 -3 -4 -3 -3 -1 -1 -3 -1 -2 -3 -1 -1 -2 -2 -1 -3 -3 -2 -4
+-1  1  0  0 -3  5  2 -2  0 -3 -2  1  0 -3 -1  0 -1 -2 -1 -2  0  3 -1 -4
+-1  0  0  2 -4  2  5 -2  0 -3 -3  1 -2 -3 -1  0 -1 -3 -2 -2  1  4 -1 -4
+ 0 -2  0 -1 -3 -2 -2  6 -2 -4 -4 -2 -3 -3 -2  0 -2 -2 -3 -3 -1 -2 -1 -4
+-2  0  1 -1 -3  0  0 -2  8 -3 -3 -1 -2 -1 -2 -1 -2 -2  2 -3  0  0 -1 -4
+-1 -3 -3 -3 -1 -3 -3 -4 -3  4  2 -3  1  0 -3 -2 -1 -3 -1  3 -3 -3 -1 -4
+-1 -2 -3 -4 -1 -2 -3 -4 -3  2  4 -2  2  0 -3 -2 -1 -2 -1  1 -4 -3 -1 -4
+-1  2  0 -1 -3  1  1 -2 -1 -3 -2  5 -1 -3 -1  0 -1 -3 -2 -2  0  1 -1 -4
+-1 -1 -2 -3 -1  0 -2 -3 -2  1  2 -1  5  0 -2 -1 -1 -1 -1  1 -3 -1 -1 -4
+-2 -3 -3 -3 -2 -3 -3 -3 -1  0  0 -3  0  6 -4 -2 -2  1  3 -1 -3 -3 -1 -4
+-1 -2 -2 -1 -3 -1 -1 -2 -2 -3 -3 -1 -2 -4  7 -1 -1 -4 -3 -2 -2 -1 -2 -4
+ 1 -1  1  0 -1  0  0  0 -1 -2 -2  0 -1 -2 -1  4  1 -3 -2 -2  0  0  0 -4
+ 0 -1  0 -1 -1 -1 -1 -2 -2 -1 -1 -1 -1 -2 -1  1  5 -2 -2  0 -1 -1  0 -4
+-3 -3 -4 -4 -2 -2 -3 -2 -2 -3 -2 -3 -1  1 -4 -3 -2 11  2 -3 -4 -3 -2 -4
+-2 -2 -2 -3 -2 -1 -2 -3  2 -1 -1 -2 -1  3 -3 -2 -2  2  7 -1 -3 -2 -1 -4
+ 0 -3 -3 -3 -1 -2 -2 -3 -3  3  1 -2  1 -1 -2 -2  0 -3 -1  4 -3 -2 -1 -4
+-2 -1  3  4 -3  0  1 -1  0 -3 -4  0 -3 -3 -2  0 -1 -4 -3 -3  4  1 -1 -4
+-1  0  0  1 -3  3  4 -2  0 -3 -3  1 -1 -3 -1  0 -1 -3 -2 -2  1  4 -1 -4
+ 0 -1 -1 -1 -2 -1 -1 -1 -1 -1 -1 -1 -1 -1 -2  0  0 -2 -1 -1 -1 -1 -1 -4
+-4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4  1
+"""
+
+# gap penalties of BLAST with BLOSUM62: a gap of length k scores GAP_OPEN + GAP_EXTEND*(k-1)
+GAP_OPEN = -11
+GAP_EXTEND = -1
+
+# a cell's counts are packed as identities*COUNT_UNIT + aligned pairs
+COUNT_UNIT = 1 << 20
+
+def get_blosum62():
+    return numpy.array(BLOSUM62.split(), dtype=float).reshape(len(ALPHABET), len(ALPHABET))
+
+def encode(seq):
+    """ Indices of the residues of a sequence in ALPHABET; unknown residues are X. """
+    index = dict((aa, k) for k, aa in enumerate(ALPHABET))
+    return numpy.array([index.get(aa, index['X']) for aa in seq.upper()], dtype=int)
+
+def align_pids(query, seqs, gap_open=GAP_OPEN, gap_extend=GAP_EXTEND):
+    """ Returns the percent identities of the global alignments of query to each of seqs. """
+    scores = get_blosum62()
+    q = encode(query)
+    lens = numpy.array([len(seq) for seq in seqs], dtype=int)
+    if len(seqs) == 0:
+        return numpy.zeros(0)
+    n_cols = max(lens.max(), 1)
+    db = numpy.empty((len(seqs), n_cols), dtype=int)
+    db[:] = ALPHABET.index('X')
+    for b, seq in enumerate(seqs):
+        db[b, :len(seq)] = encode(seq)
+
+    cols = numpy.arange(n_cols+1)
+    # row 0: the query is all gap
+    H = numpy.empty((len(seqs), n_cols+1))
+    H[:, 0] = 0
+    H[:, 1:] = gap_open + gap_extend*(cols[1:]-1)
+    Hc = numpy.zeros(H.shape, dtype=numpy.int64)
+    F = numpy.empty(H.shape)
+    F[:] = -numpy.inf
+    Fc = numpy.zeros(H.shape, dtype=numpy.int64)
+    for aa in q:
+        # vertical gaps, opened from H or extended from F of the previous row
+        from_open = H + gap_open
+        from_extend = F + gap_extend
+        extend = from_extend > from_open
+        F = numpy.where(extend, from_extend, from_open)
+        Fc = numpy.where(extend, Fc, Hc)
+
+        # diagonal moves align a pair of residues
+        D = numpy.empty(H.shape)
+        D[:, 0] = -numpy.inf
+        D[:, 1:] = H[:, :-1] + scores[aa, db]
+        Dc = numpy.zeros(H.shape, dtype=numpy.int64)
+        Dc[:, 1:] = Hc[:, :-1] + (db == aa)*COUNT_UNIT + 1
+        G = numpy.where(D >= F, D, F)
+        Gc = numpy.where(D >= F, Dc, Fc)
+
+        # horizontal gaps: E[j] is the best G[k] + gap_open + gap_extend*(j-1-k) over k < j,
+        # a running maximum of G[k] - gap_extend*k; reopening a gap never beats extending it
+        V = G - gap_extend*cols
+        best = numpy.maximum.accumulate(V, axis=1)
+        best_k = numpy.maximum.accumulate(numpy.where(V == best, cols, 0), axis=1)
+        E = numpy.empty(H.shape)
+        E[:, 0] = -numpy.inf
+        E[:, 1:] = best[:, :-1] + gap_open + gap_extend*(cols[1:]-1)
+        Ec = numpy.zeros(H.shape, dtype=numpy.int64)
+        Ec[:, 1:] = numpy.take_along_axis(Gc, best_k[:, :-1], axis=1)
+
+        H = numpy.where(G >= E, G, E)
+        Hc = numpy.where(G >= E, Gc, Ec)
+
+    counts = Hc[numpy.arange(len(seqs)), lens]
+    identities = counts // COUNT_UNIT
+    aligned = counts % COUNT_UNIT
+    pids = numpy.zeros(len(seqs))
+    pids[aligned > 0] = 100.0 * identities[aligned > 0] / aligned[aligned > 0]
+    return pids
+
+def align_chunk(task):
+    """ align_pids for a pool; task is [query, seqs, gap_open, gap_extend]. """
+    [query, seqs, gap_open, gap_extend] = task
+    return align_pids(query, seqs, gap_open, gap_extend)
+
+def align_pids_pool(query, seqs, workers=1, chunk_size=256, gap_open=GAP_OPEN, gap_extend=GAP_EXTEND):
+    """ align_pids over chunks of seqs, spread over a pool of workers. """
+    tasks = [[query, seqs[start:start+chunk_size], gap_open, gap_extend] \
+        for start in range(0, len(seqs), chunk_size)]
+    if workers > 1:
+        pool = multiprocessing.Pool(workers)
+        results = pool.map(align_chunk, tasks)
+        pool.close()
+        pool.join()
+    else:
+        results = [align_chunk(task) for task in tasks]
+    return numpy.concatenate(results + [numpy.zeros(0)])
+
+def read_fasta(fn):
+    """ Returns [headers, sequences] of a fasta file, with sequences that may span lines;
+    headers are without the '>'. """
+    headers = []
+    seqs = []
+    for line in open(fn, "r"):
+        line = line.strip()
+        if line.startswith(">"):
+            headers.append(line[1:])
+            seqs.append([])
+        elif line and seqs:
+            seqs[-1].append(line)
+    return [headers, ["".join(seq) for seq in seqs]]
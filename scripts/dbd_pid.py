@@ -0,0 +1,108 @@
+#!/usr/bin/python
+
+"""
+All-vs-all DBD percent identity matrices, stored as a rank store (see rank_store) with the DBD
+names (first word of the fasta headers, e.g. M0001_1.02:3-60) as rows and columns.
+
+A matrix is built in parallel from a fasta file with dbd_align, or read from a clustal percent
+identity matrix (.pim) file, and written once; afterwards each query's row is selected by name
+through a dict index. Wherever a directory of per-query .aaid lists is read, a matrix store
+can be given instead: get_queries and get_aaid_list take either.
+"""
+
+import os
+import glob
+import numpy
+import multiprocessing
+import dbd_align
+import rank_store
+
+# the DBD sequences being aligned, set by init_seqs in each process
+seqs = []
+
+# opened matrices, keyed by store directory: [matrix, names, dict of query motif to its first row]
+_matrices = {}
+
+def init_seqs(all_seqs):
+    global seqs
+    seqs = all_seqs
+
+def align_row(i):
+    """ Percent identities of the i-th DBD to itself and the DBDs after it. """
+    return dbd_align.align_pids(seqs[i], seqs[i:])
+
+def build_matrix(fn_fasta, workers=1):
+    """ Returns [matrix, names, names] of the percent identities of all DBDs of a fasta file
+    to each other. Only the upper triangle is aligned, rows spread over a pool of workers; a pair
+    takes the value of aligning the earlier DBD against the later, which can differ slightly from
+    the other direction where alignments are co-optimal. """
+    [headers, all_seqs] = dbd_align.read_fasta(fn_fasta)
+    names = [header.split()[0] if header.split() else header for header in headers]
+    matrix = numpy.zeros((len(all_seqs), len(all_seqs)))
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, init_seqs, (all_seqs,))
+        results = pool.imap(align_row, range(len(all_seqs)))
+    else:
+        init_seqs(all_seqs)
+        results = (align_row(i) for i in range(len(all_seqs)))
+    for i, pids in enumerate(results):
+        matrix[i, i:] = pids
+        matrix[i:, i] = pids
+    if workers > 1:
+        pool.close()
+        pool.join()
+    return [matrix, names, names]
+
+def read_pim(fn):
+    """ Returns [matrix, names, names] of a clustal percent identity matrix file. """
+    names = []
+    scores = []
+    for line in open(fn, "r"):
+        if len(line.strip()) > 0 and not line.startswith('#'):
+            temp_line = line.split()
+            names.append(temp_line[1])
+            scores.append([float(score) for score in temp_line[2:]])
+    return [numpy.array(scores).reshape(len(names), len(names)), names, names]
+
+def open_matrix(dirname):
+    if dirname not in _matrices:
+        [matrix, names, cols] = rank_store.load_store(dirname)
+        queries = {}
+        for i, name in enumerate(names):
+            queries.setdefault(name.split(':')[0], i)
+        _matrices[dirname] = [matrix, names, queries]
+    return _matrices[dirname]
+
+def get_queries(dirname):
+    """ Query names of a directory of .aaid lists, or the motifs of a stored matrix. """
+    if rank_store.is_store(dirname):
+        return list(open_matrix(dirname)[2].keys())
+    names = []
+    for filename in glob.glob(os.path.join(dirname, "*")):
+        filename = os.path.basename(filename).split('.')[0]
+        if not filename.startswith('_'):
+            names.append(filename)
+    return names
+
+def get_aaid_list(dirname, query):
+    """ Returns [names, aaids] of a query, sorted by decreasing percent identity, from its
+    .aaid file or from the first row of the query motif in a stored matrix. """
+    if rank_store.is_store(dirname):
+        [matrix, names, queries] = open_matrix(dirname)
+        pids = numpy.asarray(matrix[queries[query]])
+        # ties in reverse order and rounded, as the .aaid lists are written
+        order = numpy.argsort(pids, kind='mergesort')[::-1]
+        return [[names[j] for j in order], list(numpy.round(pids[order], 5))]
+    names = []
+    aaids = []
+    for line in open(os.path.join(dirname, query + ".aaid"), "r"):
+        line = line.split()
+        names.append(line[0])
+        aaids.append(float(line[1]))
+    return [names, aaids]
+
+def get_mtime(dirname, query):
+    """ Modification time of the aaid list of a query. """
+    if rank_store.is_store(dirname):
+        return os.path.getmtime(os.path.join(dirname, rank_store.FN_MATRIX))
+    return os.path.getmtime(os.path.join(dirname, query + ".aaid"))
@@ -10,6 +10,7 @@ import argparse
 import numpy
 import matplotlib.pyplot as plt
 import compt_pw_corr
+import rank_store
 import math
 
 def parse_args(argv):
@@ -56,21 +57,12 @@ def check_dir(dirname):
         dirname += '/'
     return dirname
 
-def parse_file(filename):
-    rank = {}
-    lines = open(filename, 'r').readlines()
-    for line in lines:
-        linesplit = line.split()
-        if len(linesplit) != 0:
-            rank[linesplit[0]] = linesplit[1]
-    return rank
-
 def compt_corrs(dir_st, dir_np, names_dict):
     corrs_out = []
     for gene_name, sys_name in names_dict.iteritems():
         # parse scertf and netprophet rankings
-        st_rank = parse_file(dir_st + gene_name)
-        np_rank = parse_file(dir_np + sys_name)
+        st_rank = rank_store.get_dict(dir_st, gene_name)
+        np_rank = rank_store.get_dict(dir_np, sys_name)
         temp_corr = compt_pw_corr.compute_corr(st_rank, np_rank)
         if not math.isnan(temp_corr):
             corrs_out.append(temp_corr)
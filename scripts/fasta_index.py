@@ -0,0 +1,129 @@
+#!/usr/bin/python
+
+"""
+Byte offset index of the records of a DBD fasta file, keyed by motif (the header up to the first
+':', e.g. M0001_1.02 of >M0001_1.02:3-60), so a motif's DBDs are read with a seek instead of a
+scan of the file, and subsets of the file are streamed record by record. Sequences may span any
+number of lines.
+
+The index is written next to the fasta file (fasta + FN_SUFFIX) with the mtime and size of the
+fasta file, and built again when they change; if it cannot be written, it is kept in memory.
+"""
+
+import os
+import matrix_cache
+
+FN_SUFFIX = ".fidx"
+
+# loaded indexes, keyed by fasta file: [records in file order as [motif, offset, size],
+# dict of motif to its records]
+_indexes = {}
+
+def motif_id(header):
+    return header.lstrip('>').split(':')[0].strip()
+
+def build_index(fn):
+    """ Returns [motif, offset, size] of each record of a fasta file, in file order. """
+    records = []
+    offset = 0
+    for line in open(fn, "rb"):
+        if line.startswith(">"):
+            records.append([motif_id(line), offset, 0])
+        offset += len(line)
+        if records:
+            records[-1][2] = offset - records[-1][1]
+    return records
+
+def read_index(fn_index, stamp):
+    """ Records of an index file, or None if it is missing or its stamp is not stamp. """
+    if not os.path.isfile(fn_index):
+        return None
+    reader = open(fn_index, "r")
+    if reader.readline().rstrip("\n") != "#" + stamp:
+        return None
+    records = []
+    for line in reader:
+        linesplit = line.rstrip("\n").split("\t")
+        records.append([linesplit[0], int(linesplit[1]), int(linesplit[2])])
+    return records
+
+def write_index(fn_index, records, stamp):
+    tmp = "%s.tmp%d" % (fn_index, os.getpid())
+    writer = open(tmp, "w")
+    writer.write("#%s\n" % stamp)
+    writer.write("".join(["%s\t%d\t%d\n" % tuple(record) for record in records]))
+    writer.close()
+    os.rename(tmp, fn_index)
+
+def load_index(fn):
+    """ Returns [records, dict of motif to records] of a fasta file, from its index file, which
+    is built first if missing or out of date. """
+    stamp = matrix_cache.file_stamp(fn)
+    if fn not in _indexes or _indexes[fn][0] != stamp:
+        records = read_index(fn + FN_SUFFIX, stamp)
+        if records is None:
+            records = build_index(fn)
+            try:
+                write_index(fn + FN_SUFFIX, records, stamp)
+            except (IOError, OSError):
+                pass
+        index = {}
+        for record in records:
+            index.setdefault(record[0], []).append(record)
+        _indexes[fn] = [stamp, records, index]
+    return _indexes[fn][1:]
+
+def has_motif(fn, motif):
+    return motif in load_index(fn)[1]
+
+def parse_record(text):
+    """ Returns [header without the '>', sequence] of the text of a record. """
+    lines = text.splitlines()
+    return [lines[0][1:].strip(), "".join([line.strip() for line in lines[1:]])]
+
+def get_records(fn, motif):
+    """ Returns [header, sequence] of each DBD of a motif, or [] if it has none. """
+    reader = open(fn, "rb")
+    seqs = []
+    for [name, offset, size] in load_index(fn)[1].get(motif, []):
+        reader.seek(offset)
+        seqs.append(parse_record(reader.read(size)))
+    reader.close()
+    return seqs
+
+def get_record(fn, motif):
+    """ Returns [header, sequence] of the first DBD of a motif, or None if it has none. """
+    records = load_index(fn)[1].get(motif)
+    if not records:
+        return None
+    reader = open(fn, "rb")
+    reader.seek(records[0][1])
+    record = parse_record(reader.read(records[0][2]))
+    reader.close()
+    return record
+
+def iter_raw(fn, motifs=None):
+    """ Yields the text of each record of a fasta file in file order, only those of a set of
+    motifs if given. """
+    reader = open(fn, "rb")
+    for [motif, offset, size] in load_index(fn)[0]:
+        if motifs is None or motif in motifs:
+            reader.seek(offset)
+            yield reader.read(size)
+    reader.close()
+
+def iter_records(fn, motifs=None):
+    """ Yields [header, sequence] of each record, as iter_raw. """
+    for text in iter_raw(fn, motifs):
+        yield parse_record(text)
+
+def write_subset(fn, motifs, fn_output):
+    """ Write the records of a set of motifs to fn_output as they are in fn. Returns the number
+    of records written. """
+    writer = open(fn_output, "wb")
+    count = 0
+    for text in iter_raw(fn, motifs):
+        writer.write(text if text.endswith("\n") else text + "\n")
+        count += 1
+    writer.close()
+    return count
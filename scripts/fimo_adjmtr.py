@@ -0,0 +1,128 @@
+#!/usr/bin/python
+
+"""
+Build a tf x target adjacency matrix from fimo summary files, shared by the combine_*_fimo_score
+scripts. Summary files are read in parallel and their target names mapped to columns through a
+dict index; the matrix is built as a scipy.sparse CSR matrix, and written either in the text
+layout of numpy.savetxt or as a binary .npz matrix. With a matrix_cache directory set, the
+summaries are read through the on-disk cache instead.
+"""
+
+import os.path
+import numpy
+import scipy.sparse
+import multiprocessing
+import matrix_cache
+
+# target names to column indices, set by init_targets in each process
+target_index = {}
+
+def get_list(fn):
+    lines = open(fn, "r").readlines()
+    l = [None] * len(lines)
+    for i in range(len(lines)):
+        l[i] = lines[i].split()[0]
+    return l
+
+def get_index(names):
+    """ Dict of name to the index of its first occurrence, as list.index would find. """
+    index = {}
+    for i, name in enumerate(names):
+        index.setdefault(name, i)
+    return index
+
+def init_targets(targets):
+    global target_index
+    target_index = get_index(targets)
+
+def parse_summary(fn):
+    """ Returns [columns, scores] of the targets in a fimo summary file; a target listed
+    more than once keeps its last score. """
+    d = {}
+    for line in open(fn, "r"):
+        linesplit = line.split()
+        j = target_index.get(linesplit[1])
+        if j is not None:
+            d[j] = float(linesplit[3])
+    cols = numpy.fromiter(d.keys(), dtype=int, count=len(d))
+    scores = numpy.fromiter(d.values(), dtype=float, count=len(d))
+    return [cols, scores]
+
+def read_summary(fn):
+    """ Returns the {target: score} dict of all targets of a fimo summary file, for the
+    matrix cache; a target listed more than once keeps its last score. """
+    d = {}
+    for line in open(fn, "r"):
+        linesplit = line.split()
+        d[linesplit[1]] = float(linesplit[3])
+    return d
+
+def select_summaries(fns, targets, workers=1):
+    """ Returns the len(fns) x len(targets) matrix of summary scores through the matrix cache,
+    one cache entry per summary directory; missing targets are 0. """
+    scores = numpy.zeros((len(fns), len(targets)))
+    dirs = {}
+    for i, fn in enumerate(fns):
+        dirs.setdefault(os.path.dirname(fn), []).append(i)
+    for dirname, rows in dirs.items():
+        names = [os.path.basename(fns[i]) for i in rows]
+        scores[rows] = matrix_cache.select(dirname, "fimo_summary", read_summary, names, targets, \
+            pattern="*.summary", workers=workers)
+    return scores
+
+def build_adjmtr(sources, n_tfs, targets, workers=1, dtype=float):
+    """ sources is a list of [row index, summary filename]. Returns a n_tfs x len(targets) CSR
+    matrix of the summary scores; a row given more than once keeps its last source, and
+    targets without a score are 0. """
+    # keep the last source of each row
+    last_sources = dict((row, fn) for row, fn in sources)
+    rows = sorted(last_sources)
+    fns = [last_sources[row] for row in rows]
+
+    if matrix_cache.cache_dir is not None:
+        adjmtr = numpy.zeros((n_tfs, len(targets)), dtype=dtype)
+        adjmtr[rows] = select_summaries(fns, targets, workers)
+        return scipy.sparse.csr_matrix(adjmtr)
+
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, init_targets, (targets,))
+        parsed = pool.map(parse_summary, fns)
+        pool.close()
+        pool.join()
+    else:
+        init_targets(targets)
+        parsed = [parse_summary(fn) for fn in fns]
+
+    indptr = numpy.zeros(n_tfs+1, dtype=int)
+    for row, [cols, scores] in zip(rows, parsed):
+        indptr[row+1] = len(cols)
+    indptr = numpy.cumsum(indptr)
+    indices = numpy.concatenate([cols for [cols, scores] in parsed] + [numpy.zeros(0, dtype=int)])
+    data = numpy.concatenate([scores for [cols, scores] in parsed] + [numpy.zeros(0)]).astype(dtype)
+    adjmtr = scipy.sparse.csr_matrix((data, indices, indptr), shape=(n_tfs, len(targets)))
+    adjmtr.sort_indices()
+    return adjmtr
+
+def get_npz_fn(fn):
+    """ The name scipy.sparse.save_npz writes fn to: fn, with .npz appended if it lacks it. """
+    return fn if fn.endswith(".npz") else fn + ".npz"
+
+def write_adjmtr(adjmtr, fn, binary=False, chunk_rows=256):
+    """ Write a sparse adjmtr as a binary .npz matrix (to get_npz_fn(fn)), or in the
+    tab-separated '%0.15f' layout of numpy.savetxt, a chunk of dense rows at a time. Returns the
+    name written. """
+    if binary:
+        scipy.sparse.save_npz(get_npz_fn(fn), adjmtr)
+        return get_npz_fn(fn)
+    writer = open(fn, "w")
+    for start in range(0, adjmtr.shape[0], chunk_rows):
+        numpy.savetxt(writer, adjmtr[start:start+chunk_rows].toarray(), fmt='%0.15f', delimiter='\t')
+    writer.close()
+    return fn
+
+def load_adjmtr(fn, dtype=float):
+    """ Read an adjmtr written by write_adjmtr, as a dense matrix; a binary one is found under
+    the name it was written with (e.g. net.adjmtr.npz for net.adjmtr). """
+    if fn.endswith(".npz") or (not os.path.isfile(fn) and os.path.isfile(get_npz_fn(fn))):
+        return scipy.sparse.load_npz(get_npz_fn(fn)).toarray().astype(dtype)
+    return numpy.loadtxt(fn, dtype=dtype)
@@ -0,0 +1,54 @@
+#!/usr/bin/python
+
+"""
+Import the CIS-BP tables the pipeline reads from the MySQL database (or from a SQLite database or
+.sql dump with the same tables) into an indexed SQLite file, queried through cisbp_db.
+"""
+
+import sys
+import os
+import argparse
+import sqlite3
+import cisbp_db
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Import the cisbp tables into a sqlite file")
+    parser.add_argument('-o', '-fn_output', dest='fn_output', type=str, required=True, \
+        help="SQLite file to create")
+    parser.add_argument('-b', '-batch_size', dest='batch_size', type=int, default=10000)
+    parser.add_argument('-H', '-host', dest='host', type=str, default="localhost")
+    parser.add_argument('-u', '-user', dest='user', type=str, default="root")
+    parser.add_argument('-p', '-password', dest='password', type=str, default="root")
+    parser.add_argument('-d', '-database', dest='database', type=str, default="cis_bp")
+    parser.add_argument('-s', '-sqlite', dest='sqlite', type=str, \
+        help="SQLite database file, or .sql dump, to import from instead of mysql")
+    parsed = parser.parse_args(argv[1:])
+    return parsed
+
+def main(argv):
+    parsed = parse_args(argv)
+
+    if parsed.sqlite and parsed.sqlite.endswith(".sql"):
+        src_cnx = sqlite3.connect(":memory:")
+        src_cnx.executescript(open(parsed.sqlite, "r").read())
+    elif parsed.sqlite:
+        src_cnx = sqlite3.connect(parsed.sqlite)
+    else:
+        import mysql.connector
+        src_cnx = mysql.connector.connect(user=parsed.user, password=parsed.password, \
+            host=parsed.host, database=parsed.database)
+
+    # import into a temporary file, so an existing mirror is replaced only when complete
+    fn_tmp = "%s.tmp%d" % (parsed.fn_output, os.getpid())
+    try:
+        counts = cisbp_db.import_tables(src_cnx, fn_tmp, parsed.batch_size)
+        os.rename(fn_tmp, parsed.fn_output)
+    finally:
+        src_cnx.close()
+        if os.path.exists(fn_tmp):
+            os.remove(fn_tmp)
+    for table in sorted(counts):
+        print "Table:", table, "Count:", counts[table]
+
+if __name__ == "__main__":
+    main(sys.argv)
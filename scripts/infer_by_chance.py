@@ -12,6 +12,7 @@ import scipy.stats
 import numpy
 import random
 import matplotlib.pyplot as plt
+import rank_cache
 
 def parse_args(argv):
     parser = argparse.ArgumentParser(description="Infer a motif by chance")
@@ -60,10 +61,7 @@ def main(argv):
     sys.stdout.write("\rEvaluate inference ... ")
 
     # get dict of name conversion
-    dict_names = {}
-    lines = open(parsed.dict_conv, "r").readlines()
-    for line in lines:
-        dict_names[line.split()[1]] = line.split()[0]
+    dict_names = rank_cache.get_name_dict(parsed.dict_conv)
 
     # compute pairwise correlation of query and inferred motif
     for i in range(len(data_out)):
@@ -73,18 +71,9 @@ def main(argv):
         elif data_out[i][0] not in dict_names.keys():
             data_out[i].append(-2)
         else:
-            dict_ranklist_inferred = {}
-            lines = open(parsed.dir_cisbp_rank + data_out[i][1], "r").readlines()
-            for line in lines:
-                dict_ranklist_inferred[line.split()[0]] = float(line.split()[1])
-            names_query_ordered = []
-            ranklist_query = []
-            ranklist_inferred = []
-            lines = open(parsed.dir_scertf_rank + dict_names[data_out[i][0]], "r").readlines()
-            for line in lines:
-                names_query_ordered.append(line.split()[0])
-                ranklist_query.append(line.split()[1])
-                ranklist_inferred.append(dict_ranklist_inferred[line.split()[0]])
+            dict_ranklist_inferred = rank_cache.get_dict(parsed.dir_cisbp_rank, data_out[i][1])
+            [names_query_ordered, ranklist_query] = rank_cache.get_list(parsed.dir_scertf_rank, dict_names[data_out[i][0]])
+            ranklist_inferred = [dict_ranklist_inferred[name] for name in names_query_ordered]
             corr_query_inferred = scipy.stats.spearmanr(ranklist_query, ranklist_inferred)[0]
 
             if numpy.isnan(corr_query_inferred):
@@ -13,15 +13,21 @@ import os.path
 import scipy.stats
 import numpy
 import matplotlib.pyplot as plt
+import rank_cache
+import infer_update
+import dbd_pid
 
 def parse_args(argv):
     parser = argparse.ArgumentParser(description="Infer the most informative motif")
-    parser.add_argument('-a', '-dir_dbd_aaid', dest='dir_dbd_aaid', type=str)
+    parser.add_argument('-a', '-dir_dbd_aaid', dest='dir_dbd_aaid', type=str, \
+        help="Directory of .aaid lists, or a DBD percent identity matrix store (see dbd_pid)")
     parser.add_argument('-n', '-dir_corr_np', dest='dir_corr_np', type=str)
     parser.add_argument('-o', '-dir_output', dest='dir_output', type=str)
     parser.add_argument('-d', '-dict_conv', dest='dict_conv', type=str, default='resources/np_scertf_names.txt')
     parser.add_argument('-c', '-dir_cisbp_rank', dest='dir_cisbp_rank', type=str)
     parser.add_argument('-s', '-dir_scertf_rank', dest='dir_scertf_rank', type=str)
+    parser.add_argument('-u', '-update', dest='update', action='store_true', \
+        help="Keep the previous results of the queries the np corr updates since cannot have changed")
     parsed = parser.parse_args(argv[1:])
     return parsed
 
@@ -48,27 +54,41 @@ def main(argv):
         sys.stdout.write("\rProcessing inference ... ")
 
         # get motifs names from both dbd and netprophet
-        names_aaid = get_names(parsed.dir_dbd_aaid)
+        names_aaid = dbd_pid.get_queries(parsed.dir_dbd_aaid)
         names_np = get_names(parsed.dir_corr_np)
         names_common = list(set(names_aaid) & set(names_np))
         count_not_inferred = 0
         data_out = [None] * len(names_common)
 
+        # with update, only the queries with a changed motif passing the filter are inferred again
+        fn_output = parsed.dir_output + "dbl_flt_pid_cutoff_" + str(aaid_cutoff) + ".txt"
+        changed = None
+        results = {}
+        stale = set(names_common)
+        if parsed.update:
+            changed = infer_update.read_changed(parsed.dir_corr_np, fn_output)
+            results = infer_update.read_results(fn_output)
+            stale = infer_update.get_stale(names_common, changed, parsed.dir_dbd_aaid, fn_output, results)
+
         for i in range(len(names_common)):
             query = names_common[i]
             # parse and filter aaids of the query
             motifs_filtered = []
             aaid_filtered = []
-            lines = open(parsed.dir_dbd_aaid + query + ".aaid", "r").readlines()
-            for j in range(len(lines)):
-                line = lines[j].split()
-                if float(line[1]) >= aaid_cutoff:
-                    motifs_filtered.append(line[0].split(':')[0])
-                    aaid_filtered.append(float(line[1]))
+            [names_dbd, aaids] = dbd_pid.get_aaid_list(parsed.dir_dbd_aaid, query)
+            for j in range(len(aaids)):
+                if aaids[j] >= aaid_cutoff:
+                    motifs_filtered.append(names_dbd[j].split(':')[0])
+                    aaid_filtered.append(aaids[j])
                 else:
                     break
             
-            if not motifs_filtered:
+            if query not in stale and not changed[0].intersection(motifs_filtered):
+                # kept from the previous results
+                data_out[i] = results[query]
+                if data_out[i][1] == None:
+                    count_not_inferred += 1
+            elif not motifs_filtered:
                 count_not_inferred += 1
                 data_out[i] = [query, None, -1, -1]
             else:
@@ -108,31 +128,22 @@ def main(argv):
         sys.stdout.write("\rEvaluating inference ... ")
 
         # get dict of name conversion
-        dict_names = {}
-        lines = open(parsed.dict_conv, "r").readlines()
-        for line in lines:
-            dict_names[line.split()[1]] = line.split()[0]
+        dict_names = rank_cache.get_name_dict(parsed.dict_conv)
 
         # compute pairwise correlation of query and inferrred motif
         for i in range(len(data_out)):
             # only evaluate the tfs available in scertf 
-            if data_out[i][1] == None:
+            if len(data_out[i]) > 4:
+                # kept from the previous results
+                continue
+            elif data_out[i][1] == None:
                 data_out[i].append(-1)
             elif data_out[i][0] not in dict_names.keys():
                 data_out[i].append(-2)
             else:
-                dict_ranklist_inferred = {}
-                lines = open(parsed.dir_cisbp_rank + data_out[i][1], "r").readlines()
-                for line in lines:
-                    dict_ranklist_inferred[line.split()[0]] = float(line.split()[1])
-                names_query_ordered = []
-                ranklist_query = []
-                ranklist_inferred = []
-                lines = open(parsed.dir_scertf_rank + dict_names[data_out[i][0]], "r").readlines()
-                for line in lines:
-                    names_query_ordered.append(line.split()[0])
-                    ranklist_query.append(line.split()[1])
-                    ranklist_inferred.append(dict_ranklist_inferred[line.split()[0]])
+                dict_ranklist_inferred = rank_cache.get_dict(parsed.dir_cisbp_rank, data_out[i][1])
+                [names_query_ordered, ranklist_query] = rank_cache.get_list(parsed.dir_scertf_rank, dict_names[data_out[i][0]])
+                ranklist_inferred = [dict_ranklist_inferred[name] for name in names_query_ordered]
                 corr_query_inferred = scipy.stats.spearmanr(ranklist_query, ranklist_inferred)[0]
 
                 if numpy.isnan(corr_query_inferred):
@@ -148,7 +159,7 @@ def main(argv):
         print "Inferred motif count:", len(names_common)-count_not_inferred,'/', len(names_common)
 
         # write data
-        writer = open(parsed.dir_output + "dbl_flt_pid_cutoff_" + str(aaid_cutoff) + ".txt", "w")
+        writer = open(fn_output, "w")
         writer.write("#query_motif\tinferred_motif\tdbd_aaid\tnp_cisbp_corr\tscertf_cisbp_corr\n")
         for datum in data_out:
             if datum[1] == None:
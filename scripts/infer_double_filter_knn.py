@@ -18,16 +18,24 @@ import os.path
 import scipy.stats
 import numpy
 import matplotlib.pyplot as plt
+import rank_cache
+import infer_update
+import dbd_pid
 
 def parse_args(argv):
     parser = argparse.ArgumentParser(description="Infer the most informative motif")
     parser.add_argument('-m', '-method', dest='method', type=str)
-    parser.add_argument('-a', '-dir_dbd_aaid', dest='dir_dbd_aaid', type=str)
+    parser.add_argument('-a', '-dir_dbd_aaid', dest='dir_dbd_aaid', type=str, \
+        help="Directory of .aaid lists, or a DBD percent identity matrix store (see dbd_pid)")
     parser.add_argument('-n', '-dir_corr_np', dest='dir_corr_np', type=str)
     parser.add_argument('-o', '-dir_output', dest='dir_output', type=str)
     parser.add_argument('-d', '-dict_conv', dest='dict_conv', type=str, default='resources/np_scertf_names.txt')
     parser.add_argument('-c', '-dir_cisbp_rank', dest='dir_cisbp_rank', type=str)
     parser.add_argument('-s', '-dir_scertf_rank', dest='dir_scertf_rank', type=str)
+    parser.add_argument('-k', '-knns', dest='knns', type=int, nargs='+', \
+        help="k values for knn, or percentages for knn_pct (default 5 10 15, or 10 20 30)")
+    parser.add_argument('-u', '-update', dest='update', action='store_true', \
+        help="Keep the previous results of the queries the np corr updates since cannot have changed")
     parsed = parser.parse_args(argv[1:])
     return parsed
 
@@ -42,101 +50,69 @@ def main(argv):
     parsed.dir_cisbp_rank = check_dir(parsed.dir_cisbp_rank)
     parsed.dir_scertf_rank = check_dir(parsed.dir_scertf_rank)
 
-    """ Specified k Nearest Neighbor """
-    # if parsed.method == 'knn':
-    # k nearest neighbor
-    
-    knns = [5, 10, 15]
-    # knns = [20, 30, 50]
+    if parsed.method == "knn_pct":
+        # the percentages of the nearest neighbor's percent identity
+        knns = parsed.knns if parsed.knns else [10, 20, 30]
+    else:
+        # k nearest neighbor
+        knns = parsed.knns if parsed.knns else [5, 10, 15]
+
+    """ Infer motifs by double filtering, for all k at once """
+    sys.stdout.write("\rProcessing inference ... ")
+    # get motifs names from both dbd and netprophet
+    names_aaid = dbd_pid.get_queries(parsed.dir_dbd_aaid)
+    names_np = get_names(parsed.dir_corr_np)
+    names_common = list(set(names_aaid) & set(names_np))
+    fns_output = [get_fn_output(parsed, knn) for knn in knns]
+    # with update, only the queries with a changed motif passing the filter are inferred again
+    # (each results file against the updates since it was written)
+    changed = [None] * len(knns)
+    results = [{} for k in range(len(knns))]
+    stale = [set(names_common) for k in range(len(knns))]
+    if parsed.update:
+        for k in range(len(knns)):
+            changed[k] = infer_update.read_changed(parsed.dir_corr_np, fns_output[k])
+            results[k] = infer_update.read_results(fns_output[k])
+            stale[k] = infer_update.get_stale(names_common, changed[k], parsed.dir_dbd_aaid, fns_output[k], results[k])
+    count_kept = 0
+    data_outs = [[None] * len(names_common) for k in range(len(knns))]
+    for i in range(len(names_common)):
+        query = names_common[i]
+        motifs_changed = [None if query in stale[k] else changed[k][0] for k in range(len(knns))]
+        inferred = infer_query(parsed.dir_dbd_aaid, query, parsed.dir_corr_np + query, \
+                                parsed.method, knns, motifs_changed)
+        for k in range(len(knns)):
+            if inferred[k] is None:
+                count_kept += 1
+                data_outs[k][i] = results[k][query]
+            else:
+                data_outs[k][i] = [query] + inferred[k]
+    sys.stdout.write("Done\n")
+    if parsed.update:
+        print "Kept results:", count_kept, "/", len(names_common)*len(knns)
+
     data_arr = [None] * len(knns)
     for k in range(len(knns)):
-        """ Infer motifs by double filtering """
         knn = knns[k]
-        sys.stdout.write("\rProcessing inference ... ")
-        # get motifs names from both dbd and netprophet
-        names_aaid = get_names(parsed.dir_dbd_aaid)
-        names_np = get_names(parsed.dir_corr_np)
-        names_common = list(set(names_aaid) & set(names_np))
-        count_not_inferred = 0
-        data_out = [None] * len(names_common)
-        for i in range(len(names_common)):
-            query = names_common[i]
-            # parse and filter aaids of the query
-            motifs_filtered = []
-            aaid_filtered = []
-            lines = open(parsed.dir_dbd_aaid + query + ".aaid", "r").readlines()
-            for j in range(len(lines)):
-                line = lines[j].split()
-                # get the k nearest neighbors, and include k+ neighbors which have the same 
-                # percent idenities as the k(th) nearest neighbors does
-                if j < knn:
-                    motifs_filtered.append(line[0].split(':')[0])
-                    aaid_filtered.append(float(line[1]))
-                else:
-                    if float(line[1]) == aaid_filtered[-1]:
-                        motifs_filtered.append(line[0].split(':')[0])
-                        aaid_filtered.append(float(line[1]))
-                    else:
-                        break          
-            if not motifs_filtered:
-                count_not_inferred += 1
-                data_out[i] = [query, None, -1, -1]
-            else:
-                # parse np corrs of the query
-                lines = open(parsed.dir_corr_np + query, "r").readlines()
-                motifs_np_all = [None] * len(lines)
-                corrs_np_all = [None] * len(lines)
-                indices_np_filtered = []
-                for j in range(len(lines)):
-                    line = lines[j].split()
-                    motifs_np_all[j] = line[0]
-                    corrs_np_all[j] = 0 if line[1] == "nan" else float(line[1])
-                    if line[0] in motifs_filtered:
-                        indices_np_filtered.append(j)
-                # temp_rank = scipy.stats.rankdata(corrs_np_all)
-                # rank_corrs_np_all = len(corrs_np_all) + 1 - temp_rank
-                # find the most informative motif 
-                index_np_max = indices_np_filtered[0]
-                motif_np_max = motifs_np_all[index_np_max]
-                corr_np_max = corrs_np_all[index_np_max]
-                for j in range(1,len(indices_np_filtered)):
-                    temp_motif = motifs_np_all[indices_np_filtered[j]]
-                    temp_corr = corrs_np_all[indices_np_filtered[j]]
-                    if corrs_np_all[indices_np_filtered[j]] > corr_np_max:
-                        index_np_max = indices_np_filtered[j]
-                        motif_np_max = motifs_np_all[index_np_max]
-                        corr_np_max =corrs_np_all[index_np_max]
-                # rank_corr_np_max = rank_corrs_np_all[index_np_max]
-                aaid_max = aaid_filtered[motifs_filtered.index(motif_np_max)]
-                data_out[i] = [query, motif_np_max, aaid_max, corr_np_max]
-        sys.stdout.write("Done\n")
+        data_out = data_outs[k]
         """ Evaluate inference """
         sys.stdout.write("Evaluating inference ... ")
         # get dict of name conversion
-        dict_names = {}
-        lines = open(parsed.dict_conv, "r").readlines()
-        for line in lines:
-            dict_names[line.split()[1]] = line.split()[0]
+        dict_names = rank_cache.get_name_dict(parsed.dict_conv)
         # compute pairwise correlation of query and inferrred motif
         for i in range(len(data_out)):
             # only evaluate the tfs available in scertf 
-            if data_out[i][1] == None:
+            if len(data_out[i]) > 4:
+                # kept from the previous results
+                continue
+            elif data_out[i][1] == None:
                 data_out[i].append(-1)
             elif data_out[i][0] not in dict_names.keys():
                 data_out[i].append(-2)
             else:
-                dict_ranklist_inferred = {}
-                lines = open(parsed.dir_cisbp_rank + data_out[i][1], "r").readlines()
-                for line in lines:
-                    dict_ranklist_inferred[line.split()[0]] = float(line.split()[1])
-                names_query_ordered = []
-                ranklist_query = []
-                ranklist_inferred = []
-                lines = open(parsed.dir_scertf_rank + dict_names[data_out[i][0]], "r").readlines()
-                for line in lines:
-                    names_query_ordered.append(line.split()[0])
-                    ranklist_query.append(line.split()[1])
-                    ranklist_inferred.append(dict_ranklist_inferred[line.split()[0]])
+                dict_ranklist_inferred = rank_cache.get_dict(parsed.dir_cisbp_rank, data_out[i][1])
+                [names_query_ordered, ranklist_query] = rank_cache.get_list(parsed.dir_scertf_rank, dict_names[data_out[i][0]])
+                ranklist_inferred = [dict_ranklist_inferred[name] for name in names_query_ordered]
                 corr_query_inferred = scipy.stats.spearmanr(ranklist_query, ranklist_inferred)[0]
                 if numpy.isnan(corr_query_inferred):
                     data_out[i].append(0)
@@ -145,7 +121,7 @@ def main(argv):
         sys.stdout.write("Done\n")
         """ Present and write results """
         # write data
-        writer = open(parsed.dir_output + "dbl_flt_pid_knn_" + str(knn) + ".txt", "w")
+        writer = open(fns_output[k], "w")
         writer.write("#query_motif\tinferred_motif\tdbd_aaid\tnp_cisbp_corr\tscertf_cisbp_corr\n")
         for datum in data_out:
             if datum[1] == None:
@@ -163,129 +139,87 @@ def main(argv):
     for k in range(len(knns)):
         plt.subplot(len(knns), 1, k+1)
         plt.hist(data_arr[k], bins=25)
-        plt.title("Scertf Evaluation of Inference with DBD PID " + str(knns[k]) + "-NN")
+        if parsed.method == "knn_pct":
+            plt.title("Scertf Evaluation of Inference with DBD PID kNN of " + str(knns[k]) + "%")
+        else:
+            plt.title("Scertf Evaluation of Inference with DBD PID " + str(knns[k]) + "-NN")
     # plt.show()
-    plt.savefig(parsed.dir_output + "dbl_flt_pid_knn.png")
+    if parsed.method == "knn_pct":
+        plt.savefig(parsed.dir_output + "dbl_flt_pid_knn_pct.png")
+    else:
+        plt.savefig(parsed.dir_output + "dbl_flt_pid_knn.png")
+
+def infer_query(dir_dbd_aaid, query, fn_corr_np, method, knns, motifs_changed=None):
+    """ Infer the most informative motif of a query for each k in knns, reading its aaid list
+    and np corr file once. Returns [motif, aaid, np corr] for each k, or [None, -1, -1] if no
+    filtered motif has an np corr. Given a set of changed motifs for each k (None to infer it
+    whole), returns None for each k whose filtered motifs include none of its changed motifs, and
+    reads the np corrs only if needed. """
+    # parse aaids of the query, sorted by decreasing percent identity
+    [names_dbd, aaids] = dbd_pid.get_aaid_list(dir_dbd_aaid, query)
+    motifs_aaid = [name.split(':')[0] for name in names_dbd]
+    counts = [count_filtered(aaids, method, knn) for knn in knns]
+    affected = [True] * len(knns)
+    if motifs_changed is not None:
+        affected = [motifs_changed[k] is None or any(motif in motifs_changed[k] for motif in motifs_aaid[:counts[k]]) \
+            for k in range(len(knns))]
+        if not any(affected):
+            return [None] * len(knns)
+    # parse np corrs of the query
+    motifs_np_all = []
+    corrs_np_all = []
+    for line in open(fn_corr_np, "r"):
+        line = line.split()
+        motifs_np_all.append(line[0])
+        corrs_np_all.append(0 if line[1] == "nan" else float(line[1]))
+    # rank the np motifs by decreasing corr, ties in file order, so the best filtered motif 
+    # is the one with the lowest rank
+    order = numpy.lexsort((numpy.arange(len(corrs_np_all)), -numpy.array(corrs_np_all)))
+    ranks_np = numpy.empty(len(order), dtype=int)
+    ranks_np[order] = numpy.arange(len(order))
+    dict_ranks_np = {}
+    for j in range(len(motifs_np_all)):
+        if ranks_np[j] < dict_ranks_np.get(motifs_np_all[j], len(order)):
+            dict_ranks_np[motifs_np_all[j]] = ranks_np[j]
+    # best np rank among each leading run of the aaid list
+    ranks_aaid = numpy.array([dict_ranks_np.get(motif, len(order)) for motif in motifs_aaid], dtype=int)
+    prefix_best = numpy.minimum.accumulate(ranks_aaid) if len(ranks_aaid) else ranks_aaid
+    dict_aaids = {}
+    for j in range(len(motifs_aaid)):
+        dict_aaids.setdefault(motifs_aaid[j], aaids[j])
+
+    inferred = [None] * len(knns)
+    for k in range(len(knns)):
+        n = counts[k]
+        if not affected[k]:
+            continue
+        elif n == 0 or prefix_best[n-1] == len(order):
+            inferred[k] = [None, -1, -1]
+        else:
+            index_np_max = order[prefix_best[n-1]]
+            motif_np_max = motifs_np_all[index_np_max]
+            inferred[k] = [motif_np_max, dict_aaids[motif_np_max], corrs_np_all[index_np_max]]
+    return inferred
 
-    """ Percentage PID k Nearest Neighbor """
-    # elif parsed.method == "knn_pct":
-    # else:
+def get_fn_output(parsed, knn):
+    if parsed.method == "knn_pct":
+        return parsed.dir_output + "dbl_flt_pid_knn_pct" + str(knn) + ".txt"
+    return parsed.dir_output + "dbl_flt_pid_knn_" + str(knn) + ".txt"
 
-    # # the percentages of the nearest neighbor's percent identity
-    # knns = [10, 20, 30]
-    # data_arr = [None] * len(knns)      
-    # for k in range(len(knns)):
-    #     """ Infer motifs by double filtering """
-    #     knn = knns[k]
-    #     sys.stdout.write("\rProcessing inference ... ")
-    #     # get motifs names from both dbd and netprophet
-    #     names_aaid = get_names(parsed.dir_dbd_aaid)
-    #     names_np = get_names(parsed.dir_corr_np)
-    #     names_common = list(set(names_aaid) & set(names_np))
-    #     count_not_inferred = 0
-    #     data_out = [None] * len(names_common)
-    #     for i in range(len(names_common)):
-    #         query = names_common[i]
-    #         # parse and filter aaids of the query
-    #         motifs_filtered = []
-    #         aaid_filtered = []
-    #         lines = open(parsed.dir_dbd_aaid + query + ".aaid", "r").readlines()
-    #         max_aaid = float(lines[0].split()[1])
-    #         for j in range(len(lines)):
-    #             line = lines[j].split()
-    #             # get the nearest neighbor with percent identity percentage in scope
-    #             if float(line[1]) >= max_aaid*(1-float(knn)/100):
-    #                 motifs_filtered.append(line[0].split(':')[0])
-    #                 aaid_filtered.append(float(line[1]))
-    #             else:
-    #                 break
-    #         if not motifs_filtered:
-    #             count_not_inferred += 1
-    #             data_out[i] = [query, None, -1, -1]
-    #         else:
-    #             # parse np corrs of the query
-    #             lines = open(parsed.dir_corr_np + query, "r").readlines()
-    #             motifs_np_all = [None] * len(lines)
-    #             corrs_np_all = [None] * len(lines)
-    #             indices_np_filtered = []
-    #             for j in range(len(lines)):
-    #                 line = lines[j].split()
-    #                 motifs_np_all[j] = line[0]
-    #                 corrs_np_all[j] = 0 if line[1] == "nan" else float(line[1])
-    #                 if line[0] in motifs_filtered:
-    #                     indices_np_filtered.append(j)
-    #             # temp_rank = scipy.stats.rankdata(corrs_np_all)
-    #             # rank_corrs_np_all = len(corrs_np_all) + 1 - temp_rank
-    #             # find the most informative motif 
-    #             index_np_max = indices_np_filtered[0]
-    #             motif_np_max = motifs_np_all[index_np_max]
-    #             corr_np_max = corrs_np_all[index_np_max]
-    #             for j in range(1,len(indices_np_filtered)):
-    #                 temp_motif = motifs_np_all[indices_np_filtered[j]]
-    #                 temp_corr = corrs_np_all[indices_np_filtered[j]]
-    #                 if corrs_np_all[indices_np_filtered[j]] > corr_np_max:
-    #                     index_np_max = indices_np_filtered[j]
-    #                     motif_np_max = motifs_np_all[index_np_max]
-    #                     corr_np_max =corrs_np_all[index_np_max]
-    #             # rank_corr_np_max = rank_corrs_np_all[index_np_max]
-    #             aaid_max = aaid_filtered[motifs_filtered.index(motif_np_max)]
-    #             data_out[i] = [query, motif_np_max, aaid_max, corr_np_max]
-    #     sys.stdout.write("Done\n")
-    #     """ Evaluate inference """
-    #     sys.stdout.write("Evaluating inference ... ")
-    #     # get dict of name conversion
-    #     dict_names = {}
-    #     lines = open(parsed.dict_conv, "r").readlines()
-    #     for line in lines:
-    #         dict_names[line.split()[1]] = line.split()[0]
-    #     # compute pairwise correlation of query and inferrred motif
-    #     for i in range(len(data_out)):
-    #         if data_out[i][1] == None:
-    #             data_out[i].append(-1)
-    #         elif data_out[i][0] not in dict_names.keys():
-    #             data_out[i].append(-2)
-    #         else:
-    #             dict_ranklist_inferred = {}
-    #             lines = open(parsed.dir_cisbp_rank + data_out[i][1], "r").readlines()
-    #             for line in lines:
-    #                 dict_ranklist_inferred[line.split()[0]] = float(line.split()[1])
-    #             names_query_ordered = []
-    #             ranklist_query = []
-    #             ranklist_inferred = []
-    #             lines = open(parsed.dir_scertf_rank + dict_names[data_out[i][0]], "r").readlines()
-    #             for line in lines:
-    #                 names_query_ordered.append(line.split()[0])
-    #                 ranklist_query.append(line.split()[1])
-    #                 ranklist_inferred.append(dict_ranklist_inferred[line.split()[0]])
-    #             corr_query_inferred = scipy.stats.spearmanr(ranklist_query, ranklist_inferred)[0]
-    #             if numpy.isnan(corr_query_inferred):
-    #                 data_out[i].append(0)
-    #             else:
-    #                 data_out[i].append(corr_query_inferred)
-    #     sys.stdout.write("Done\n")
-    #     """ Present and write results """
-    #     # write data
-    #     writer = open(parsed.dir_output + "dbl_flt_pid_knn_pct" + str(knn) + ".txt", "w")
-    #     writer.write("#query_motif\tinferred_motif\tdbd_aaid\tnp_cisbp_corr\tscertf_cisbp_corr\n")
-    #     for datum in data_out:
-    #         if datum[1] == None:
-    #             writer.write("%s\tNone\tNone(-1)\tNone(-1)\tNone(-1)\n" % datum[0])
-    #         elif datum[4] == -2:
-    #             writer.write("%s\t%s\t%.5f\t%.5f\tNone(-2)\n" % (datum[0], datum[1], datum[2], datum[3]))
-    #         else:
-    #             writer.write("%s\t%s\t%.5f\t%.5f\t%.5f\n" % (datum[0], datum[1], datum[2], datum[3], datum[4]))
-    #     writer.close()
-    #     data_out = numpy.array(data_out)
-    #     data_arr[k] = numpy.transpose(data_out[:, 4]).astype(float)
-    #     data_arr[k] = numpy.delete(data_arr[k], numpy.where(data_arr[k] == -2))
-    # # plot histograms
-    # plt.figure(num=None, figsize=(10,18), dpi=80)
-    # for k in range(len(knns)):
-    #     plt.subplot(len(knns), 1, k+1)
-    #     plt.hist(data_arr[k], bins=25)
-    #     plt.title("Scertf Evaluation of Inference with DBD PID kNN of " + str(knns[k]) + "%")
-    # # plt.show()
-    # plt.savefig(parsed.dir_output + "dbl_flt_pid_knn_pct.png")
+def count_filtered(aaids, method, knn):
+    """ Number of leading aaids that pass the filter of method with k (or percentage) knn. """
+    n = 0
+    if method == "knn_pct":
+        # get the nearest neighbor with percent identity percentage in scope
+        while n < len(aaids) and aaids[n] >= aaids[0]*(1-float(knn)/100):
+            n += 1
+    else:
+        # get the k nearest neighbors, and include k+ neighbors which have the same 
+        # percent idenities as the k(th) nearest neighbors does
+        n = min(knn, len(aaids))
+        while n < len(aaids) and aaids[n] == aaids[n-1]:
+            n += 1
+    return n
 
 def check_dir(file_dir):
     if not file_dir.endswith('/'):
@@ -21,17 +21,26 @@ import numpy
 import quantile_norm as qn
 import bidirect_norm as bn
 import matplotlib.pyplot as plt
+import rank_cache
+import dbd_pid
 import time
+import multiprocessing
+
+# time.perf_counter is not available before python 3.3
+timer = getattr(time, "perf_counter", time.time)
 
 def parse_args(argv):
     parser = argparse.ArgumentParser(description="Infer the most informative motif")
     parser.add_argument('-m', '-method', dest='method', type=str)
-    parser.add_argument('-a', '-dir_dbd_aaid', dest='dir_dbd_aaid', type=str)
+    parser.add_argument('-a', '-dir_dbd_aaid', dest='dir_dbd_aaid', type=str, \
+        help="Directory of .aaid lists, or a DBD percent identity matrix store (see dbd_pid)")
     parser.add_argument('-n', '-dir_corr_np', dest='dir_corr_np', type=str)
     parser.add_argument('-o', '-dir_output', dest='dir_output', type=str)
     parser.add_argument('-d', '-dict_conv', dest='dict_conv', type=str, default='resources/np_scertf_names.txt')
     parser.add_argument('-c', '-dir_cisbp_rank', dest='dir_cisbp_rank', type=str)
     parser.add_argument('-s', '-dir_scertf_rank', dest='dir_scertf_rank', type=str)
+    parser.add_argument('-w', '--workers', dest='workers', type=int, default=1, \
+        help="Number of processes to infer the queries with")
     parsed = parser.parse_args(argv[1:])
     return parsed
 
@@ -50,71 +59,32 @@ def main(argv):
     sys.stdout.write("\rProcessing inference ... ")
 
     # get motifs names from both dbd and netprophet
-    names_aaid = get_names(parsed.dir_dbd_aaid)
+    names_aaid = dbd_pid.get_queries(parsed.dir_dbd_aaid)
     names_np = get_names(parsed.dir_corr_np)
     names_common = list(set(names_aaid) & set(names_np))
     data_out = [None] * len(names_common)
 
-    for i in range(len(names_common)):
-        query = names_common[i]
-        tic = time.clock()
-        # parse aaids and np correlations of the query
-        [motifs_dbd_all, aaids_dbd_all] = parse_scores(parsed.dir_dbd_aaid + query + ".aaid")            
-        [motifs_np_all, corrs_np_all] = parse_scores(parsed.dir_corr_np + query)
-
-        # sort the scores with the same motif order
-        dict_dbd_all = {}
-        for j in range(len(motifs_dbd_all)):
-            temp_motif = motifs_dbd_all[j].split(':')[0]
-            if temp_motif not in dict_dbd_all:
-                dict_dbd_all[temp_motif] = aaids_dbd_all[j]
-            else:
-                if aaids_dbd_all[j] > dict_dbd_all[temp_motif]:
-                    dict_dbd_all[temp_motif] = aaids_dbd_all[j]
-        aaids_dbd_all = [None] * len(motifs_np_all)
-        for j in range(len(motifs_np_all)):
-            aaids_dbd_all[j] = dict_dbd_all[motifs_np_all[j]] if motifs_np_all[j] in dict_dbd_all else float(0)
-
-        scores_orig = numpy.array([aaids_dbd_all, corrs_np_all])
-
-        # standard quantile normalization of the socres
-        if parsed.method == "standard":
-            scores_norm = qn.quantile_norm(scores_orig)
-            scores_avg = (scores_norm[0,:] + scores_norm[1,:]) / 2
-            rank_scores_avg = scipy.stats.rankdata(scores_avg)
-
-        # quantile normalize the socres with prenormalization
-        elif parsed.method == "prenorm":  
-            for j in range(2):
-                scores_orig[j] = scores_orig[j] / float(numpy.max(scores_orig[j]) - float(numpy.min(scores_orig[j])))
-            scores_norm = qn.quantile_norm(scores_orig)
-            scores_avg = (scores_norm[0,:] + scores_norm[1,:]) / 2
-            rank_scores_avg = scipy.stats.rankdata(scores_avg) 
-
-        # bidirection normalization
-        elif parsed.method == "bidirect":
-            rank_scores_avg = bn.bidirect_norm(scores_orig)
-
-        # find the motif of the highest ranking 
-        index = numpy.argmax(rank_scores_avg)
-        motif_max = motifs_np_all[index]
-        aaid_max = aaids_dbd_all[index]/100
-        corr_np_max = corrs_np_all[index]
-        data_out[i] = [query, motif_max, aaid_max, corr_np_max]
-
-        toc = time.clock()
-        print i, query, toc-tic
-        
+    tasks = [[query, parsed.method, parsed.dir_dbd_aaid, parsed.dir_corr_np] for query in names_common]
+    if parsed.workers > 1:
+        # queries are independent; imap returns them in submission order
+        pool = multiprocessing.Pool(parsed.workers)
+        results = pool.imap(infer_query, tasks)
+    else:
+        results = (infer_query(task) for task in tasks)
+    for i, [datum, elapsed] in enumerate(results):
+        data_out[i] = datum
+        print i, names_common[i], elapsed
+    if parsed.workers > 1:
+        pool.close()
+        pool.join()
+
     sys.stdout.write("Done\n")
         
     """ Evaluate inference """
     sys.stdout.write("\rEvaluate inference ... ")
 
     # get dict of name conversion
-    dict_names = {}
-    lines = open(parsed.dict_conv, "r").readlines()
-    for line in lines:
-        dict_names[line.split()[1]] = line.split()[0]
+    dict_names = rank_cache.get_name_dict(parsed.dict_conv)
 
     # compute pairwise correlation of query and inferred motif
     for i in range(len(data_out)):
@@ -124,18 +94,9 @@ def main(argv):
         elif data_out[i][0] not in dict_names.keys():
             data_out[i].append(-2)
         else:
-            dict_ranklist_inferred = {}
-            lines = open(parsed.dir_cisbp_rank + data_out[i][1], "r").readlines()
-            for line in lines:
-                dict_ranklist_inferred[line.split()[0]] = float(line.split()[1])
-            names_query_ordered = []
-            ranklist_query = []
-            ranklist_inferred = []
-            lines = open(parsed.dir_scertf_rank + dict_names[data_out[i][0]], "r").readlines()
-            for line in lines:
-                names_query_ordered.append(line.split()[0])
-                ranklist_query.append(line.split()[1])
-                ranklist_inferred.append(dict_ranklist_inferred[line.split()[0]])
+            dict_ranklist_inferred = rank_cache.get_dict(parsed.dir_cisbp_rank, data_out[i][1])
+            [names_query_ordered, ranklist_query] = rank_cache.get_list(parsed.dir_scertf_rank, dict_names[data_out[i][0]])
+            ranklist_inferred = [dict_ranklist_inferred[name] for name in names_query_ordered]
             corr_query_inferred = scipy.stats.spearmanr(ranklist_query, ranklist_inferred)[0]
 
             if numpy.isnan(corr_query_inferred):
@@ -167,6 +128,56 @@ def main(argv):
     plt.title("Motif Inference by Quantile Normalization _" + parsed.method)
     plt.savefig(parsed.dir_output + "quantile_normalization_" + parsed.method + ".png")
 
+def infer_query(task):
+    """ Infer the motif of one query; task is [query, method, dir_dbd_aaid, dir_corr_np]. """
+    [query, method, dir_dbd_aaid, dir_corr_np] = task
+    tic = timer()
+    # parse aaids and np correlations of the query
+    [motifs_dbd_all, aaids_dbd_all] = dbd_pid.get_aaid_list(dir_dbd_aaid, query)
+    [motifs_np_all, corrs_np_all] = parse_scores(dir_corr_np + query)
+
+    # sort the scores with the same motif order
+    dict_dbd_all = {}
+    for j in range(len(motifs_dbd_all)):
+        temp_motif = motifs_dbd_all[j].split(':')[0]
+        if temp_motif not in dict_dbd_all:
+            dict_dbd_all[temp_motif] = aaids_dbd_all[j]
+        else:
+            if aaids_dbd_all[j] > dict_dbd_all[temp_motif]:
+                dict_dbd_all[temp_motif] = aaids_dbd_all[j]
+    aaids_dbd_all = [None] * len(motifs_np_all)
+    for j in range(len(motifs_np_all)):
+        aaids_dbd_all[j] = dict_dbd_all[motifs_np_all[j]] if motifs_np_all[j] in dict_dbd_all else float(0)
+
+    scores_orig = numpy.array([aaids_dbd_all, corrs_np_all])
+
+    # standard quantile normalization of the socres
+    if method == "standard":
+        scores_norm = qn.quantile_norm(scores_orig)
+        scores_avg = (scores_norm[0,:] + scores_norm[1,:]) / 2
+        rank_scores_avg = scipy.stats.rankdata(scores_avg)
+
+    # quantile normalize the socres with prenormalization
+    elif method == "prenorm":  
+        for j in range(2):
+            scores_orig[j] = scores_orig[j] / float(numpy.max(scores_orig[j]) - float(numpy.min(scores_orig[j])))
+        scores_norm = qn.quantile_norm(scores_orig)
+        scores_avg = (scores_norm[0,:] + scores_norm[1,:]) / 2
+        rank_scores_avg = scipy.stats.rankdata(scores_avg) 
+
+    # bidirection normalization
+    elif method == "bidirect":
+        rank_scores_avg = bn.bidirect_norm(scores_orig)
+
+    # find the motif of the highest ranking 
+    index = numpy.argmax(rank_scores_avg)
+    motif_max = motifs_np_all[index]
+    aaid_max = aaids_dbd_all[index]/100
+    corr_np_max = corrs_np_all[index]
+
+    toc = timer()
+    return [[query, motif_max, aaid_max, corr_np_max], toc-tic]
+
 def check_dir(file_dir):
     if not file_dir.endswith('/'):
         file_dir += '/'
@@ -0,0 +1,79 @@
+#!/usr/bin/python
+
+"""
+Bookkeeping of incremental updates of the np corr files (compt_np_cisbp_rks_corr.py -u), so the
+double filter inferences are only run again for the queries an update can have changed.
+
+Each update appends to a log in the corr directory the time, the database motifs whose corrs it
+recomputed or removed, and the queries whose corr files it recomputed whole; a full run starts
+the log over. A results file is checked against the changes logged after it was written: a query
+keeps its previous result unless one of those motifs passes its dbd filter, it is one of those
+queries, or its aaid file is newer than the previous results.
+"""
+
+import os.path
+import time
+import dbd_pid
+
+FN_CHANGED = "_changed.txt"
+
+def write_changed(dir_corr, motifs, queries, append=True):
+    """ Log the changes of a run at the current time, after those of earlier updates, or in place
+    of them (a full run). """
+    stamp = repr(time.time())
+    writer = open(os.path.join(dir_corr, FN_CHANGED), "a" if append else "w")
+    writer.write("".join(["%s\tmotif\t%s\n" % (stamp, motif) for motif in motifs] + \
+        ["%s\tquery\t%s\n" % (stamp, query) for query in queries]))
+    writer.close()
+
+def read_changed(dir_corr, fn_results=None):
+    """ Returns [set of changed motifs, set of changed queries] of the updates of dir_corr logged
+    after fn_results was written (all of them, if it is None or missing), or None if dir_corr has
+    no log. """
+    fn = os.path.join(dir_corr, FN_CHANGED)
+    if not os.path.isfile(fn):
+        return None
+    since = 0
+    if fn_results is not None and os.path.isfile(fn_results):
+        since = os.path.getmtime(fn_results)
+    changed = {"motif": set(), "query": set()}
+    for line in open(fn, "r"):
+        linesplit = line.split()
+        if len(linesplit) == 2:
+            # a record of the last update only, without a time, newer than any results
+            linesplit = ["inf"] + linesplit
+        if len(linesplit) == 3 and float(linesplit[0]) >= since:
+            changed[linesplit[1]].add(linesplit[2])
+    return [changed["motif"], changed["query"]]
+
+def read_results(fn):
+    """ Returns {query: [query, motif, aaid, np corr, scertf corr]} of the results file of a
+    double filter inference, with -1 for uninferred and -2 for unevaluated values. """
+    results = {}
+    if not os.path.isfile(fn):
+        return results
+    for line in open(fn, "r"):
+        linesplit = line.split()
+        if not linesplit or linesplit[0].startswith("#"):
+            continue
+        if linesplit[1] == "None":
+            results[linesplit[0]] = [linesplit[0], None, -1, -1, -1]
+        else:
+            corr_scertf = -2 if linesplit[4] == "None(-2)" else float(linesplit[4])
+            results[linesplit[0]] = [linesplit[0], linesplit[1], float(linesplit[2]), \
+                float(linesplit[3]), corr_scertf]
+    return results
+
+def get_stale(queries, changed, dir_dbd_aaid, fn_results, results):
+    """ Returns the set of queries to infer again whole: all of them without an update log,
+    else those missing from results, recomputed whole by the updates since fn_results (changed, as
+    read_changed(dir_corr, fn_results)), or whose aaid list is newer than fn_results. """
+    if changed is None or not os.path.isfile(fn_results):
+        return set(queries)
+    mtime = os.path.getmtime(fn_results)
+    stale = set()
+    for query in queries:
+        if query not in results or query in changed[1] or \
+            dbd_pid.get_mtime(dir_dbd_aaid, query) > mtime:
+            stale.add(query)
+    return stale
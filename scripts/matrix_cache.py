@@ -0,0 +1,175 @@
+#!/usr/bin/python
+
+"""
+On-disk cache of score matrices parsed from text files, under cache_dir (the MATRIX_CACHE_DIR
+environment variable or set_cache_dir; nothing is cached while it is None).
+
+A directory of per-row files (fimo summaries, rank lists) is cached as a rank store (see
+rank_store) with one row per file, in an entry named by a hash of the source directory, the file
+pattern and the kind of parse. A stamp file next to it records the mtime and size of every source
+file. While the stamps match, the stored matrix is memory-mapped as is; otherwise only the rows
+of added or changed files are parsed again, and the rows of removed files dropped.
+"""
+
+import os
+import glob
+import hashlib
+import multiprocessing
+import numpy
+import rank_store
+
+FN_STAMPS = "_stamps.txt"
+
+cache_dir = os.environ.get("MATRIX_CACHE_DIR")
+
+# sources loaded by this process: [matrix, rows, cols, dict of row name to index, dict of col to index]
+_loaded = {}
+
+def set_cache_dir(dirname):
+    global cache_dir
+    cache_dir = dirname
+    _loaded.clear()
+
+def entry_dir(source, kind):
+    key = hashlib.sha1((kind + "\t" + source).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, "%s_%s" % (kind, key[:16]))
+
+def file_stamp(fn):
+    st = os.stat(fn)
+    return "%.6f\t%d" % (st.st_mtime, st.st_size)
+
+def read_stamps(fn):
+    stamps = {}
+    if os.path.isfile(fn):
+        for line in open(fn, "r"):
+            linesplit = line.rstrip("\n").split("\t", 1)
+            if len(linesplit) == 2:
+                stamps[linesplit[0]] = linesplit[1]
+    return stamps
+
+def write_entry(entry, matrix, rows, cols, stamps):
+    """ Write an entry through a temporary directory and rename its files into place, so
+    matrices already mapped by other processes stay valid. The stamps go last. """
+    tmp = "%s.tmp%d" % (entry, os.getpid())
+    rank_store.save_store(tmp, matrix, rows, cols)
+    rank_store.write_names(os.path.join(tmp, FN_STAMPS), \
+        ["%s\t%s" % (name, stamps[name]) for name in sorted(stamps)])
+    if not os.path.exists(entry):
+        os.makedirs(entry)
+    for fn in [rank_store.FN_MATRIX, rank_store.FN_ROWS, rank_store.FN_COLS, FN_STAMPS]:
+        os.rename(os.path.join(tmp, fn), os.path.join(entry, fn))
+    os.rmdir(tmp)
+
+def parse_files(parse, fns, workers=1):
+    if workers > 1 and len(fns) > 1:
+        pool = multiprocessing.Pool(workers)
+        dicts = pool.map(parse, fns)
+        pool.close()
+        pool.join()
+        return dicts
+    return [parse(fn) for fn in fns]
+
+def merge_rows(old, names, parsed):
+    """ Returns [matrix, cols] of the rows in names, taken from parsed ({name: dict}) when
+    present and from old ([matrix, rows, cols]) otherwise. """
+    [old_matrix, old_rows, old_cols] = old
+    old_index = dict((r, i) for i, r in enumerate(old_rows))
+    kept = [old_index[name] for name in names if name not in parsed]
+    # only the columns still used by a row
+    used = numpy.zeros(len(old_cols), dtype=bool)
+    if kept:
+        used = numpy.any(~numpy.isnan(old_matrix[kept]), axis=0)
+    cols = set(old_cols[j] for j in numpy.flatnonzero(used))
+    for d in parsed.values():
+        cols.update(d)
+    cols = sorted(cols)
+
+    col_index = dict((c, j) for j, c in enumerate(cols))
+    old_to_new = numpy.array([col_index.get(c, -1) for c in old_cols], dtype=int)
+    matrix = numpy.empty((len(names), len(cols)))
+    matrix[:] = numpy.nan
+    for i, name in enumerate(names):
+        if name in parsed:
+            d = parsed[name]
+            matrix[i, [col_index[c] for c in d]] = list(d.values())
+        else:
+            values = numpy.asarray(old_matrix[old_index[name]])
+            matrix[i, old_to_new[used]] = values[used]
+    return [matrix, cols]
+
+def load_dir(dirname, kind, parse, pattern="*", workers=1):
+    """ Returns [matrix, rows, cols, row index, col index] of the files of dirname matching
+    pattern, one row per file named by its basename (files starting with "_" are skipped).
+    parse(fn) returns the {col: value} dict of a file; the cols are the sorted union of their
+    keys and missing values are nan. parse must be picklable when workers > 1. """
+    source = os.path.join(os.path.abspath(dirname), pattern)
+    if (source, kind) in _loaded:
+        return _loaded[(source, kind)]
+
+    fns = {}
+    for fn in glob.glob(source):
+        if not os.path.basename(fn).startswith("_"):
+            fns[os.path.basename(fn)] = fn
+    names = sorted(fns)
+    stamps = dict((name, file_stamp(fns[name])) for name in names)
+
+    old = [numpy.zeros((0, 0)), [], []]
+    old_stamps = {}
+    if cache_dir is not None:
+        entry = entry_dir(source, kind)
+        if rank_store.is_store(entry):
+            old_stamps = read_stamps(os.path.join(entry, FN_STAMPS))
+            old = rank_store.load_store(entry)
+            if set(old[1]) != set(old_stamps):
+                old = [numpy.zeros((0, 0)), [], []]
+                old_stamps = {}
+
+    if old_stamps == stamps:
+        [matrix, rows, cols] = old
+    else:
+        changed = [name for name in names if old_stamps.get(name) != stamps[name]]
+        dicts = parse_files(parse, [fns[name] for name in changed], workers)
+        [matrix, cols] = merge_rows(old, names, dict(zip(changed, dicts)))
+        rows = names
+        if cache_dir is not None:
+            write_entry(entry, matrix, rows, cols, stamps)
+            [matrix, rows, cols] = rank_store.load_store(entry)
+
+    loaded = [matrix, rows, cols, dict((r, i) for i, r in enumerate(rows)), \
+        dict((c, j) for j, c in enumerate(cols))]
+    _loaded[(source, kind)] = loaded
+    return loaded
+
+def get_list(dirname, name, kind, parse, pattern="*"):
+    """ Returns [cols, values] of the values of one file of load_dir. """
+    [matrix, rows, cols, row_index, col_index] = load_dir(dirname, kind, parse, pattern)
+    values = numpy.asarray(matrix[row_index[name]])
+    indices = numpy.flatnonzero(~numpy.isnan(values))
+    return [[cols[j] for j in indices], list(values[indices])]
+
+def select(dirname, kind, parse, names, cols, pattern="*", workers=1, fill=0):
+    """ Returns the len(names) x len(cols) submatrix of load_dir for the given file names and
+    columns; missing files, columns and values are fill. """
+    [matrix, rows, all_cols, row_index, col_index] = load_dir(dirname, kind, parse, pattern, workers)
+    out = numpy.empty((len(names), len(cols)))
+    out[:] = fill
+    out_rows = [i for i, name in enumerate(names) if name in row_index]
+    out_cols = [j for j, col in enumerate(cols) if col in col_index]
+    if out_rows and out_cols:
+        sub = matrix[[row_index[names[i]] for i in out_rows]][:, [col_index[cols[j]] for j in out_cols]]
+        out[numpy.ix_(out_rows, out_cols)] = numpy.where(numpy.isnan(sub), fill, sub)
+    return out
+
+def load_file(fn, kind, parse):
+    """ Returns [matrix, rows, cols] of a single matrix file; parse(fn) returns the same. The
+    cached matrix is used while the file's mtime and size are unchanged. """
+    source = os.path.abspath(fn)
+    stamps = {os.path.basename(fn): file_stamp(fn)}
+    if cache_dir is None:
+        return parse(fn)
+    entry = entry_dir(source, kind)
+    if rank_store.is_store(entry) and read_stamps(os.path.join(entry, FN_STAMPS)) == stamps:
+        return rank_store.load_store(entry)
+    [matrix, rows, cols] = parse(fn)
+    write_entry(entry, matrix, rows, cols, stamps)
+    return rank_store.load_store(entry)
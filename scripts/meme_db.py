@@ -0,0 +1,140 @@
+#!/usr/bin/python
+
+"""
+Parse motif files (CIS-BP PWMs, ScerTF data files, MEME files) into position x ACGT frequency
+matrices, and write them as MEME motifs, one file per motif or all of them in one MEME database
+with a shared header, so FIMO scans every motif in one pass over the promoters.
+
+Along with a database goes an index (database + FN_INDEX_SUFFIX) of the motif names, their byte
+offsets in the database and their widths.
+"""
+
+import os
+import multiprocessing
+
+MEME_HEADER = "MEME version 4.9.1\n\nALPHABET= ACGT\n\nstrands: + -\n"
+FN_INDEX_SUFFIX = ".index"
+
+# default background of each format
+BACKGROUNDS = {"cisbp": None, "scertf": "A 0.3 C 0.2 G 0.2 T 0.3"}
+
+def get_motif_name(input_fn, fmt):
+    """ cisbp files are named <motif>.txt, scertf files <author>.<tf>. """
+    if fmt == "scertf":
+        return os.path.splitext(os.path.basename(input_fn))[1].replace(".", "")
+    return os.path.splitext(os.path.basename(input_fn))[0]
+
+def parse_cisbp(fn):
+    """ Frequencies of a CIS-BP PWM file: a header line, then "pos A C G T" lines. """
+    lines = open(fn, "r").readlines()
+    return [[float(value) for value in line.split()[1:5]] for line in lines[1:] if line.split()]
+
+def parse_scertf(fn):
+    """ Frequencies of a ScerTF data file: one line of frequencies for each of A, C, G and T. """
+    rows = [[float(item) for item in line.split() if isfloat(item)] for line in open(fn, "r").readlines()[:4]]
+    return [list(column) for column in zip(*rows)]
+
+def format_header(background=None):
+    if background is None:
+        return MEME_HEADER
+    return MEME_HEADER + "\nBackground letter frequencies\n%s\n" % background
+
+def format_motif(motif_name, freqs):
+    """ The MEME text of a motif, from its position x ACGT frequencies. """
+    return "\nMOTIF %s\nletter-probability matrix: alength= 4 w= %d nsites= 20 E= 0\n" % (motif_name, len(freqs)) + \
+        "".join(["%.3f\t%.3f\t%.3f\t%.3f\t\n" % tuple(row[:4]) for row in freqs])
+
+def read_motif(task):
+    """ Returns [motif name, width, MEME text] of a motif file; task is [input_fn, fmt]. """
+    [input_fn, fmt] = task
+    motif_name = get_motif_name(input_fn, fmt)
+    freqs = parse_scertf(input_fn) if fmt == "scertf" else parse_cisbp(input_fn)
+    return [motif_name, len(freqs), format_motif(motif_name, freqs)]
+
+def read_motifs(input_fns, fmt, workers=1):
+    """ Yields read_motif of each file in order, the files read by a pool of workers. """
+    tasks = [[input_fn, fmt] for input_fn in input_fns]
+    if workers > 1:
+        pool = multiprocessing.Pool(workers)
+        for motif in pool.imap(read_motif, tasks, chunksize=16):
+            yield motif
+        pool.close()
+        pool.join()
+    else:
+        for task in tasks:
+            yield read_motif(task)
+
+def write_db(fn_output, motifs, background=None):
+    """ Write the motifs ([name, width, text], as read_motifs) to one MEME database with a shared
+    header, and its index. A motif name seen before is skipped. Returns [written names, skipped
+    names]. """
+    writer = open(fn_output, "w")
+    header = format_header(background)
+    writer.write(header)
+    offset = len(header)
+    index = []
+    seen = set()
+    skipped = []
+    for [motif_name, width, text] in motifs:
+        if motif_name in seen:
+            skipped.append(motif_name)
+            continue
+        seen.add(motif_name)
+        writer.write(text)
+        # offset of the MOTIF line, past the blank line before it
+        index.append("%s\t%d\t%d\n" % (motif_name, offset + 1, width))
+        offset += len(text)
+    writer.close()
+    writer = open(fn_output + FN_INDEX_SUFFIX, "w")
+    writer.write("".join(index))
+    writer.close()
+    return [[line.split("\t")[0] for line in index], skipped]
+
+def read_index(fn_db):
+    """ Returns {motif name: [offset, width]} of the index of a MEME database. """
+    index = {}
+    for line in open(fn_db + FN_INDEX_SUFFIX, "r"):
+        linesplit = line.split()
+        index[linesplit[0]] = [int(linesplit[1]), int(linesplit[2])]
+    return index
+
+def get_motif(fn_db, motif_name, index=None):
+    """ The MEME text of one motif of a database, from MOTIF to its last row. """
+    if index is None:
+        index = read_index(fn_db)
+    [offset, width] = index[motif_name]
+    reader = open(fn_db, "r")
+    reader.seek(offset)
+    lines = [reader.readline() for i in range(width + 2)]
+    reader.close()
+    return "".join(lines)
+
+def parse_meme(fn):
+    """ Returns [background ([A, C, G, T] frequencies, or None), [[motif name, freqs]]] of a MEME
+    file or database. """
+    background = None
+    motifs = []
+    lines = open(fn, "r").readlines()
+    i = 0
+    while i < len(lines):
+        linesplit = lines[i].split()
+        if lines[i].startswith("Background letter frequencies") and i+1 < len(lines):
+            values = lines[i+1].split()
+            freqs = dict((values[k], float(values[k+1])) for k in range(0, len(values)-1, 2))
+            background = [freqs[base] for base in "ACGT"]
+            i += 1
+        elif linesplit and linesplit[0] == "MOTIF":
+            motifs.append([linesplit[1], []])
+        elif lines[i].startswith("letter-probability matrix") and motifs:
+            width = int(lines[i].split("w=")[1].split()[0])
+            motifs[-1][1] = [[float(value) for value in line.split()[:4]] for line in lines[i+1:i+1+width]]
+            i += width
+        i += 1
+    return [background, motifs]
+
+def isfloat(var):
+    try:
+        float(var)
+        return True
+    except ValueError:
+        return False
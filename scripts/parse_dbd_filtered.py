@@ -1,24 +1,26 @@
 #!/usr/bin/python
 
-import numpy
+import argparse
+import fasta_index
+import cisbp_db
 
-motifs = []
-lines = open("../resources/cisbp_all_motifs_no_dir_yeast.txt", "r").readlines()
-for line in lines:
-	motifs.append(line.split()[0])
+parser = argparse.ArgumentParser(description="Write the dbds of the cisbp motifs without direct yeast evidence")
+parser.add_argument('-d', '--cisbp_db', dest='cisbp_db', type=str, \
+	help="SQLite mirror of cisbp (e.g. ../resources/cisbp.db) to list the motifs from, instead of the curated list")
+parsed = parser.parse_args()
 
-writer = open("../resources/cisbp_all_dbds_no_dir_yeast.fasta", "w")
-flag = False
-lines = open("../resources/cisbp_all_dbds.fasta", "r").readlines()
-for i, line in enumerate(lines):
-	if i % 2 == 0:
-		temp_header = line
-		temp_motif = line.split('>')[1].split(':')[0]
-		if temp_motif in motifs:
-			flag = True
-		else:
-			flag = False
-	else:
-		if flag:
-			writer.write("%s%s" % (temp_header, line))
-writer.close()
+# the motifs without direct yeast evidence, from the curated list, or the sqlite mirror of cisbp if given
+if parsed.cisbp_db:
+	motifs = set(cisbp_db.get_motifs(parsed.cisbp_db, exclude_species=["Saccharomyces_cerevisiae"]))
+	print "Motif source:", parsed.cisbp_db, "Count:", len(motifs)
+else:
+	motifs = set()
+	lines = open("../resources/cisbp_all_motifs_no_dir_yeast.txt", "r").readlines()
+	for line in lines:
+		if len(line.split()) > 0:
+			motifs.add(line.split()[0])
+	print "Motif source:", "../resources/cisbp_all_motifs_no_dir_yeast.txt", "Count:", len(motifs)
+
+# stream the records of the motifs through the index of the fasta file
+fasta_index.write_subset("../resources/cisbp_all_dbds.fasta", motifs, \
+	"../resources/cisbp_all_dbds_no_dir_yeast.fasta")
@@ -10,7 +10,8 @@ import sys
 import os
 import argparse
 import numpy
-from scipy.stats import rankdata
+import rank_store
+import matrix_cache
 
 def parse_args(argv):
     ''' A method for taking in command line arguments and specifying
@@ -19,6 +20,12 @@ def parse_args(argv):
     parser.add_argument('-n', '--name', dest='name', type=str)
     parser.add_argument('-i', '--dir_input', dest='dir_input', type=str)
     parser.add_argument('-o', '--dir_output', dest='dir_output', type=str)
+    parser.add_argument('-e', '--edge_count', dest='edge_count', type=int, default=100000, \
+        help="Number of top scoring edges to keep (50k, 100k, 350k as original NetProphet)")
+    parser.add_argument('-s', '--store', dest='store', action='store_true', \
+        help="Write the tf to target scores as one rank store instead of a file per tf")
+    parser.add_argument('-C', '--cache_dir', dest='cache_dir', type=str, \
+        help="Read the bart adjacency matrix through the matrix cache in this directory")
     parsed = parser.parse_args(argv[1:])
     return parsed
 
@@ -31,50 +38,69 @@ def main(argv):
     parsed.dir_input = check_dir(parsed.dir_input)
     parsed.dir_output = check_dir(parsed.dir_output)
 
-    # edge count: 50k, 100k, 350k (original NetProphet)
-    np_edge_count = 100000
-
     # zero out low rank edges
-    lines = open(parsed.dir_input + parsed.name + ".tsv", "r").readlines()
-
-    targets = lines[0].split()
-    tfs = [None] * (len(lines)-1)
-    
-    adjmtr = numpy.ndarray([len(tfs), len(targets)])
-
-    for i in range(1,len(lines)):
-        temp = lines[i].split()
-        tfs[i-1] = temp[0]
-        for j in range(1,len(temp)):
-            adjmtr[i-1, j-1] = float(temp[j])
-
-    rankmtr = adjmtr.shape[0]*adjmtr.shape[1] + 1 - rankdata(adjmtr)
-    indices_low_rank = rankmtr > np_edge_count
-    indices_low_rank = numpy.reshape(indices_low_rank, (len(tfs), len(targets)))
-    adjmtr[indices_low_rank] = 0
+    if parsed.cache_dir:
+        matrix_cache.set_cache_dir(parsed.cache_dir)
+    [adjmtr, tfs, targets] = matrix_cache.load_file(parsed.dir_input + parsed.name + ".tsv", \
+        "bart_adjmtr", parse_adjmtr)
+    adjmtr = numpy.array(adjmtr)
+    adjmtr[~top_edges(adjmtr, parsed.edge_count)] = 0
 
     # write data filtered adjmtr
+    strs = format_scores(adjmtr)
     writer = open(parsed.dir_output + parsed.name + ".adjmtr", "w")
-    for i in range(adjmtr.shape[0]):
-        for j in range(adjmtr.shape[1]):
-            if adjmtr[i, j] == 0:
-                writer.write("0\t")
-            else:
-                writer.write("%0.2f\t" % adjmtr[i, j])
-        writer.write("\n")
+    for start in range(0, len(tfs), 256):
+        writer.write("".join(["\t".join(row) + "\t\n" for row in strs[start:start+256]]))
     writer.close()
 
     # write individual tf to target score files
+    if parsed.store:
+        rank_store.save_store(parsed.dir_output, adjmtr, tfs, targets)
+        return
     for i in range(adjmtr.shape[0]):
         writer = open(parsed.dir_output + tfs[i], "w")
-        writer.write("#target\tscore\n")
-        for j in range(adjmtr.shape[1]):
-            if adjmtr[i, j] == 0:
-                writer.write("%s\t0\n" % targets[j])
-            else:
-                writer.write("%s\t%0.2f\n" % (targets[j], adjmtr[i, j]))
+        writer.write("#target\tscore\n" + "".join([target + "\t" + st + "\n" for target, st in zip(targets, strs[i])]))
         writer.close()
 
+def top_edges(adjmtr, edge_count):
+    """ Mask of the edges ranked within edge_count by decreasing score, ties taking their 
+    average rank as scipy.stats.rankdata does. The edge_count-th highest score is found with
+    a partition, not a full sort. """
+    scores = numpy.ravel(adjmtr)
+    if edge_count <= 0:
+        return numpy.zeros(adjmtr.shape, dtype=bool)
+    if edge_count >= len(scores):
+        return numpy.ones(adjmtr.shape, dtype=bool)
+    threshold = numpy.partition(scores, len(scores)-edge_count)[len(scores)-edge_count]
+    count_greater = numpy.count_nonzero(scores > threshold)
+    count_equal = numpy.count_nonzero(scores == threshold)
+    # the ties at the threshold are kept together if their average rank is within edge_count
+    if count_greater + (count_equal+1)/2.0 <= edge_count:
+        return adjmtr >= threshold
+    return adjmtr > threshold
+
+def format_scores(adjmtr):
+    """ '%0.2f' strings of the scores, with '0' for the zero scores. """
+    strs = numpy.char.mod("%0.2f", adjmtr)
+    strs[adjmtr == 0] = "0"
+    return strs
+
+def parse_adjmtr(fn):
+    """ Returns [adjmtr, tfs, targets] of a bart adjacency matrix tsv file. """
+    lines = open(fn, "r").readlines()
+
+    targets = lines[0].split()
+    tfs = [None] * (len(lines)-1)
+    
+    adjmtr = numpy.zeros([len(tfs), len(targets)])
+
+    # convert a whole row of score strings at once
+    for i in range(1,len(lines)):
+        temp = lines[i].split()
+        tfs[i-1] = temp[0]
+        adjmtr[i-1, :len(temp)-1] = numpy.array(temp[1:], dtype=float)
+    return [adjmtr, tfs, targets]
+
 def check_dir(fd):
     if not fd.endswith('/'):
         fd += '/'
@@ -2,13 +2,16 @@
 
 """
 Given a netprophet adjacency list, outputs a file for each
-regulator with the scores for that regulator's targets.
+regulator with the scores for that regulator's targets, or one
+rank store of all of them.
 """
 
 import sys
 import os
 import argparse
-import csv
+import itertools
+import numpy
+import rank_store
 
 def parse_args(argv):
     ''' A method for taking in command line arguments and specifying
@@ -21,6 +24,11 @@ def parse_args(argv):
                         type=str, default='./processed_hits/')
     parser.add_argument('-t', '--targets', dest='targets',
                         type=str, default=None)
+    parser.add_argument('-s', '--store', dest='store', action='store_true',
+                        help='write the tf to target scores as one rank store instead of a file per tf')
+    parser.add_argument('-c', '--chunk_lines', dest='chunk_lines',
+                        type=int, default=65536,
+                        help='number of adjlst lines to read at a time')
     parsed = parser.parse_args(argv[1:])
     return parsed
 
@@ -36,38 +44,16 @@ def main(argv):
 
     assert parsed.targets != None, 'need to specify a list of target genes!'
 
-    # use a dictionary to hold all the target scores for each
-    # target
-    target_scores = {}
+    # make a list of target genes, and their columns in the score matrix
+    target_genes = []
+    target_index = {}
+    for line in open(parsed.targets):
+        if line.strip() and line.strip() not in target_index:
+            target_index[line.strip()] = len(target_genes)
+            target_genes.append(line.strip())
 
-    # make a list of target genes
-    target_genes = set([line.strip() for line in open(parsed.targets)])
-    targets_unscored = {}
-    all_tfs = []
-
-    reader = open(parsed.netprophet_adjlst)
-    for line in csv.DictReader(reader, delimiter='\t'):
-        # read the items we care about into variables
-        TF_name = line['REGULATOR']
-        target_name = line['TARGET']
-        score = line['SCORE']
-        sign = line['CSIGN']
-        # modify score based on sign
-        if float(sign) < 0:
-            score = str(-1*float(score))
-
-        # check if we have an entry for the TF_name already
-        if TF_name not in target_scores:
-            target_scores[TF_name] = []
-            targets_unscored[TF_name] = set(target_genes)
-            all_tfs.append(TF_name)
-        # keep track of the target_name, score pair for this TF
-        target_scores[TF_name].append((target_name, score))
-        targets_unscored[TF_name].remove(target_name)
-    # add zero scores for each TF:
-    for tf in target_scores:
-        for unscored in targets_unscored[tf]:
-            target_scores[tf].append((unscored, '0'))
+    # stream the adjlst into a tf x target score matrix
+    [scores, all_tfs] = read_adjlst(parsed.netprophet_adjlst, target_index, parsed.chunk_lines)
 
     # check if the output directory exists, and make it if it doesn't
     if not parsed.output_directory.endswith('/'):
@@ -75,18 +61,65 @@ def main(argv):
     if not os.path.exists(parsed.output_directory):
         os.makedirs(parsed.output_directory)
 
-    # loop through our collected scores, outputting files for each TF
-    # containing all the scores
-    for tf in target_scores:
+    if parsed.store:
+        rank_store.save_store(parsed.output_directory, scores, all_tfs, target_genes)
+        return
+
+    # output files for each TF containing all the scores; 
+    # targets without an edge are scored 0
+    strs = numpy.char.mod("%r", scores)
+    strs[scores == 0] = "0"
+    for i in range(len(all_tfs)):
         file_name = os.path.join(parsed.output_directory,
-                                 tf)
-        output_text = "target\tscore"
-        for item in target_scores[tf]:
-            output_text += "\n" + item[0] + "\t" + item[1]
+                                 all_tfs[i])
+        output_text = "target\tscore" + "".join(["\n" + target + "\t" + st for target, st in zip(target_genes, strs[i])])
         writer = open(file_name, 'w')
         writer.write(output_text)
         writer.close()
 
+def read_adjlst(fn, target_index, chunk_lines=65536):
+    """ Returns [scores, tfs]: the signed scores of a netprophet adjlst as a tfs x targets 
+    matrix, with the tfs in order of appearance. The adjlst is read chunk_lines lines at a 
+    time, and the matrix grows by doubling its rows. Raises KeyError for a target not in
+    target_index or an edge listed twice. """
+    reader = open(fn)
+    header = reader.readline().rstrip("\r\n").split("\t")
+    [col_tf, col_target, col_score, col_sign] = [header.index(name) for name in ['REGULATOR', 'TARGET', 'SCORE', 'CSIGN']]
+
+    tf_index = {}
+    all_tfs = []
+    scores = numpy.zeros((16, len(target_index)))
+    scored = numpy.zeros((16, len(target_index)), dtype=bool)
+    while True:
+        lines = list(itertools.islice(reader, chunk_lines))
+        if not lines:
+            break
+        lines = [line.rstrip("\r\n").split("\t") for line in lines if line.strip()]
+        rows = numpy.zeros(len(lines), dtype=int)
+        for k in range(len(lines)):
+            # check if we have an entry for the TF_name already
+            TF_name = lines[k][col_tf]
+            if TF_name not in tf_index:
+                tf_index[TF_name] = len(all_tfs)
+                all_tfs.append(TF_name)
+            rows[k] = tf_index[TF_name]
+        cols = numpy.array([target_index[line[col_target]] for line in lines], dtype=int)
+        chunk_scores = numpy.array([line[col_score] for line in lines], dtype=float)
+        # modify score based on sign
+        signs = numpy.array([line[col_sign] for line in lines], dtype=float)
+        chunk_scores[signs < 0] *= -1
+
+        if len(all_tfs) > len(scores):
+            size = max(2*len(scores), len(all_tfs))
+            scores = numpy.concatenate([scores, numpy.zeros((size-len(scores), len(target_index)))])
+            scored = numpy.concatenate([scored, numpy.zeros((size-len(scored), len(target_index)), dtype=bool)])
+        cells = rows*len(target_index) + cols
+        if numpy.any(scored[rows, cols]) or len(numpy.unique(cells)) < len(cells):
+            raise KeyError("edge listed twice in %s" % fn)
+        scores[rows, cols] = chunk_scores
+        scored[rows, cols] = True
+    reader.close()
+    return [scores[:len(all_tfs)], all_tfs]
 
 if __name__ == "__main__":
     main(sys.argv)
@@ -0,0 +1,173 @@
+#!/usr/bin/python
+
+"""
+Registry of parsed PFMs (position x ACGT frequencies) of variable width, kept like a CSR matrix:
+the rows of all motifs in one contiguous float32 array, and the offset of each motif's first row
+(offsets[i] to offsets[i+1]). A registry is a directory of the two arrays, the motif names, the
+source of each motif and the mtime and size of every source file, written once and
+memory-mapped by every reader, so the converters, scanners and evaluators share one parsed copy.
+
+Sources are directories of ScerTF data files or CIS-BP PWM files (see meme_db), or a file of FIRE
+motif strings ("name motif" lines), parsed by scer_pwm_to_meme.fire_motif_to_pfm. A motif is
+keyed by its source (the file name, or <file>:<line> of a FIRE motif), as motif names repeat:
+ScerTF files are named <author>.<tf>. Updating a registry parses again only the added or changed
+files of a directory, and keeps the rows of the others.
+"""
+
+import os
+import sys
+import glob
+import numpy
+import multiprocessing
+import meme_db
+import rank_store
+import matrix_cache
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src import scer_pwm_to_meme
+
+FN_PFMS = "_pfms.npy"
+FN_OFFSETS = "_offsets.npy"
+FN_NAMES = "_names.txt"
+FN_SOURCES = "_sources.txt"
+FN_STAMPS = "_stamps.txt"
+
+KINDS = ["scertf", "cisbp", "fire"]
+
+# loaded registries, keyed by directory: [pfms, offsets, names, dict of name to the index of its
+# first motif, sources, dict of source to index]
+_registries = {}
+
+def parse_fire_file(fn):
+    """ Returns [names, sources, pfms] of a file of "name motif" lines of FIRE motif strings. """
+    names = []
+    sources = []
+    pfms = []
+    for k, line in enumerate(open(fn, "r")):
+        linesplit = line.split()
+        if len(linesplit) >= 2 and not linesplit[0].startswith("#"):
+            names.append(linesplit[0])
+            sources.append("%s:%d" % (os.path.basename(fn), k+1))
+            pfms.append(scer_pwm_to_meme.fire_motif_to_pfm(linesplit[1]).T)
+    return [names, sources, pfms]
+
+def parse_file(task):
+    """ Returns the pfm of one motif file; task is [fn, kind]. """
+    [fn, kind] = task
+    freqs = meme_db.parse_scertf(fn) if kind == "scertf" else meme_db.parse_cisbp(fn)
+    return numpy.array(freqs, dtype=float).reshape(len(freqs), 4)
+
+def pack(pfms):
+    """ Returns [contiguous float32 rows, offsets] of a list of pfms. """
+    offsets = numpy.zeros(len(pfms) + 1, dtype=numpy.int64)
+    offsets[1:] = numpy.cumsum([len(pfm) for pfm in pfms])
+    data = numpy.zeros((offsets[-1], 4), dtype=numpy.float32)
+    for i, pfm in enumerate(pfms):
+        data[offsets[i]:offsets[i+1]] = pfm
+    return [data, offsets]
+
+def save_registry(dirname, pfms, names, sources, stamps):
+    """ Write a registry through a temporary directory and rename its files into place, so
+    registries already mapped by other processes stay valid. The stamps go last. """
+    [data, offsets] = pack(pfms)
+    tmp = "%s.tmp%d" % (dirname.rstrip('/'), os.getpid())
+    if not os.path.exists(tmp):
+        os.makedirs(tmp)
+    numpy.save(os.path.join(tmp, FN_PFMS), data)
+    numpy.save(os.path.join(tmp, FN_OFFSETS), offsets)
+    rank_store.write_names(os.path.join(tmp, FN_NAMES), names)
+    rank_store.write_names(os.path.join(tmp, FN_SOURCES), sources)
+    rank_store.write_names(os.path.join(tmp, FN_STAMPS), ["%s\t%s" % (name, stamps[name]) for name in sorted(stamps)])
+    if not os.path.exists(dirname):
+        os.makedirs(dirname)
+    for fn in [FN_PFMS, FN_OFFSETS, FN_NAMES, FN_SOURCES, FN_STAMPS]:
+        os.rename(os.path.join(tmp, fn), os.path.join(dirname, fn))
+    os.rmdir(tmp)
+    _registries.pop(dirname, None)
+
+def is_registry(dirname):
+    return os.path.isfile(os.path.join(dirname, FN_SOURCES))
+
+def open_registry(dirname):
+    """ Returns [pfms, offsets, names, dict of name to the index of its first motif, sources, dict
+    of source to index] of a registry, memory-mapped. """
+    if dirname not in _registries:
+        data = numpy.load(os.path.join(dirname, FN_PFMS), mmap_mode="r")
+        offsets = numpy.load(os.path.join(dirname, FN_OFFSETS))
+        names = rank_store.read_names(os.path.join(dirname, FN_NAMES))
+        sources = rank_store.read_names(os.path.join(dirname, FN_SOURCES))
+        index = {}
+        for i, name in enumerate(names):
+            index.setdefault(name, i)
+        _registries[dirname] = [data, offsets, names, index, sources, \
+            dict((source, i) for i, source in enumerate(sources))]
+    return _registries[dirname]
+
+def get_names(dirname):
+    return open_registry(dirname)[2]
+
+def get_pfm(dirname, name):
+    """ The width x 4 rows of the first motif of a name, a view of the mapped array. """
+    [data, offsets, names, index, sources, source_index] = open_registry(dirname)
+    i = index[name]
+    return data[offsets[i]:offsets[i+1]]
+
+def get_pfms(dirname, names=None, sources=None):
+    """ Returns [[name, pfm]] of the motifs of the given sources, or of the given names (the first
+    motif of each), or all of them in registry order. """
+    [data, offsets, all_names, index, all_sources, source_index] = open_registry(dirname)
+    if sources is not None:
+        rows = [source_index[source] for source in sources]
+    elif names is not None:
+        rows = [index[name] for name in names]
+    else:
+        rows = range(len(all_names))
+    return [[all_names[i], data[offsets[i]:offsets[i+1]]] for i in rows]
+
+def to_decimals(pfm):
+    """ The float64 values of the shortest decimals of float32 rows, so they are formatted
+    (rounded) as the values of the text they were parsed from. """
+    return numpy.array(numpy.asarray(pfm).astype(str), dtype=float)
+
+def update(dirname, source, kind, workers=1):
+    """ Bring the registry in dirname up to date with a source (a directory of scertf or cisbp
+    motif files, or a fire motif file), parsing only what changed. Returns [names of the registry,
+    number of files parsed, number of files]. """
+    if kind == "fire":
+        stamps = {os.path.basename(source): matrix_cache.file_stamp(source)}
+    else:
+        fns = sorted([fn for fn in glob.glob(os.path.join(source, "*")) if os.path.isfile(fn)])
+        stamps = dict((os.path.basename(fn), matrix_cache.file_stamp(fn)) for fn in fns)
+    old_stamps = {}
+    if is_registry(dirname):
+        old_stamps = matrix_cache.read_stamps(os.path.join(dirname, FN_STAMPS))
+        if old_stamps == stamps:
+            return [get_names(dirname), 0, len(stamps)]
+
+    if kind == "fire":
+        [names, sources, pfms] = parse_fire_file(source)
+        count_parsed = 1
+    else:
+        # keep the pfms of unchanged files, parse the others
+        old = {}
+        if old_stamps:
+            [data, offsets, old_names, index, old_sources, source_index] = open_registry(dirname)
+            for i, fn in enumerate(old_sources):
+                old[fn] = data[offsets[i]:offsets[i+1]]
+        names = [meme_db.get_motif_name(fn, kind) for fn in fns]
+        sources = [os.path.basename(fn) for fn in fns]
+        changed = [k for k in range(len(fns)) if old_stamps.get(os.path.basename(fns[k])) != \
+            stamps[os.path.basename(fns[k])]]
+        tasks = [[fns[k], kind] for k in changed]
+        if workers > 1:
+            pool = multiprocessing.Pool(workers)
+            parsed = pool.map(parse_file, tasks)
+            pool.close()
+            pool.join()
+        else:
+            parsed = [parse_file(task) for task in tasks]
+        pfms = [old.get(os.path.basename(fn)) for fn in fns]
+        for k, pfm in zip(changed, parsed):
+            pfms[k] = pfm
+        count_parsed = len(changed)
+    save_registry(dirname, pfms, names, sources, stamps)
+    return [names, count_parsed, len(stamps)]
@@ -0,0 +1,128 @@
+#!/usr/bin/python
+
+"""
+Scan PWMs over a set of promoters in process, in place of a FIMO run per motif.
+
+The promoters are one-hot encoded once into a uint8 array of targets x positions x ACGT (N and
+padding are all zero, so they add nothing to a score). A motif's log-odds matrix is scored over
+both strands at once: a block of targets is laid end to end, and the score of every window is the
+sum over motif positions k of the (contiguous) slice of the one-hot rows starting at k, times the
+log-odds of position k for the motif and its reverse complement. Windows running past the end of
+their promoter are masked out.
+
+Each target gets the max log-odds of its windows, and the sum and count of the log-odds of its
+windows (sites) above a cutoff, the analogues of the max, sum and count of estimate_affinity.rb.
+"""
+
+import numpy
+import multiprocessing
+
+BASES = "ACGT"
+
+# one-hot promoters and their lengths, set by init_promoters before the pool is forked
+onehot = numpy.zeros((0, 0, 4), dtype=numpy.uint8)
+lengths = numpy.zeros(0, dtype=int)
+
+# targets scored at a time, to bound the memory of the window scores
+CHUNK_SIZE = 256
+
+def encode_onehot(seqs):
+    """ Returns the len(seqs) x longest x 4 uint8 one-hot encoding of sequences. """
+    codes = numpy.zeros(256, dtype=numpy.uint8)
+    codes[:] = 4
+    for k, base in enumerate(BASES):
+        codes[ord(base)] = k
+        codes[ord(base.lower())] = k
+    seq_lens = numpy.array([len(seq) for seq in seqs], dtype=int)
+    encoded = numpy.zeros((len(seqs), max(seq_lens.max() if len(seqs) else 0, 1), 5), dtype=numpy.uint8)
+    for i, seq in enumerate(seqs):
+        encoded[i, numpy.arange(len(seq)), codes[numpy.frombuffer(seq, dtype=numpy.uint8)]] = 1
+    return [numpy.ascontiguousarray(encoded[:, :, :4]), seq_lens]
+
+def init_promoters(encoded, seq_lens):
+    global onehot, lengths
+    onehot = encoded
+    lengths = seq_lens
+
+def get_log_odds(freqs, background=None, pseudocount=0.01):
+    """ Returns the width x 4 log2-odds matrix of position x ACGT frequencies. """
+    freqs = numpy.array(freqs, dtype=float) + pseudocount
+    freqs /= freqs.sum(axis=1)[:, numpy.newaxis]
+    background = numpy.array(background if background is not None else [0.25] * 4, dtype=float)
+    return numpy.log2(freqs / background)
+
+def scan_log_odds(log_odds, cutoff=0):
+    """ Returns [max, sum, count] arrays over the promoters of the windows of a log-odds matrix
+    on both strands; the sum and count are of the windows scoring above cutoff. A promoter
+    shorter than the motif has max -inf. """
+    width = len(log_odds)
+    # the motif and its reverse complement, as columns
+    strands = numpy.dstack([log_odds, log_odds[::-1, ::-1]]).astype(numpy.float32)
+    n_targets = onehot.shape[0]
+    n_pos = onehot.shape[1]
+    scores_max = numpy.empty(n_targets)
+    scores_sum = numpy.empty(n_targets)
+    counts = numpy.empty(n_targets, dtype=int)
+    valid = numpy.arange(n_pos)[numpy.newaxis, :] <= (lengths - width)[:, numpy.newaxis]
+    for start in range(0, n_targets, CHUNK_SIZE):
+        end = min(start + CHUNK_SIZE, n_targets)
+        flat = onehot[start:end].reshape(-1, 4).astype(numpy.float32)
+        n_windows = max(len(flat) - width + 1, 0)
+        windows = numpy.zeros((len(flat), 2), dtype=numpy.float32)
+        for k in range(width):
+            windows[:n_windows] += flat[k:k+n_windows].dot(strands[k])
+        windows = windows.reshape(end - start, n_pos, 2)
+        windows[~valid[start:end]] = -numpy.inf
+        scores_max[start:end] = windows.max(axis=2).max(axis=1)
+        sites = windows > cutoff
+        scores_sum[start:end] = numpy.where(sites, windows, 0).sum(axis=2).sum(axis=1)
+        counts[start:end] = sites.sum(axis=2).sum(axis=1)
+    return [scores_max, scores_sum, counts]
+
+def scan_motif(task):
+    """ scan_log_odds for a pool; task is [freqs, background, cutoff]. """
+    [freqs, background, cutoff] = task
+    return scan_log_odds(get_log_odds(freqs, background), cutoff)
+
+def scan_motifs(motifs, seqs, background=None, cutoff=0, workers=1):
+    """ Returns [max, sum, count] motif x promoter matrices of a list of [motif name, freqs] over
+    a list of sequences, the motifs spread over a pool of workers. """
+    init_promoters(*encode_onehot(seqs))
+    tasks = [[freqs, background, cutoff] for [motif_name, freqs] in motifs]
+    if workers > 1:
+        # the workers are forked with the encoded promoters
+        pool = multiprocessing.Pool(workers)
+        results = pool.map(scan_motif, tasks)
+        pool.close()
+        pool.join()
+    else:
+        results = [scan_motif(task) for task in tasks]
+    matrices = [numpy.zeros((len(motifs), len(seqs))) for k in range(3)]
+    for i, result in enumerate(results):
+        for k in range(3):
+            matrices[k][i] = result[k]
+    return matrices
+
+def rank_fraction(values):
+    """ Rank of each value from 0 (lowest) to 1 (highest), as estimate_affinity.rb ranks; ties
+    in order. """
+    ranks = numpy.zeros(len(values))
+    if len(values) > 1:
+        ranks[numpy.argsort(values, kind='mergesort')] = numpy.arange(len(values)) / float(len(values) - 1)
+    return ranks
+
+def format_summary(motif_name, targets, scores_max, scores_sum, counts):
+    """ Lines of a summary file in the columns of estimate_affinity.rb (tf, target, sum, rank of
+    sum, max, rank of max, count, rank of count, higher of the sum and max ranks), for the targets
+    with a site. """
+    has_site = counts > 0
+    names = [targets[j] for j in numpy.flatnonzero(has_site)]
+    sums = scores_sum[has_site]
+    maxs = scores_max[has_site]
+    site_counts = counts[has_site]
+    rank_sum = rank_fraction(sums)
+    rank_max = rank_fraction(maxs)
+    rank_count = rank_fraction(site_counts)
+    return "".join(["%s\t%s\t%r\t%r\t%r\t%r\t%d\t%r\t%r\n" % (motif_name, names[j], float(sums[j]), \
+        rank_sum[j], float(maxs[j]), rank_max[j], site_counts[j], rank_count[j], max(rank_sum[j], rank_max[j])) \
+        for j in range(len(names))])
@@ -4,30 +4,21 @@
 Quantile normalization maps multiple distributions to be identical in their stats properties.
 """
 
-from scipy.stats import rankdata
 import numpy
+import rank_utils
 
-def quantile_norm(data):
-	""" data must be in numpy.ndarray type """
-	N = len(data)
-	M = len(data[0])
+def quantile_norm(data, method="min"):
+	""" data must be in numpy.ndarray type, either N x M (N distributions of M values each) or
+	B x N x M for a batch of B such datasets. method is the tie method used to rank the values
+	(see scipy.stats.rankdata); fractional ranks are rounded down. data is left unchanged. """
+	data = numpy.asarray(data, dtype=float)
+	shape = data.shape
+	batch = data.reshape((-1,) + shape[-2:])
 
-	# rank and sort data values
-	ranks = [None] * N
-	for k in range(N):
-		ranks[k] = rankdata(data[k], method="min")
-		data[k] = numpy.array(sorted(data[k]))
+	# rank data values, and average the sorted values over the distributions
+	index = (rank_utils.rankdata_rows(batch, method) - 1).astype(int)
+	normalized = numpy.mean(numpy.sort(batch, axis=-1), axis=1)
 
-	# normalize sorted data and map rank to values
-	normalized = [None] * M
-	for i in range(M):
-		normalized[i] = numpy.mean(data[:,i])
-
-	data = numpy.zeros((N,M))
-	for k in range(N):
-		for i in range(M):
-			index = ranks[k][i]-1
-			index = int(index)
-			data[k][i] = normalized[index]
-	
-	return data
+	# map each rank to its normalized value
+	data = normalized[numpy.arange(len(batch))[:, None, None], index]
+	return data.reshape(shape)
@@ -2,156 +2,179 @@
 
 """
 Query CIS-BP MySQL database for inferred motif PWMs and DNA binding domain sequences.
+
+Each export runs on its own connection of a pool, the exports at the same time; rows are read
+from unbuffered cursors in batches of fetchmany, and each batch is normalized to ascii and
+written at once. With -s, the queries run on a SQLite database (or a .sql dump loaded into one)
+with the same tables instead, e.g. the fixture tests/fixtures/cisbp.sql the exports are checked
+against. Only dumps in SQLite syntax load; a mysqldump has to be converted first.
 """
 
 import sys
 import os
 import argparse
-import mysql.connector
 import unicodedata
-import numpy
+import tempfile
+import sqlite3
+from multiprocessing.pool import ThreadPool
+
+EXPORTS = ["motifs", "dbds", "inferred_tfs", "species"]
 
 def parse_args(argv):
     parser = argparse.ArgumentParser(description="Query the cisbp mysql database")
-    parser.add_argument('-o', '-fn_output', dest='fn_output', type=str)
+    parser.add_argument('-e', '-exports', dest='exports', type=str, nargs='+', choices=EXPORTS, default=["motifs"], \
+        help="motifs: motifs without direct yeast evidence; dbds: dbd sequences of all motifs in fasta; " + \
+        "inferred_tfs: tfs with no direct evidence and their inferred motifs; species: species counts of direct motif evidence")
+    parser.add_argument('-o', '-fn_output', dest='fn_output', type=str, nargs='+', help="One output file for each export")
+    parser.add_argument('-c', '-min_count', dest='min_count', type=int, default=0, \
+        help="Only export the species with at least this many direct motif evidence")
+    parser.add_argument('-b', '-batch_size', dest='batch_size', type=int, default=10000)
+    parser.add_argument('-H', '-host', dest='host', type=str, default="localhost")
+    parser.add_argument('-u', '-user', dest='user', type=str, default="root")
+    parser.add_argument('-p', '-password', dest='password', type=str, default="root")
+    parser.add_argument('-d', '-database', dest='database', type=str, default="cis_bp")
+    parser.add_argument('-s', '-sqlite', dest='sqlite', type=str, \
+        help="SQLite database file, or .sql dump in SQLite syntax (not a mysqldump), to query instead of mysql")
     parsed = parser.parse_args(argv[1:])
+    if not parsed.fn_output or len(parsed.fn_output) != len(parsed.exports):
+        parser.error("give one output file for each export")
     return parsed
 
 def main(argv):
     parsed = parse_args(argv)
 
-    """ connection to mysql """ 
-    cnx = mysql.connector.connect(user="root", password="root", database="cis_bp")
-    cursor = cnx.cursor()
-
-    """ query of all motif dbd sequences """ 
-    # # query = ("SELECT Motif_ID, MotifFeature_Sequence FROM motif_features WHERE Motif_ID IN \
-    # #     (SELECT Motif_ID FROM motif_all WHERE Evidence = 'I' and Species != 'Saccharomyces_cerevisiae')")
-    # query = ("SELECT * FROM motif_features")
-    # cursor.execute(query)
-
-    # writer = open(parsed.fn_output, "w")
-    # for item in cursor:
-    #     temp_id = unicodedata.normalize('NFKD', item[1]).encode('ascii', 'ignore') 
-    #     temp_from_pos = item[3]
-    #     temp_to_pos = item[4] 
-    #     temp_seq = unicodedata.normalize('NFKD', item[5]).encode('ascii', 'ignore')  
-    #     writer.write(">%s:%d-%d\n%s\n" % (temp_id, temp_from_pos, temp_to_pos, temp_seq))
-    # writer.close()  
+    """ connection to mysql, or sqlite """
+    fn_tmp = None
+    try:
+        if parsed.sqlite:
+            fn_db = parsed.sqlite
+            if parsed.sqlite.endswith(".sql"):
+                [fd, fn_tmp] = tempfile.mkstemp(suffix=".db")
+                os.close(fd)
+                load_sqlite_dump(parsed.sqlite, fn_tmp)
+                fn_db = fn_tmp
+            connect = lambda: sqlite3.connect(fn_db)
+        else:
+            import mysql.connector.pooling
+            cnx_pool = mysql.connector.pooling.MySQLConnectionPool(pool_name="cisbp_export", \
+                pool_size=min(len(parsed.exports), 32), user=parsed.user, password=parsed.password, \
+                host=parsed.host, database=parsed.database)
+            connect = cnx_pool.get_connection
+
+        """ run the exports at the same time """
+        tasks = [[export, fn, connect, parsed] for export, fn in zip(parsed.exports, parsed.fn_output)]
+        pool = ThreadPool(len(tasks))
+        counts = pool.map(run_export, tasks)
+        pool.close()
+        pool.join()
+        for export, fn, count in zip(parsed.exports, parsed.fn_output, counts):
+            print "Export:", export, "Output:", fn, "Count:", count
+    finally:
+        if fn_tmp:
+            os.remove(fn_tmp)
+
+def load_sqlite_dump(fn_sql, fn_db):
+    """ Load a dump in SQLite syntax (e.g. of sqlite3 .dump) into a new SQLite file; the MySQL
+    syntax of a mysqldump (ENGINE= table options, LOCK TABLES, \\' escapes) is not supported. """
+    cnx = sqlite3.connect(fn_db)
+    cnx.executescript(open(fn_sql, "r").read())
+    cnx.commit()
+    cnx.close()
 
-    """ query of tfs with no direct evidence, associated with inferred motifs """
-    # tf_info_dict = {}
-    # fam_dict = {}
-    # tf_motif_dict = {}
-
-    # query_id = ("SELECT TF_ID, TF_Name, DBID, TF_Species, Family_ID FROM tfs WHERE TF_Status = 'I'")
-    # query_dbd = ("SELECT Family_ID, DBDs FROM tf_families WHERE Family_ID IN \
-    #     (SELECT Family_ID FROM tfs WHERE TF_Status = 'I')")
-    # query_motif = ("SELECT TF_ID, Motif_ID FROM motif_all WHERE TF_ID IN \
-    #     (SELECT TF_ID FROM tfs WHERE TF_Status = 'I')")
-
-    # cursor.execute(query_dbd)
-    # for item in cursor:
-    #     temp_famid = unicodedata.normalize('NFKD', item[0]).encode('ascii', 'ignore') 
-    #     temp_dbd = unicodedata.normalize('NFKD', item[1]).encode('ascii', 'ignore') 
-    #     fam_dict[temp_famid] = temp_dbd
-
-    # cursor.execute(query_id)
-    # for item in cursor:
-    #     temp_id = unicodedata.normalize('NFKD', item[0]).encode('ascii', 'ignore')
-    #     temp_name = unicodedata.normalize('NFKD', item[1]).encode('ascii', 'ignore') 
-    #     temp_dbid = unicodedata.normalize('NFKD', item[2]).encode('ascii', 'ignore') 
-    #     temp_spec = unicodedata.normalize('NFKD', item[3]).encode('ascii', 'ignore') 
-    #     temp_famid = unicodedata.normalize('NFKD', item[4]).encode('ascii', 'ignore')  
-    #     tf_info_dict[temp_id] = [temp_name, temp_dbid, temp_spec, fam_dict[temp_famid]]
-
-    # cursor.execute(query_motif)
-    # for item in cursor:
-    #     temp_id = unicodedata.normalize('NFKD', item[0]).encode('ascii', 'ignore') 
-    #     temp_motif = unicodedata.normalize('NFKD', item[1]).encode('ascii', 'ignore') 
-    #     if temp_id not in tf_motif_dict:
-    #         temp_list = [temp_motif]
-    #     else:
-    #         temp_list = tf_motif_dict[temp_id]
-    #         temp_list.append(temp_motif)
-    #     tf_motif_dict[temp_id] = temp_list
-
-    # writer = open(parsed.fn_output, "w")
-    # tf_key_sorted = sorted(tf_info_dict.keys())
-    # for tf in tf_key_sorted:
-    #     temp_info = tf_info_dict[tf]
-    #     temp_motifs = tf_motif_dict[tf]
-    #     writer.write(">%s: %s, %s, %s, %s\n" % (tf, temp_info[0], temp_info[1], temp_info[2], temp_info[3]))
-    #     for i, temp_motif in enumerate(temp_motifs):
-    #         writer.write("%s" % temp_motif)
-    #         if i != len(temp_motifs)-1:
-    #             writer.write(", ")
-    #         else:
-    #             writer.write("\n")
-    # writer.close()
-
-    """ query all species """
-    # query = ("SELECT DISTINCT(Species), Count(*) FROM motif_all WHERE Evidence = 'D' GROUP BY Species")
-    # cursor.execute(query)
-    # writer = open(parsed.fn_output, "w")
-    # for item in cursor:
-    #     spec = unicodedata.normalize('NFKD', item[0]).encode('ascii', 'ignore')
-    #     count = item[1]
-    #     print spec
-    #     writer.write("%s\t%d\n" % (spec, count))
-    # writer.close()
-
-    """ query all motifs have direct evidence and eukaryote but not yeast """
-    # lines = open("/Users/KANG/proj_motifcomparison/resources/cisbp_all_species.txt", "r").readlines()
-    # dict_spec = {}
-    # for i, line in enumerate(lines):
-    #     if i > 0:
-    #         temp_spec = line.split()[0]
-    #         temp_cell = line.split()[1]
-    #         dict_spec[temp_spec] = temp_cell
-
-    # query = ("SELECT Motif_ID, Species FROM motif_all WHERE Evidence = 'D'")
-    # cursor.execute(query)
-    # motifs = []
-    # species = []
-    # for item in cursor:
-    #     temp_motif = unicodedata.normalize('NFKD', item[0]).encode('ascii', 'ignore')
-    #     temp_species = unicodedata.normalize('NFKD', item[1]).encode('ascii', 'ignore')
-    #     if temp_species != 'Saccharomyces_cerevisiae' and dict_spec[temp_species] == 'eukary':
-    #         motifs.append(temp_motif)
-    #         species.append(temp_species)
-    # data = numpy.column_stack((motifs, species))
-    # data = data[numpy.argsort(data[:,0])]
-
-    # writer = open(parsed.fn_output, "w")
-    # for temp_data in data:
-    #     writer.write("%s\t%s\n" % (temp_data[0], temp_data[1]))
-    # writer.close()
+def run_export(task):
+    """ Run one export on a connection of its own; task is [export, fn_output, connect, parsed].
+    Returns the number of records written. """
+    [export, fn_output, connect, parsed] = task
+    cnx = connect()
+    writer = open(fn_output, "w", 1 << 20)
+    try:
+        if export == "motifs":
+            count = export_motifs(cnx, writer, parsed.batch_size)
+        elif export == "dbds":
+            count = export_dbds(cnx, writer, parsed.batch_size)
+        elif export == "inferred_tfs":
+            count = export_inferred_tfs(cnx, writer, parsed.batch_size)
+        else:
+            count = export_species(cnx, writer, parsed.batch_size, parsed.min_count)
+    finally:
+        writer.close()
+        cnx.close()
+    return count
+
+def iter_batches(cnx, query, batch_size):
+    """ Yields the rows of a query in lists of up to batch_size, from an unbuffered cursor. """
+    cursor = cnx.cursor()
+    cursor.execute(query)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield rows
+    cursor.close()
 
+def to_ascii(text):
+    """ Normalize a string, or a batch of lines joined into one, to ascii. """
+    if isinstance(text, str):
+        return text
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore')
+
+def write_rows(writer, cnx, query, batch_size, fmt):
+    """ Write each row of a query formatted by fmt, one batch at a time. Returns the row count. """
+    count = 0
+    for rows in iter_batches(cnx, query, batch_size):
+        writer.write(to_ascii(u"".join([fmt % tuple(row) for row in rows])))
+        count += len(rows)
+    return count
+
+def export_motifs(cnx, writer, batch_size):
     """ query all motifs without the ones with direct yeast evidence """
     query = ("SELECT DISTINCT(Motif_ID) FROM motifs WHERE TF_ID IN \
         (SELECT TF_ID FROM tfs WHERE TF_Species != 'Saccharomyces_cerevisiae')")
-    cursor.execute(query)
-    writer = open(parsed.fn_output, "w")
-    for item in cursor:
-        temp_motif = unicodedata.normalize('NFKD', item[0]).encode('ascii', 'ignore')
-        writer.write("%s\n" % temp_motif)
-    writer.close()
-
-    """ query the species with more than 5 direct motif evidence """
-    # query = ("SELECT Species, Spec_Count FROM \
-    #     (SELECT Species, count(*) AS Spec_Count FROM motif_all WHERE Evidence = 'D' GROUP BY Species) \
-    #     AS spec_dir_evid WHERE spec_dir_evid.Spec_Count >= 5")
-    # cursor.execute(query)
-    # writer = open(parsed.fn_output, "w")
-    # for item in cursor:
-    #     spec = unicodedata.normalize('NFKD', item[0]).encode('ascii', 'ignore')
-    #     writer.write("%s\n" % spec)
-    # writer.close()
-
-    """ close mysql connection """
-    cursor.close()
-    cnx.close()
+    return write_rows(writer, cnx, query, batch_size, u"%s\n")
+
+def export_dbds(cnx, writer, batch_size):
+    """ query of all motif dbd sequences """
+    query = ("SELECT * FROM motif_features")
+    count = 0
+    for rows in iter_batches(cnx, query, batch_size):
+        writer.write(to_ascii(u"".join([u">%s:%d-%d\n%s\n" % (row[1], row[3], row[4], row[5]) for row in rows])))
+        count += len(rows)
+    return count
+
+def export_inferred_tfs(cnx, writer, batch_size):
+    """ query of tfs with no direct evidence, associated with inferred motifs """
+    query_id = ("SELECT TF_ID, TF_Name, DBID, TF_Species, Family_ID FROM tfs WHERE TF_Status = 'I'")
+    query_dbd = ("SELECT Family_ID, DBDs FROM tf_families WHERE Family_ID IN \
+        (SELECT Family_ID FROM tfs WHERE TF_Status = 'I')")
+    query_motif = ("SELECT TF_ID, Motif_ID FROM motif_all WHERE TF_ID IN \
+        (SELECT TF_ID FROM tfs WHERE TF_Status = 'I')")
+
+    fam_dict = {}
+    for rows in iter_batches(cnx, query_dbd, batch_size):
+        for item in rows:
+            fam_dict[item[0]] = item[1]
+
+    tf_info_dict = {}
+    for rows in iter_batches(cnx, query_id, batch_size):
+        for item in rows:
+            tf_info_dict[item[0]] = [item[1], item[2], item[3], fam_dict[item[4]]]
+
+    tf_motif_dict = {}
+    for rows in iter_batches(cnx, query_motif, batch_size):
+        for item in rows:
+            tf_motif_dict.setdefault(item[0], []).append(item[1])
+
+    tf_key_sorted = sorted(tf_info_dict.keys())
+    for start in range(0, len(tf_key_sorted), batch_size):
+        writer.write(to_ascii(u"".join([u">%s: %s, %s, %s, %s\n%s\n" % tuple([tf] + tf_info_dict[tf] + \
+            [u", ".join(tf_motif_dict.get(tf, []))]) for tf in tf_key_sorted[start:start+batch_size]])))
+    return len(tf_key_sorted)
+
+def export_species(cnx, writer, batch_size, min_count=0):
+    """ query all species, or those with at least min_count direct motif evidence """
+    query = ("SELECT DISTINCT(Species), Count(*) FROM motif_all WHERE Evidence = 'D' GROUP BY Species \
+        HAVING Count(*) >= %d" % min_count)
+    return write_rows(writer, cnx, query, batch_size, u"%s\t%d\n")
 
 if __name__ == "__main__":
     main(sys.argv)
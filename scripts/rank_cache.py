@@ -0,0 +1,67 @@
+#!/usr/bin/python
+
+"""
+In-memory LRU cache of parsed rank lists and name conversion files, shared by the evaluation
+steps of the infer_* scripts. Each rank list (a text file or a row of a rank store, see
+rank_store) is parsed once and kept until max_size other lists have been used since. With a
+matrix_cache directory set, directories of rank text files are read through the on-disk cache.
+"""
+
+import collections
+import rank_store
+import matrix_cache
+
+max_size = 512
+
+# (dirname, name) -> [targets, values, dict of target to value], least recently used first
+_ranks = collections.OrderedDict()
+_name_dicts = {}
+
+def set_max_size(size):
+    global max_size
+    max_size = size
+    while len(_ranks) > max_size:
+        _ranks.popitem(last=False)
+
+def clear():
+    _ranks.clear()
+    _name_dicts.clear()
+
+def _get(dirname, name):
+    key = (dirname, name)
+    if key in _ranks:
+        entry = _ranks.pop(key)
+    else:
+        if matrix_cache.cache_dir is not None and not rank_store.is_store(dirname):
+            [targets, values] = matrix_cache.get_list(dirname, name, "rank_list", parse_rank_dict)
+        else:
+            [targets, values] = rank_store.get_list(dirname, name)
+        entry = [targets, values, dict(zip(targets, values))]
+        while _ranks and len(_ranks) >= max_size:
+            _ranks.popitem(last=False)
+    _ranks[key] = entry
+    return entry
+
+def parse_rank_dict(fn):
+    [targets, values] = rank_store.parse_rank_file(fn)
+    return dict(zip(targets, values))
+
+def get_list(dirname, name):
+    """ Returns [targets, values] of a rank list; see rank_store.get_list. """
+    entry = _get(dirname, name)
+    return [entry[0], entry[1]]
+
+def get_dict(dirname, name):
+    """ Returns the {target: value} dict of a rank list. Do not modify it, it is shared. """
+    return _get(dirname, name)[2]
+
+def get_name_dict(fn):
+    """ Dict of the second column to the first column of a name conversion file, e.g.
+    np_scertf_names.txt. """
+    if fn not in _name_dicts:
+        dict_names = {}
+        for line in open(fn, "r"):
+            if line.split():
+                dict_names[line.split()[1]] = line.split()[0]
+        _name_dicts[fn] = dict_names
+    return _name_dicts[fn]
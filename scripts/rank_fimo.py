@@ -4,18 +4,28 @@ import sys
 import argparse
 import os.path
 import glob
-from scipy.stats import rankdata
 import numpy
-import operator
+import multiprocessing
+import rank_utils
+import rank_store
+import matrix_cache
+import fimo_adjmtr
 
-global num_targets
-num_targets = 6220
+# target names and their indices, set by init_targets in each process
+target_names = []
+target_index = {}
 
 def parse_args(argv):
     parser = argparse.ArgumentParser(description="Sort rankings of fimo outputs")
     parser.add_argument('-i', '--input_dir', dest='input_dir', type=str)
     parser.add_argument('-t', '--target_names', dest='target_names', type=str)
     parser.add_argument('-o', '--output_dir', dest='output_dir', type=str)
+    parser.add_argument('-s', '--store', dest='store', action='store_true', \
+        help="Write all rankings as one rank store in output_dir")
+    parser.add_argument('-w', '--workers', dest='workers', type=int, default=1, \
+        help="Number of processes to rank the summary files with")
+    parser.add_argument('-C', '--cache_dir', dest='cache_dir', type=str, \
+        help="Read the fimo summaries through the matrix cache in this directory")
     parsed = parser.parse_args(argv[1:])
     return parsed
 
@@ -24,6 +34,8 @@ def errprint(st):
 
 def main(argv):
     parsed = parse_args(argv)
+    if parsed.cache_dir:
+        matrix_cache.set_cache_dir(parsed.cache_dir)
 
     if not parsed.input_dir.endswith('/'):
         parsed.input_dir += '/'
@@ -31,11 +43,7 @@ def main(argv):
         parsed.output_dir += '/'
 
     # get target names
-    target_names = [0]*num_targets
-    lines = open(parsed.target_names, 'r').readlines()
-    for i, line in enumerate(lines):
-        if not line.startswith('\n'):
-            target_names[i] = line.strip()
+    names = [line.strip() for line in open(parsed.target_names, 'r') if line.strip()]
 
     # get tf names
     tf_names = []
@@ -44,63 +52,67 @@ def main(argv):
         temp_name = os.path.basename(fn).split('.')
         tf_names.append(temp_name[0])
 
-    # sort fimo rankings for each tf
+    # sort fimo rankings for each tf, returned in tf order
+    tasks = [None] * len(tf_names)
     for i in range(len(tf_names)):
-        print 'Processing %s' % tf_names[i]
-        lines = open(filenames[i], 'r').readlines()
-        dict_rank = {}
-        for line in lines:
-            temp_name = line.split()[1].strip()
-            temp_score = line.split()[3].strip()
-            # only parse the aligned target in netprophet
-            if temp_name in target_names:   
-                dict_rank[temp_name] = abs(float(temp_score))
-        # set target score not aligned but in netprophet to 0
-        target_name_diff = set(target_names) - set(dict_rank.keys())
-        for item in target_name_diff:
-            dict_rank[item] = 0
-        sorted_rank = compute_rank(dict_rank)
-
-        # write output file
-        out_file = parsed.output_dir + tf_names[i]
-        writer = open(out_file, 'w')
-        for i in range(len(sorted_rank)):
-            writer.write("%s\t%.8f\n" % (sorted_rank[i][0], sorted_rank[i][1]))
-        writer.close()
-
-def compute_rank(dict_scores):
-    # sort np scores
-    sorted_scores = sorted(dict_scores.items(), key=operator.itemgetter(1))
-    sorted_scores.reverse()
-    rank_out = [0]*num_targets
-    rank_out[0] = [sorted_scores[0][0], 1]
-    flag = False
-    for i in range(1, num_targets):
-        rank_out[i] = [sorted_scores[i][0], i+1]
-        # deal with tie rankings
-        if sorted_scores[i][1] == sorted_scores[i-1][1]:
-            if i != num_targets-1:
-                if not flag:
-                    temp_index = [i-1, i]
-                    temp_rank = [rank_out[i-1][1], rank_out[i][1]]
-                    flag = True
-                else:
-                    temp_index.append(i)
-                    temp_rank.append(rank_out[i][1])
-            else:
-                if flag:
-                    temp_index.append(i)
-                    temp_rank.append(rank_out[i][1])
-                    temp_mean_rank = numpy.mean(temp_rank)
-                    for j in range(len(temp_index)):
-                        rank_out[temp_index[j]][1] = temp_mean_rank
+        out_file = None if parsed.store else parsed.output_dir + tf_names[i]
+        tasks[i] = [tf_names[i], filenames[i], out_file]
+    if matrix_cache.cache_dir is not None:
+        # only the summaries changed since the last run are parsed again
+        init_targets(names)
+        scores = numpy.abs(fimo_adjmtr.select_summaries(filenames, names, parsed.workers))
+        store_ranks = [write_ranks(tasks[i], compute_rank(scores[i])) for i in range(len(tasks))]
+    else:
+        if parsed.workers > 1:
+            pool = multiprocessing.Pool(parsed.workers, init_targets, (names,))
+            results = pool.imap(rank_summary, tasks)
         else:
-            if flag:
-                temp_mean_rank = numpy.mean(temp_rank)
-                for j in range(len(temp_index)):
-                    rank_out[temp_index[j]][1] = temp_mean_rank
-                flag = False
-    return rank_out
+            init_targets(names)
+            results = (rank_summary(task) for task in tasks)
+        store_ranks = [ranks for ranks in results]
+        if parsed.workers > 1:
+            pool.close()
+            pool.join()
+
+    if parsed.store:
+        rank_store.save_store(parsed.output_dir, numpy.array(store_ranks).reshape(len(tf_names), len(names)), \
+            tf_names, names)
+
+def init_targets(names):
+    global target_names, target_index
+    target_names = names
+    target_index = dict((name, j) for j, name in enumerate(names))
+
+def rank_summary(task):
+    """ Rank the targets of one fimo summary file; task is [tf_name, summary_fn, out_file].
+    Writes out_file, or returns the ranks in target order if out_file is None. """
+    return write_ranks(task, compute_rank(parse_summary(task[1])))
+
+def write_ranks(task, ranks):
+    [tf_name, fn, out_file] = task
+    print 'Processing %s' % tf_name
+    if out_file is None:
+        return ranks
+
+    # write output file, in rank order
+    order = numpy.argsort(ranks, kind='mergesort')
+    writer = open(out_file, 'w')
+    writer.write("".join(["%s\t%.8f\n" % (target_names[j], ranks[j]) for j in order]))
+    writer.close()
+
+def parse_summary(fn):
+    # only parse the aligned target in netprophet; targets not aligned keep score 0
+    scores = numpy.zeros(len(target_names))
+    for line in open(fn, 'r'):
+        linesplit = line.split()
+        j = target_index.get(linesplit[1])
+        if j is not None:
+            scores[j] = abs(float(linesplit[3]))
+    return scores
+
+def compute_rank(scores):
+    # rank the highest score 1, averaging the ranks of ties
+    return len(scores) + 1 - rank_utils.rankdata_rows(scores)
 
 if __name__ == "__main__":
     main(sys.argv)
@@ -2,16 +2,25 @@
 
 import sys
 import argparse
-import glob
 import os.path
-from scipy.stats import rankdata
 import numpy
+import multiprocessing
+import rank_utils
+import rank_store
+
+# the ranking methods; "all" selects every one
+METHODS = ["use_abs", "use_sign", "use_abs_nozero", "use_sign_nozero"]
 
 def parse_args(argv):
     parser = argparse.ArgumentParser(description="Compute rankings of netprophet scores in range [0,1]")
     parser.add_argument('-i', '--input_dir', dest='input_dir', type=str, default='')
     parser.add_argument('-o', '--output_dir', dest='output_dir', type=str)
-    parser.add_argument('-m', '--method', dest='method', type=str, default='use_abs_nozero')
+    parser.add_argument('-m', '--method', dest='method', type=str, nargs='+', default=['use_abs_nozero'], \
+        choices=METHODS + ["all"], help="One or more methods, or all; several methods are written to a subdirectory of output_dir each")
+    parser.add_argument('-s', '--store', dest='store', action='store_true', \
+        help="Write all rankings as one rank store in output_dir")
+    parser.add_argument('-w', '--workers', dest='workers', type=int, default=1, \
+        help="Number of processes to rank the tfs with")
     # optional method: use_abs, use_sign, use_abs_nozero, use_sign_nozero
     parsed = parser.parse_args(argv[1:])
     return parsed
@@ -25,44 +34,87 @@ def main(argv):
     parsed.input_dir = check_dir(parsed.input_dir)
     parsed.output_dir = check_dir(parsed.output_dir)
 
+    methods = METHODS if "all" in parsed.method else parsed.method
+    output_dirs = [parsed.output_dir]
+    if len(methods) > 1:
+        output_dirs = [parsed.output_dir + method + "/" for method in methods]
+    for output_dir in output_dirs:
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
     # get tf names in both netprophet and scertf
-    fns = glob.glob(parsed.input_dir + "*")
-    for fn in fns:
-        tf = os.path.basename(fn)
-        print tf
-
-        # get scores
-        lines = open(fn, "r").readlines()
-        targets = []
-        scores = []
-        for i in range(1,len(lines)):
-            target = lines[i].split()[0]
-            score = float(lines[i].split()[1])
-            if parsed.method == "use_abs":
-                targets.append(target)
-                scores.append(abs(score))
-            elif parsed.method == "use_sign":
-                targets.append(target)
-                scores.append(score)
-            elif parsed.method == "use_abs_nozero":
-                if score != 0:
-                    targets.append(target)
-                    scores.append(abs(score))
-            elif parsed.method == "use_sign_nozero":
-                if score != 0:
-                    targets.append(target)
-                    scores.append(score)
-
-        # rank the scores
-        rankings = rankdata(scores)
-        rankings = len(scores) + 1 - rankings
-        sorted_indices = numpy.argsort(rankings)
-
-        # write data
-        writer = open(parsed.output_dir + tf, "w")
-        for i in range(len(sorted_indices)):
-            writer.write("%s\t%.2f\n" % (targets[sorted_indices[i]], rankings[sorted_indices[i]]))
-        writer.close()
+    tfs = rank_store.get_names(parsed.input_dir)
+
+    # each tf is parsed once and ranked by every method; chunks of tfs go to the workers
+    chunk_size = max(1, len(tfs) // (4*parsed.workers)) if parsed.workers > 1 else max(1, len(tfs))
+    tasks = [[parsed.input_dir, tfs[start:start+chunk_size], methods, output_dirs, parsed.store] \
+        for start in range(0, len(tfs), chunk_size)]
+    if parsed.workers > 1:
+        pool = multiprocessing.Pool(parsed.workers)
+        results = pool.imap(rank_tfs, tasks)
+    else:
+        results = (rank_tfs(task) for task in tasks)
+    store_ranks = [[] for method in methods]
+    for result in results:
+        for k in range(len(methods)):
+            store_ranks[k] += result[k]
+    if parsed.workers > 1:
+        pool.close()
+        pool.join()
+
+    if parsed.store:
+        for k in range(len(methods)):
+            rank_store.save_store_dicts(output_dirs[k], tfs, store_ranks[k])
+
+def rank_tfs(task):
+    """ Rank the scores of a list of tfs by each method; task is [input_dir, tfs, methods,
+    output_dirs, store]. Writes a file per tf and method, or returns for each method the list
+    of {target: ranking} dicts of the tfs if store. """
+    [input_dir, tfs, methods, output_dirs, store] = task
+    store_ranks = [[None] * len(tfs) for method in methods]
+
+    # get scores, grouping the tfs that list the same targets in the same order
+    groups = {}
+    for i in range(len(tfs)):
+        print tfs[i]
+        [targets, scores] = rank_store.get_list(input_dir, tfs[i])
+        groups.setdefault(tuple(targets), []).append([i, scores])
+
+    for targets, members in groups.items():
+        scores = numpy.array([member[1] for member in members], dtype=float).reshape(len(members), len(targets))
+        for k in range(len(methods)):
+            # rank the scores
+            [kept, rankings] = rank_scores(scores, methods[k])
+            for row in range(len(members)):
+                i = members[row][0]
+                targets_kept = [targets[j] for j in numpy.flatnonzero(kept[row])]
+                rankings_kept = rankings[row][kept[row]]
+                if store:
+                    store_ranks[k][i] = dict(zip(targets_kept, rankings_kept))
+                    continue
+                sorted_indices = numpy.argsort(rankings_kept)
+
+                # write data
+                writer = open(output_dirs[k] + tfs[i], "w")
+                writer.write("".join(["%s\t%.2f\n" % (targets_kept[j], rankings_kept[j]) for j in sorted_indices]))
+                writer.close()
+    return store_ranks
+
+def rank_scores(scores, method):
+    """ Returns [kept, rankings] for a tfs x targets score matrix: the mask of the targets a 
+    method ranks (the nonzero scores for the nozero methods), and within each row their 
+    rankings, 1 for the highest score with ties averaged. Cells not kept are nan. """
+    values = numpy.abs(scores) if method in ["use_abs", "use_abs_nozero"] else scores
+    kept = numpy.ones(scores.shape, dtype=bool)
+    if method in ["use_abs_nozero", "use_sign_nozero"]:
+        kept = scores != 0
+    # the dropped cells rank below all others, so shifting by their count ranks the kept cells
+    # among themselves
+    count_dropped = numpy.sum(~kept, axis=1)[:, None]
+    ranks = rank_utils.rankdata_rows(numpy.where(kept, values, -numpy.inf)) - count_dropped
+    rankings = scores.shape[1] - count_dropped + 1 - ranks
+    rankings[~kept] = numpy.nan
+    return [kept, rankings]
 
 def check_dir(directory):
     if not directory.endswith("/"):
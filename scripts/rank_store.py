@@ -0,0 +1,104 @@
+#!/usr/bin/python
+
+"""
+Columnar store of score or rank lists. A store is a directory holding one memory-mappable float
+matrix of rows (tfs or motifs) by columns (targets), and the names of its rows and columns.
+Targets missing from a row's list are stored as nan.
+
+The readers take either a store or a directory of per-row text files ("target score" lines,
+optionally with a header line starting with "#" or "target"), so consumers work with both.
+"""
+
+import os
+import glob
+import numpy
+
+FN_MATRIX = "_matrix.npy"
+FN_ROWS = "_rows.txt"
+FN_COLS = "_cols.txt"
+
+# opened stores, keyed by directory: [matrix, rows, cols, dict of row name to index]
+_stores = {}
+
+def is_store(dirname):
+    return os.path.isfile(os.path.join(dirname, FN_MATRIX))
+
+def save_store(dirname, matrix, rows, cols):
+    """ Write a rows x cols matrix and its names as a store. """
+    if not os.path.exists(dirname):
+        os.makedirs(dirname)
+    numpy.save(os.path.join(dirname, FN_MATRIX), numpy.asarray(matrix))
+    write_names(os.path.join(dirname, FN_ROWS), rows)
+    write_names(os.path.join(dirname, FN_COLS), cols)
+    _stores.pop(dirname, None)
+
+def save_store_dicts(dirname, rows, dicts, cols=None):
+    """ Write a list of {target: value} dictionaries as a store. The columns are the sorted
+    union of the targets unless given. """
+    if cols is None:
+        cols = sorted(set().union(*dicts)) if dicts else []
+    save_store(dirname, dicts_to_matrix(dicts, cols), rows, cols)
+
+def dicts_to_matrix(dicts, cols):
+    index = dict((c, j) for j, c in enumerate(cols))
+    matrix = numpy.empty((len(dicts), len(cols)))
+    matrix[:] = numpy.nan
+    for i, d in enumerate(dicts):
+        matrix[i, [index[t] for t in d]] = list(d.values())
+    return matrix
+
+def load_store(dirname, mmap_mode="r"):
+    """ Returns [matrix, rows, cols] of a store, with the matrix memory-mapped by default. """
+    matrix = numpy.load(os.path.join(dirname, FN_MATRIX), mmap_mode=mmap_mode)
+    rows = read_names(os.path.join(dirname, FN_ROWS))
+    cols = read_names(os.path.join(dirname, FN_COLS))
+    return [matrix, rows, cols]
+
+def open_store(dirname):
+    if dirname not in _stores:
+        [matrix, rows, cols] = load_store(dirname)
+        _stores[dirname] = [matrix, rows, cols, dict((r, i) for i, r in enumerate(rows))]
+    return _stores[dirname]
+
+def get_names(dirname):
+    """ Names of the rank lists in a store or directory of text files. """
+    if is_store(dirname):
+        return list(open_store(dirname)[1])
+    names = []
+    for fn in sorted(glob.glob(os.path.join(dirname, "*"))):
+        name = os.path.basename(fn)
+        if not name.startswith("_"):
+            names.append(name)
+    return names
+
+def get_list(dirname, name):
+    """ Returns [targets, values] of one rank list, from a store or the text file dirname/name. """
+    if is_store(dirname):
+        [matrix, rows, cols, index] = open_store(dirname)
+        values = numpy.asarray(matrix[index[name]])
+        indices = numpy.flatnonzero(~numpy.isnan(values))
+        return [[cols[j] for j in indices], list(values[indices])]
+    return parse_rank_file(os.path.join(dirname, name))
+
+def get_dict(dirname, name):
+    [targets, values] = get_list(dirname, name)
+    return dict(zip(targets, values))
+
+def parse_rank_file(fn):
+    targets = []
+    values = []
+    for line in open(fn, "r"):
+        linesplit = line.split()
+        if len(linesplit) < 2 or linesplit[0].startswith("#") or linesplit[0] == "target":
+            continue
+        targets.append(linesplit[0])
+        values.append(float(linesplit[1]))
+    return [targets, values]
+
+def read_names(fn):
+    return [line.strip() for line in open(fn, "r") if line.strip()]
+
+def write_names(fn, names):
+    writer = open(fn, "w")
+    writer.write("".join(["%s\n" % name for name in names]))
+    writer.close()
@@ -0,0 +1,48 @@
+#!/usr/bin/python
+
+"""
+Rank the values of a matrix row by row, the way scipy.stats.rankdata ranks a single vector.
+All rows are ranked in one sort, so a (batched) matrix of score lists needs no Python-level loop.
+"""
+
+import numpy
+
+def rankdata_rows(data, method="average"):
+    """ Rank data along its last axis. method is one of average, min, max, dense or ordinal,
+    with the same tie handling as scipy.stats.rankdata. Returns a float array of data's shape. """
+    data = numpy.asarray(data)
+    shape = data.shape
+    n = shape[-1]
+    rows = data.reshape(-1, n)
+    m = rows.shape[0]
+    row_index = numpy.arange(m)[:, None]
+
+    # stable sort, so ordinal ranks keep the original order of ties
+    order = numpy.argsort(rows, axis=1, kind="mergesort")
+    ranks = numpy.empty((m, n))
+    if method == "ordinal":
+        ranks[row_index, order] = numpy.arange(1, n+1)
+        return ranks.reshape(shape)
+
+    # flag the first value of each group of ties; a group never spans two rows
+    sorted_rows = rows[row_index, order]
+    obs = numpy.ones((m, n), dtype=bool)
+    obs[:, 1:] = sorted_rows[:, 1:] != sorted_rows[:, :-1]
+    obs = obs.ravel()
+    dense = numpy.cumsum(obs).reshape(m, n)
+    count = numpy.flatnonzero(numpy.r_[obs, True])
+    offset = row_index * n
+
+    if method == "average":
+        sorted_ranks = .5 * (count[dense] + count[dense-1] + 1) - offset
+    elif method == "min":
+        sorted_ranks = count[dense-1] + 1 - offset
+    elif method == "max":
+        sorted_ranks = count[dense] - offset
+    elif method == "dense":
+        sorted_ranks = dense - dense[:, :1] + 1
+    else:
+        raise ValueError("unknown method '%s'" % method)
+
+    ranks[row_index, order] = sorted_ranks
+    return ranks.reshape(shape)
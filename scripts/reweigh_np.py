@@ -17,8 +17,7 @@ def reweigh_by_tf_dot_corr(M, W):
     pearson's correlation as similarity measures. """
     weights = rw_pwm.calculate_corr_dot_pval_weights(W, M)
     retval = nmp.ones(nmp.shape(M))
-    for ix in xrange(nmp.shape(M)[0]):
-        retval[ix, :] *= weights[ix]
+    retval *= nmp.reshape(weights, (-1, 1))
     return retval
 #end function
 
@@ -95,7 +95,39 @@ def calculate_dotprod_pval_weights(pwm_adjmtr, np_adjmtr):
     return -1*safelog10(calculate_metric_pval(pwm_adjmtr, np_adjmtr, nmp.dot))
 #end function
 
+def dot_matrix(pwm_adjmtr, np_adjmtr):
+    """ nmp.dot of every pwm row with every np row. """
+    return nmp.dot(pwm_adjmtr, nmp.transpose(np_adjmtr))
+#end function
+
+def covariance_matrix(pwm_adjmtr, np_adjmtr):
+    """ covariance of every pwm row with every np row. """
+    centered_pwm = pwm_adjmtr - nmp.mean(pwm_adjmtr, 1)[:, nmp.newaxis]
+    centered_np = np_adjmtr - nmp.mean(np_adjmtr, 1)[:, nmp.newaxis]
+    return dot_matrix(centered_pwm, centered_np)
+#end function
+
+def corr_matrix(pwm_adjmtr, np_adjmtr):
+    """ just_corr of every pwm row with every np row; nan for constant rows. """
+    def standardize(mtr):
+        centered = mtr - nmp.mean(mtr, 1)[:, nmp.newaxis]
+        norms = nmp.sqrt(nmp.sum(centered**2, 1))[:, nmp.newaxis]
+        with nmp.errstate(divide='ignore', invalid='ignore'):
+            return centered / norms
+    return dot_matrix(standardize(pwm_adjmtr), standardize(np_adjmtr))
+#end function
+
+# metrics with a whole-matrix form, keyed by their pairwise function
+metric_matrix_fns = {just_corr: corr_matrix,
+                     nmp.dot: dot_matrix,
+                     covariance: covariance_matrix}
+
 def calculate_metric_pval(pwm_adjmtr, np_adjmtr, metric_fn):
+    """ For each row of pwm_adjmtr, the fraction of the other np_adjmtr rows
+    that score higher with it under metric_fn than its own np_adjmtr row. """
+    if metric_fn in metric_matrix_fns:
+        return metric_matrix_pval(metric_matrix_fns[metric_fn](pwm_adjmtr,
+                                                               np_adjmtr))
     pvals = []
     num_tfs = nmp.shape(np_adjmtr)[0]
     # loop through each row of the pwm_adjmtr
@@ -113,14 +145,24 @@ def calculate_metric_pval(pwm_adjmtr, np_adjmtr, metric_fn):
     return pvals
 #end function
 
+def metric_matrix_pval(metric_mtr):
+    """ Given the matrix of metrics of every pwm row (rows) with every np row
+    (columns), compare each row against its diagonal entry. """
+    num_tfs = nmp.shape(metric_mtr)[1]
+    my_metrics = nmp.diagonal(metric_mtr)[:, nmp.newaxis]
+    # the diagonal entry is never less than itself
+    with nmp.errstate(invalid='ignore'):
+        num_less_than = nmp.sum(my_metrics < metric_mtr, 1)
+    return list(num_less_than / float(num_tfs))
+#end function
+
 def reweigh_pwm_adjmtr(pwm_adjmtr, weights):
     """ return a copy of pwm_adjmtr where each row has been multiplied
     by the corresponding value in weights. """
     if len(weights) != nmp.shape(pwm_adjmtr)[0]:
         raise ValueError("must have as many weights as rows in pwm_adjmtr!")
     reweighed = nmp.copy(pwm_adjmtr)
-    for n, i in enumerate(weights):
-        reweighed[n, :] *= i
+    reweighed *= nmp.reshape(weights, (-1, 1))
     return reweighed
 #end function
 
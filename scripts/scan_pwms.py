@@ -0,0 +1,86 @@
+#!/usr/bin/python
+
+"""
+Scan the motifs of MEME files (e.g. a database of convert_cisbp2meme.py -m) or of a PFM registry
+over the promoters in process (see pwm_scan), and write the motif x target matrix of the max or
+summed log-odds scores as a rank store, or a summary file per motif in the columns of
+estimate_affinity.rb, which rank_fimo.py and the combine_*_fimo_score scripts read in place of
+FIMO's.
+"""
+
+import sys
+import argparse
+import numpy
+import meme_db
+import pfm_registry
+import pwm_scan
+import fasta_index
+import rank_store
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Scan motifs over the promoters")
+    parser.add_argument('-m', '-fn_meme', dest='fn_meme', type=str, nargs='+', help="MEME files or databases")
+    parser.add_argument('-r', '-dir_registry', dest='dir_registry', type=str, \
+        help="PFM registry (see pfm_registry) to scan the motifs of, in place of MEME files")
+    parser.add_argument('-p', '-fn_promoters', dest='fn_promoters', type=str, help="Promoter fasta file")
+    parser.add_argument('-t', '-fn_targets', dest='fn_targets', type=str, \
+        help="Target names, the columns of the matrix (default: all promoters)")
+    parser.add_argument('-o', '-dir_output', dest='dir_output', type=str)
+    parser.add_argument('-s', '-score', dest='score', type=str, default="sum", choices=["max", "sum"], \
+        help="Score of the matrix: max log-odds, or sum of the log-odds of the sites")
+    parser.add_argument('-y', '-summary', dest='summary', action='store_true', \
+        help="Write a .summary file per motif instead of a rank store")
+    parser.add_argument('-c', '-cutoff', dest='cutoff', type=float, default=0, \
+        help="Log-odds above which a window is a site")
+    parser.add_argument('-b', '-background', dest='background', type=str, \
+        help="Background frequencies, e.g. 'A 0.3 C 0.2 G 0.2 T 0.3' (default: of the MEME file, or uniform)")
+    parser.add_argument('-w', '-workers', dest='workers', type=int, default=1, \
+        help="Number of processes to scan the motifs with")
+    parsed = parser.parse_args(argv[1:])
+    return parsed
+
+def main(argv):
+    parsed = parse_args(argv)
+
+    if not parsed.dir_output.endswith('/'):
+        parsed.dir_output += '/'
+
+    # get the motifs, in file order; a background given overrides those of the files
+    motifs = []
+    background = None
+    for fn in parsed.fn_meme or []:
+        [temp_background, temp_motifs] = meme_db.parse_meme(fn)
+        background = background or temp_background
+        motifs += temp_motifs
+    if parsed.dir_registry:
+        motifs += pfm_registry.get_pfms(parsed.dir_registry)
+    if parsed.background:
+        values = parsed.background.split()
+        freqs = dict((values[k], float(values[k+1])) for k in range(0, len(values)-1, 2))
+        background = [freqs[base] for base in pwm_scan.BASES]
+
+    # get the promoters, only those of the targets if given
+    promoters = [[header.split()[0], seq] for [header, seq] in fasta_index.iter_records(parsed.fn_promoters)]
+    targets = [promoter[0] for promoter in promoters]
+    if parsed.fn_targets:
+        targets = [line.split()[0] for line in open(parsed.fn_targets, "r") if line.split()]
+    index = dict((promoter[0], j) for j, promoter in enumerate(promoters))
+    seqs = [promoters[index[target]][1] if target in index else "" for target in targets]
+    print "Motif count:", len(motifs), "Target count:", len(targets), "Without promoter:", \
+        len([target for target in targets if target not in index])
+
+    [scores_max, scores_sum, counts] = pwm_scan.scan_motifs(motifs, seqs, background, parsed.cutoff, parsed.workers)
+
+    if parsed.summary:
+        for i, [motif_name, freqs] in enumerate(motifs):
+            writer = open(parsed.dir_output + motif_name + ".summary", "w")
+            writer.write(pwm_scan.format_summary(motif_name, targets, scores_max[i], scores_sum[i], counts[i]))
+            writer.close()
+    else:
+        # targets without a promoter (or shorter than the motif) are absent, as nan
+        scores = scores_max if parsed.score == "max" else scores_sum
+        scores[numpy.isinf(scores_max)] = numpy.nan
+        rank_store.save_store(parsed.dir_output, scores, [motif[0] for motif in motifs], targets)
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -1,4 +1,3 @@
-import sys
 import os
 import argparse
 import numpy as nmp
@@ -7,57 +6,57 @@ import operator
 """
 An importable file to provide utilities for model averaging in netprophet.
 """
-def resort_by_weights(M, W):
+def resort_by_weights(M, W, chunk_rows=None, out=None):
     """ For all edges in M that have a corresponding edge in W,
-    resort those edges in-place by their new score, M_ij*W_ij. """
-    # select only rows for which we weights to use
-    W_avail = nmp.sum(W, 1) > 0
-    working_net = nmp.abs(nmp.copy(M))
-    # get the original values of the matrix where we have 
-    orig_values = nmp.sort(nmp.ravel(nmp.copy(working_net)[W_avail]))[::-1]
-    working_net[W_avail] = (working_net[W_avail]+.001)*(W[W_avail]+.001)
-    index_to_value = []
-    for j in xrange(nmp.shape(working_net)[0]):
-        if not W_avail[j]:
-            continue
-        for i in xrange(nmp.shape(working_net)[1]):
-            index_to_value.append([(j,i), working_net[j,i]])
-    index_to_value.sort(key=lambda x: -x[1])
-    for n,item in enumerate(index_to_value):
-        j = item[0][0]; i = item[0][1]
-        working_net[j, i] = orig_values[n]
-        # working_net[j, i] = orig_values[n]*orig_signs[n]
-    # working_net[W_avail] = working_net[W_avail]*orig_signs
-    return working_net
+    resort those edges in-place by their new score, M_ij*W_ij. 
+    See resort_rows for chunk_rows and out. """
+    return resort_rows(M, W, chunk_rows=chunk_rows, out=out)
     
-def resort_by_pwm(network, pwm_net):
-    """ """
-    pwm_avail = nmp.sum(pwm_net, 1) > 0
-    working_net = nmp.abs(nmp.copy(network))
-    # get list of values from before pwms are used, map indices to values
-    # orig_values = nmp.ravel(nmp.copy(working_net)[pwm_avail])
-    # orig_signed = nmp.ravel(nmp.copy(network)[pwm_avail])
-    # orig_signs[orig_signs!=0] = orig_signs[orig_signs!=0]/(nmp.abs(orig_signs[orig_signs!=0]))
-    # orig_values = sorted(zip(list(orig_values), list(orig_signed)), key=lambda x:-x[0])
-    # orig_signs = nmp.ravel(orig_signs)
-    orig_values = nmp.sort(nmp.ravel(nmp.copy(working_net)[pwm_avail]))[::-1]
-    working_net[pwm_avail] = (working_net[pwm_avail]+.001)*(pwm_net[pwm_avail]+.001)
-    index_to_value = []
-    for j in xrange(nmp.shape(working_net)[0]):
-        if not pwm_avail[j]:
-            continue
-        for i in xrange(nmp.shape(working_net)[1]):
-            index_to_value.append([(j,i), working_net[j,i]])
-    index_to_value.sort(key=lambda x: -x[1])
-    for n,item in enumerate(index_to_value):
-        j = item[0][0]; i = item[0][1]
-        working_net[j, i] = orig_values[n]
-        # working_net[j, i] = orig_values[n]*orig_signs[n]
-    # working_net[pwm_avail] = working_net[pwm_avail]*orig_signs
-    return working_net
+def resort_by_pwm(network, pwm_net, chunk_rows=None, out=None):
+    """ Same as resort_by_weights, with the pwm network as the weights. """
+    return resort_rows(network, pwm_net, chunk_rows=chunk_rows, out=out)
             
 #end function
 
+def resort_rows(network, weights, chunk_rows=None, out=None):
+    """ Returns the absolute values of network, where the edges of each row
+    that has weights are resorted by their new score (|M_ij|+.001)*(W_ij+.001):
+    the edge with the n-th highest new score takes the n-th highest original 
+    value of those rows, and ties keep their row-major order. 
+    The result keeps the dtype of network (e.g. float32) and is written into
+    out if given, so a numpy.memmap can hold it. With chunk_rows, the network
+    is read and written that many rows at a time, so it is never copied whole;
+    only the values of the weighted rows are held in memory. """
+    n_rows, n_cols = nmp.shape(network)
+    if out is None:
+        out = nmp.empty((n_rows, n_cols), dtype=network.dtype)
+    if chunk_rows is None:
+        chunk_rows = max(n_rows, 1)
+
+    # select only rows for which we have weights to use
+    avail_rows = nmp.flatnonzero(nmp.sum(weights, 1) > 0)
+    orig_values = nmp.empty(len(avail_rows)*n_cols, dtype=out.dtype)
+    new_scores = nmp.empty(len(avail_rows)*n_cols, dtype=out.dtype)
+    for start in xrange(0, n_rows, chunk_rows):
+        out[start:start+chunk_rows] = nmp.abs(network[start:start+chunk_rows])
+    for start in xrange(0, len(avail_rows), chunk_rows):
+        rows = avail_rows[start:start+chunk_rows]
+        values = out[rows]
+        cells = slice(start*n_cols, (start+len(rows))*n_cols)
+        orig_values[cells] = nmp.ravel(values)
+        new_scores[cells] = nmp.ravel((values+.001)*(weights[rows]+.001))
+
+    # a stable sort of the negated scores orders ties as the list sort did
+    order = nmp.argsort(-new_scores, kind='mergesort')
+    orig_values.sort()
+    new_scores[order] = orig_values[::-1]
+    for start in xrange(0, len(avail_rows), chunk_rows):
+        rows = avail_rows[start:start+chunk_rows]
+        cells = slice(start*n_cols, (start+len(rows))*n_cols)
+        out[rows] = nmp.reshape(new_scores[cells], (len(rows), n_cols))
+    return out
+#end function
+
 def list_geometric(ls):
     """ Returns the geometric mean of a list."""
     return reduce(operator.mul, ls)**(1.0/len(ls))
@@ -105,6 +104,22 @@ def quadrant_combine(lasso_score, de_score, constants):
     return (nmp.abs(lasso_score) + cb_f) * (nmp.abs(de_score) + cd_f) * w_f
 #end function
 
+def quadrant_weights(lasso_mtr, de_mtr, constants):
+    ''' Returns the quadrant_combine weight of every edge, given matrices of
+    lasso scores and de scores. '''
+    conditions = [(lasso_mtr > 0) & (de_mtr > 0),
+                  (lasso_mtr < 0) & (de_mtr > 0),
+                  (lasso_mtr < 0) & (de_mtr < 0),
+                  (lasso_mtr > 0) & (de_mtr < 0),
+                  (lasso_mtr != 0) & (de_mtr == 0),
+                  (lasso_mtr == 0) & (de_mtr != 0)]
+    choices = [constants["quadrant I"], constants["quadrant II"],
+               constants["quadrant III"], constants["quadrant IV"],
+               constants["B"], constants["D"]]
+    # if both scores are zero, the edge gets no weight
+    return nmp.select(conditions, choices, default=0)
+#end function
+
 
 def model_average_pwm_geometric(lasso_component, de_component,
                       binding_strengths, 
@@ -113,13 +128,10 @@ def model_average_pwm_geometric(lasso_component, de_component,
                                    "B":1, "D":2,
                                    "Cb":0.1, "Cd":0.01}):
     ''' Performs model averaging using '''
-    averaged = model_average_np(lasso_component, de_component, 
+    averaged = model_average_np(lasso_component, de_component,
                                 constants = constants)
-    pwm_averaged = nmp.zeros(nmp.shape(averaged))
-    for j, row in enumerate(averaged):
-        for i, _ in enumerate(row):
-            pwm_averaged[j, i] = list_geometric((averaged[j, i], 
-                                                 binding_strengths[j, i]))
+    # element-wise list_geometric of each (averaged, binding strength) pair
+    pwm_averaged = nmp.sqrt(averaged * binding_strengths)
     return pwm_averaged
 #end function
 
@@ -132,14 +144,10 @@ def model_average_np(lasso_component, de_component,
     ''' Performs model averaging as in netprophet. '''
     betas = rescale_matrix(lasso_component)
     de = rescale_shift_matrix(de_component)
-    retval = nmp.zeros(nmp.shape(lasso_component))
-    for j, row in enumerate(lasso_component):
-        if j%20 == 0:
-            sys.stderr.write('working on row %i\n'%(j))
-        for i, ix in enumerate(row):
-            retval[j, i] = quadrant_combine(betas[j,i], 
-                                            de[j,i],
-                                            constants) 
+    # quadrant_combine applied to every edge at once
+    weights = quadrant_weights(betas, de, constants)
+    retval = (nmp.abs(betas) + constants["Cb"]) * \
+        (nmp.abs(de) + constants["Cd"]) * weights
     return retval
 #end function
 
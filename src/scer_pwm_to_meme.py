@@ -7,6 +7,9 @@ import numpy as nmp
 I am a docstring.  I am your friend.
 """
 
+# parsed PFMs, keyed by (filename, mtime, size)
+_parsed_pfms = {}
+
 def parse_args(argv):
     parser = argparse.ArgumentParser(description="this prints before the usage string")
     # examples with default values and types, and short and long args
@@ -25,13 +28,20 @@ def parse_scer_pfm(filename, handle_passed = False):
     Given the filename of a PFM file from ScerTF, parse it into a nmp array.
     The returned array represents the PFM where each row is a base (A, C, G, T),
     and each column value is the base's relative frequency in that position in
-    the motif.
+    the motif. A file is parsed once while its mtime and size are unchanged.
     '''
+    if not handle_passed:
+        st = os.stat(filename)
+        key = (os.path.abspath(filename), st.st_mtime, st.st_size)
+        if key not in _parsed_pfms:
+            _parsed_pfms[key] = read_scer_pfm(open(filename))
+        return _parsed_pfms[key].copy()
+    return read_scer_pfm(filename)
+#end function
+
+def read_scer_pfm(reader):
+    ''' Parse the PFM of an open ScerTF file, as parse_scer_pfm. '''
     retval = None
-    if handle_passed:
-        reader = filename
-    else:
-        reader = open(filename)
 
     for n, line in enumerate(reader):
         line = line.strip()
@@ -41,7 +51,7 @@ def parse_scer_pfm(filename, handle_passed = False):
         # each row holds the frequencies for one base
         # order is ACGT
         # 
-        if retval == None:
+        if retval is None:
             retval = nmp.zeros((4, len(frequencies)))
         retval[n, :] = nmp.array(frequencies)
     return retval
@@ -56,8 +66,8 @@ def fire_motif_to_pfm(fire_motif_str):
     each row holds the freqs for a base, and each column holds the freqs for 
     one position. '''
 
-    # initialize an empty pfm
-    pfm = nmp.zeros((4, 0))
+    # collect the columns, stacked once at the end
+    columns = []
     waiting_for_close = False
     cur_freqs = nmp.zeros((4, 1))
     pos_mapper = {'A':0, 'C':1, 'G':2, 'T':3}
@@ -76,10 +86,10 @@ def fire_motif_to_pfm(fire_motif_str):
             cur_freqs[pos_mapper[char]] += 1
         # close out this loop, reset/account for variables
         if not waiting_for_close:
-            cur_freqs /= nmp.sum(cur_freqs)
-            pfm = nmp.hstack([pfm, cur_freqs])
-            cur_freqs[:] = 0
-    return pfm
+            columns.append(cur_freqs / nmp.sum(cur_freqs))
+            cur_freqs = nmp.zeros((4, 1))
+    return nmp.hstack([nmp.zeros((4, 0))] + columns)
+#end function
     
 
 def pfm_as_meme_str(pfm, pwm_name):
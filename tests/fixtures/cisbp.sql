@@ -0,0 +1,34 @@
+-- A small CIS-BP stand-in, in SQLite syntax, of the tables query_cisbp_mysql.py exports from
+-- (query_cisbp_mysql.py -s tests/fixtures/cisbp.sql).
+
+CREATE TABLE tf_families (Family_ID TEXT, Family_Name TEXT, DBDs TEXT);
+INSERT INTO tf_families VALUES ('F001', 'Zn2Cys6', 'Zn_clus');
+INSERT INTO tf_families VALUES ('F002', 'bZIP', 'bZIP_1');
+INSERT INTO tf_families VALUES ('F003', 'Homeodomain', 'Homeobox');
+
+CREATE TABLE tfs (TF_ID TEXT, Family_ID TEXT, TSource_ID TEXT, DBID TEXT, TF_Name TEXT, TF_Species TEXT, TF_Status TEXT);
+INSERT INTO tfs VALUES ('T001', 'F001', 'TS01', 'YPL248C', 'GAL4', 'Saccharomyces_cerevisiae', 'D');
+INSERT INTO tfs VALUES ('T002', 'F002', 'TS01', 'YEL009C', 'GCN4', 'Saccharomyces_cerevisiae', 'I');
+INSERT INTO tfs VALUES ('T003', 'F001', 'TS02', 'CAGL0A01', 'Gal4p', 'Candida_glabrata', 'I');
+INSERT INTO tfs VALUES ('T004', 'F003', 'TS03', 'ENSMUSG01', 'Hoxa9', 'Mus_musculus', 'D');
+INSERT INTO tfs VALUES ('T005', 'F002', 'TS03', 'ENSMUSG02', 'Atf1é', 'Mus_musculus', 'I');
+
+CREATE TABLE motifs (Motif_ID TEXT, TF_ID TEXT, MSource_ID TEXT, Motif_Type TEXT);
+INSERT INTO motifs VALUES ('M0001_1.02', 'T001', 'MS01', 'PBM');
+INSERT INTO motifs VALUES ('M0002_1.02', 'T003', 'MS01', 'PBM');
+INSERT INTO motifs VALUES ('M0003_1.02', 'T004', 'MS02', 'SELEX');
+INSERT INTO motifs VALUES ('M0003_1.02', 'T004', 'MS03', 'SELEX');
+INSERT INTO motifs VALUES ('M0004_1.02', 'T005', 'MS02', 'PBM');
+
+CREATE TABLE motif_features (MF_ID TEXT, Motif_ID TEXT, Feature_ID TEXT, MF_From INTEGER, MF_To INTEGER, MF_Sequence TEXT);
+INSERT INTO motif_features VALUES ('MF01', 'M0001_1.02', 'Zn_clus', 10, 40, 'CKRRRKCDKLRPVCSQCIRRG');
+INSERT INTO motif_features VALUES ('MF02', 'M0003_1.02', 'Homeobox', 205, 265, 'RKKRCPYTKHQTLELEKEFLF');
+INSERT INTO motif_features VALUES ('MF03', 'M0004_1.02', 'bZIP_1', 4, 64, 'KRRRKNNEAARRSRARKLQ');
+
+CREATE TABLE motif_all (Motif_ID TEXT, TF_ID TEXT, Species TEXT, Evidence TEXT);
+INSERT INTO motif_all VALUES ('M0001_1.02', 'T001', 'Saccharomyces_cerevisiae', 'D');
+INSERT INTO motif_all VALUES ('M0001_1.02', 'T003', 'Candida_glabrata', 'I');
+INSERT INTO motif_all VALUES ('M0002_1.02', 'T002', 'Saccharomyces_cerevisiae', 'I');
+INSERT INTO motif_all VALUES ('M0003_1.02', 'T004', 'Mus_musculus', 'D');
+INSERT INTO motif_all VALUES ('M0004_1.02', 'T004', 'Mus_musculus', 'D');
+INSERT INTO motif_all VALUES ('M0004_1.02', 'T005', 'Mus_musculus', 'I');
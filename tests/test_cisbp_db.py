@@ -0,0 +1,56 @@
+#!/usr/bin/python
+
+"""
+Import the SQLite fixture dump fixtures/cisbp.sql into a cisbp_db mirror and check its motif
+queries (python -m unittest discover -s tests).
+"""
+
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+DIR_TESTS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DIR_TESTS, "..", "scripts"))
+import cisbp_db
+
+FN_FIXTURE = os.path.join(DIR_TESTS, "fixtures", "cisbp.sql")
+YEAST = "Saccharomyces_cerevisiae"
+
+class TestMirror(unittest.TestCase):
+    def setUp(self):
+        self.dir_tmp = tempfile.mkdtemp()
+        self.fn_db = os.path.join(self.dir_tmp, "cisbp.db")
+        src_cnx = sqlite3.connect(":memory:")
+        src_cnx.executescript(open(FN_FIXTURE, "r").read())
+        self.counts = cisbp_db.import_tables(src_cnx, self.fn_db, batch_size=2)
+        src_cnx.close()
+
+    def tearDown(self):
+        if self.fn_db in cisbp_db._connections:
+            cisbp_db._connections.pop(self.fn_db).close()
+        shutil.rmtree(self.dir_tmp)
+
+    def test_import(self):
+        self.assertEqual(self.counts, {"motifs": 5, "tfs": 5, "tf_families": 3, "motif_all": 6, "motif_features": 3})
+
+    def test_get_motifs(self):
+        self.assertEqual(cisbp_db.get_motifs(self.fn_db), ["M0001_1.02", "M0002_1.02", "M0003_1.02", "M0004_1.02"])
+        self.assertEqual(cisbp_db.get_motifs(self.fn_db, exclude_species=[YEAST]), \
+            ["M0002_1.02", "M0003_1.02", "M0004_1.02"])
+        self.assertEqual(cisbp_db.get_motifs(self.fn_db, species=["Mus_musculus"]), ["M0003_1.02", "M0004_1.02"])
+        self.assertEqual(cisbp_db.get_motifs(self.fn_db, evidence="D"), ["M0001_1.02", "M0003_1.02", "M0004_1.02"])
+        self.assertEqual(cisbp_db.get_motifs(self.fn_db, species=[YEAST], evidence="I"), ["M0002_1.02"])
+
+    def test_filter_motifs(self):
+        names = ["M0004_1.02", "M0001_1.02", "M9999_1.02", "M0002_1.02"]
+        self.assertEqual(cisbp_db.filter_motifs(self.fn_db, names, exclude_species=[YEAST]), ["M0004_1.02", "M0002_1.02"])
+        self.assertEqual(cisbp_db.filter_motifs(self.fn_db, names, species=[YEAST], evidence="D"), ["M0001_1.02"])
+        self.assertEqual(cisbp_db.filter_motifs(self.fn_db, names, evidence="I"), \
+            ["M0004_1.02", "M0001_1.02", "M0002_1.02"])
+        self.assertEqual(cisbp_db.filter_motifs(self.fn_db, []), [])
+
+if __name__ == "__main__":
+    unittest.main()
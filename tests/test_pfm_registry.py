@@ -0,0 +1,104 @@
+#!/usr/bin/python
+
+"""
+Check that the converters write the same MEME output through a PFM registry (-r) as from the
+motif files directly, including ScerTF files of the same tf by different authors
+(python -m unittest discover -s tests).
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import numpy
+
+DIR_TESTS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DIR_TESTS, "..", "scripts"))
+sys.path.insert(0, os.path.join(DIR_TESTS, ".."))
+import pfm_registry
+import convert_scertf2meme
+import convert_cisbp2meme
+from src import scer_pwm_to_meme
+
+SCERTF_FILES = {
+    "Badis.GAL4": "A | 0.1 0.7 0.25\nC | 0.2 0.1 0.25\nG | 0.3 0.1 0.25\nT | 0.4 0.1 0.25\n",
+    "MacIsaac.GAL4": "A | 0.9 0.05\nC | 0.05 0.05\nG | 0.025 0.85\nT | 0.025 0.05\n",
+    "Zhu.GCN4": "A | 0.333 0.5 0.1 0.0\nC | 0.333 0.5 0.2 1.0\nG | 0.3335 0.0 0.3 0.0\nT | 0.0005 0.0 0.4 0.0\n"
+}
+
+CISBP_FILES = {
+    "M0001_1.02.txt": "Pos\tA\tC\tG\tT\n1\t0.1\t0.2\t0.3\t0.4\n2\t0.7\t0.1\t0.1\t0.1\n",
+    "M0002_1.02.txt": "Pos\tA\tC\tG\tT\n1\t0.0625\t0.4375\t0.4375\t0.0625\n"
+}
+
+class TestRegistryOutput(unittest.TestCase):
+    def setUp(self):
+        self.dir_tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir_tmp)
+
+    def write_files(self, dirname, files):
+        os.makedirs(dirname)
+        for fn, text in files.items():
+            writer = open(os.path.join(dirname, fn), "w")
+            writer.write(text)
+            writer.close()
+
+    def convert(self, convert_meme, dir_input, name, extra_args=[]):
+        """ Returns the text of the meme database, the per motif files and the tf names of a run
+        of a converter. """
+        dir_output = os.path.join(self.dir_tmp, name)
+        os.makedirs(dir_output)
+        fn_db = os.path.join(self.dir_tmp, name + ".meme")
+        fn_names = os.path.join(self.dir_tmp, name + ".txt")
+        convert_meme.main(["convert", dir_input, "-m", fn_db, "-t", fn_names] + extra_args)
+        texts = [open(fn_db, "r").read(), open(fn_db + ".index", "r").read(), open(fn_names, "r").read()]
+        convert_meme.main(["convert", dir_input, "-o", dir_output, "-t", fn_names] + extra_args)
+        return texts + [dict((fn, open(os.path.join(dir_output, fn), "r").read()) for fn in os.listdir(dir_output))]
+
+    def test_scertf(self):
+        dir_input = os.path.join(self.dir_tmp, "scertf")
+        self.write_files(dir_input, SCERTF_FILES)
+        dir_registry = os.path.join(self.dir_tmp, "pfm_registry")
+        direct = self.convert(convert_scertf2meme, dir_input, "direct")
+        registry = self.convert(convert_scertf2meme, dir_input, "registry", ["-r", dir_registry])
+        self.assertEqual(registry, direct)
+        # the matrix of each GAL4 file can be read back
+        widths = [len(pfm) for [name, pfm] in pfm_registry.get_pfms(dir_registry, sources=["Badis.GAL4", "MacIsaac.GAL4"])]
+        self.assertEqual(widths, [3, 2])
+
+    def test_cisbp(self):
+        dir_input = os.path.join(self.dir_tmp, "cisbp")
+        self.write_files(dir_input, CISBP_FILES)
+        direct = self.convert(convert_cisbp2meme, dir_input, "direct")
+        registry = self.convert(convert_cisbp2meme, dir_input, "registry", ["-r", os.path.join(self.dir_tmp, "pfm_registry")])
+        self.assertEqual(registry, direct)
+
+    def test_fire(self):
+        fn_fire = os.path.join(self.dir_tmp, "motifs.fire")
+        motifs = [["m1", "AC[GT].A"], ["m2", "[ACGT]T"], ["m1", "GG"]]
+        writer = open(fn_fire, "w")
+        writer.write("".join(["%s\t%s\n" % tuple(motif) for motif in motifs]))
+        writer.close()
+        dir_registry = os.path.join(self.dir_tmp, "pfm_registry")
+        [names, count_parsed, count_files] = pfm_registry.update(dir_registry, fn_fire, "fire")
+        self.assertEqual(names, ["m1", "m2", "m1"])
+        for [motif_name, motif_str], [name, pfm] in zip(motifs, pfm_registry.get_pfms(dir_registry)):
+            self.assertTrue(numpy.allclose(pfm, scer_pwm_to_meme.fire_motif_to_pfm(motif_str).T))
+
+    def test_update_parses_changed(self):
+        dir_input = os.path.join(self.dir_tmp, "scertf")
+        self.write_files(dir_input, SCERTF_FILES)
+        dir_registry = os.path.join(self.dir_tmp, "pfm_registry")
+        self.assertEqual(pfm_registry.update(dir_registry, dir_input, "scertf")[1:], [3, 3])
+        self.assertEqual(pfm_registry.update(dir_registry, dir_input, "scertf")[1:], [0, 3])
+        writer = open(os.path.join(dir_input, "Badis.GAL4"), "a")
+        writer.write("\n")
+        writer.close()
+        self.assertEqual(pfm_registry.update(dir_registry, dir_input, "scertf")[1:], [1, 3])
+        self.assertEqual(len(pfm_registry.get_pfms(dir_registry, sources=["Badis.GAL4"])[0][1]), 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/python
+
+"""
+Run the exports of query_cisbp_mysql.py against the SQLite fixture dump fixtures/cisbp.sql
+(python -m unittest discover -s tests).
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+DIR_TESTS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DIR_TESTS, "..", "scripts"))
+import query_cisbp_mysql
+
+FN_FIXTURE = os.path.join(DIR_TESTS, "fixtures", "cisbp.sql")
+
+class TestExports(unittest.TestCase):
+    def setUp(self):
+        self.dir_tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir_tmp)
+
+    def run_exports(self, exports, extra_args=[]):
+        """ Returns {export: output lines} of a run of the exports on the fixture. """
+        fns = [os.path.join(self.dir_tmp, export + ".txt") for export in exports]
+        query_cisbp_mysql.main(["query_cisbp_mysql.py", "-s", FN_FIXTURE, "-b", "2", "-e"] + exports + \
+            ["-o"] + fns + extra_args)
+        return dict((export, open(fn, "r").read().splitlines()) for export, fn in zip(exports, fns))
+
+    def test_all_exports(self):
+        outputs = self.run_exports(query_cisbp_mysql.EXPORTS)
+        self.assertEqual(sorted(outputs["motifs"]), ["M0002_1.02", "M0003_1.02", "M0004_1.02"])
+        self.assertEqual(outputs["dbds"], [
+            ">M0001_1.02:10-40", "CKRRRKCDKLRPVCSQCIRRG",
+            ">M0003_1.02:205-265", "RKKRCPYTKHQTLELEKEFLF",
+            ">M0004_1.02:4-64", "KRRRKNNEAARRSRARKLQ"])
+        self.assertEqual(outputs["inferred_tfs"], [
+            ">T002: GCN4, YEL009C, Saccharomyces_cerevisiae, bZIP_1", "M0002_1.02",
+            ">T003: Gal4p, CAGL0A01, Candida_glabrata, Zn_clus", "M0001_1.02",
+            ">T005: Atf1e, ENSMUSG02, Mus_musculus, bZIP_1", "M0004_1.02"])
+        self.assertEqual(sorted(outputs["species"]), ["Mus_musculus\t2", "Saccharomyces_cerevisiae\t1"])
+
+    def test_species_min_count(self):
+        outputs = self.run_exports(["species"], ["-c", "2"])
+        self.assertEqual(outputs["species"], ["Mus_musculus\t2"])
+
+    def test_failed_export_removes_loaded_dump(self):
+        def fail(task):
+            raise ValueError("export failed")
+        run_export = query_cisbp_mysql.run_export
+        tempdir = tempfile.tempdir
+        query_cisbp_mysql.run_export = fail
+        tempfile.tempdir = os.path.join(self.dir_tmp, "db")
+        os.makedirs(tempfile.tempdir)
+        try:
+            self.assertRaises(ValueError, self.run_exports, ["motifs"])
+            self.assertEqual(os.listdir(tempfile.tempdir), [])
+        finally:
+            query_cisbp_mysql.run_export = run_export
+            tempfile.tempdir = tempdir
+
+if __name__ == "__main__":
+    unittest.main()